@@ -0,0 +1,59 @@
+import random
+import sys
+from time import perf_counter
+from typing import List
+
+from pharaoh.batch import BatchMoves, BatchGames, RandomPolicy, BiggestTuplePolicy, SmallestTuplePolicy, simulate
+from pharaoh.card import GERMAN_CARDS_DECK
+from pharaoh.game import create_game, legal_moves, finished, winners
+from pharaoh.game_state import GameState, ValidationMode, set_validation_mode
+from pharaoh.move import Move
+from pharaoh.player import Player, RandomPlayer, BiggestTuplePlayer, SmallestTuplePlayer
+from pharaoh.rule import standard_ruleset
+
+PLAYERS: int = 6
+GAMES: int = 200
+SEED: int = 2022
+
+
+def play(seed: int, players: List[Player], moves) -> GameState:
+    rng = random.Random(seed)
+    state = GameState.init_state(GERMAN_CARDS_DECK, PLAYERS, 5, mix_cards=rng.shuffle)
+    Move.mix_cards = rng.shuffle
+    while not finished(state) and state.mc < 1000:
+        legal = legal_moves(state, moves)
+        player = players[state.i]
+        state = (rng.choice(legal) if isinstance(player, RandomPlayer) else player.play(state, legal)).apply(state)
+    return state
+
+
+def main():
+    set_validation_mode(ValidationMode.OFF)
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else GAMES
+    seeds = range(SEED, SEED + games)
+    _, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+    players = [RandomPlayer('random'), RandomPlayer('random'), BiggestTuplePlayer('biggest'),
+               BiggestTuplePlayer('biggest'), SmallestTuplePlayer('smallest'), SmallestTuplePlayer('smallest')]
+    policies = [RandomPolicy(), RandomPolicy(), BiggestTuplePolicy(), BiggestTuplePolicy(), SmallestTuplePolicy(),
+                SmallestTuplePolicy()]
+
+    start = perf_counter()
+    expected = [play(seed, players, moves) for seed in seeds]
+    objects = perf_counter() - start
+
+    start = perf_counter()
+    rngs = [random.Random(seed) for seed in seeds]
+    states = [GameState.init_state(GERMAN_CARDS_DECK, PLAYERS, 5, mix_cards=rng.shuffle) for rng in rngs]
+    batch = simulate(BatchGames(BatchMoves(moves, GERMAN_CARDS_DECK), states, rngs), policies)
+    batched = perf_counter() - start
+
+    if any(batch.winners(k) != winners(state) or batch.mc[k] != state.mc for k, state in enumerate(expected)):
+        raise AssertionError('batched games differ from the object engine')
+    print(f'{games} games, {PLAYERS} players')
+    print(f'object engine:  {objects:.3f}s ({objects / games * 1000:.1f} ms/game)')
+    print(f'batched engine: {batched:.3f}s ({batched / games * 1000:.1f} ms/game)')
+    print(f'speedup:        {objects / batched:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
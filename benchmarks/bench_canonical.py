@@ -0,0 +1,63 @@
+import random
+import sys
+from statistics import mean
+from typing import List
+
+from pharaoh.card import GERMAN_CARDS_DECK
+from pharaoh.game import create_game, legal_moves, finished
+from pharaoh.game_state import GameState, ValidationMode, set_validation_mode
+from pharaoh.mcts import MCTS, Node
+from pharaoh.rule import standard_ruleset
+
+PLAYERS: int = 4
+GAMES: int = 20
+SEED: int = 2022
+ITERATIONS: int = 300
+
+
+def corpus(games: int) -> List[GameState]:
+    rnd = random.Random(SEED)
+    random.seed(SEED)
+    states: List[GameState] = []
+    for _ in range(games):
+        state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+        while not finished(state) and state.mc < 300:
+            states.append(state)
+            state = rnd.choice(legal_moves(state, moves)).apply(state)
+    return states
+
+
+def tree_size(node: Node) -> int:
+    return 1 + sum(tree_size(child) for child in node.children)
+
+
+def main():
+    set_validation_mode(ValidationMode.OFF)
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else GAMES
+    states = corpus(games)
+    _, full = create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+    _, canonical = create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5, canonical=True)
+    full_legal = [len(legal_moves(s, full)) for s in states]
+    canonical_legal = [len(legal_moves(s, canonical)) for s in states]
+    branching = [(f, c) for f, c in zip(full_legal, canonical_legal) if f > 1]
+    widest = states[full_legal.index(max(full_legal))]
+    sizes = {}
+    for position, state in (('first', states[0]), ('widest', widest)):
+        for name, table in (('full', full), ('canonical', canonical)):
+            random.seed(SEED)
+            mcts = MCTS(state, table, iterations=ITERATIONS)
+            mcts.EARLY_STOP = False
+            mcts.search()
+            sizes[position, name] = tree_size(mcts.root)
+    print(f'{len(states)} positions from {games} random games, {PLAYERS} players')
+    print(f'move table:        {len(full)} -> {len(canonical)} moves')
+    print(f'legal moves:       {mean(full_legal):.2f} -> {mean(canonical_legal):.2f} per position, '
+          f'max {max(full_legal)} -> {max(canonical_legal)}')
+    print(f'branching (>1):    {mean(f for f, _ in branching):.2f} -> {mean(c for _, c in branching):.2f}')
+    for position in ('first', 'widest'):
+        print(f'MCTS tree size:    {sizes[position, "full"]} -> {sizes[position, "canonical"]} nodes after '
+              f'{ITERATIONS} iterations from the {position} position')
+
+
+if __name__ == '__main__':
+    main()
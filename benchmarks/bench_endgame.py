@@ -0,0 +1,51 @@
+import argparse
+from time import perf_counter
+from typing import List, Optional, Tuple, Sequence
+
+from pharaoh.card import GERMAN_CARDS_DECK
+from pharaoh.endgame import EndgameSolver
+from pharaoh.game import create_game
+from pharaoh.game_state import ValidationMode, set_validation_mode
+from pharaoh.move import Move
+from pharaoh.player import MCTSPlayer, SmallestTuplePlayer, Player
+from pharaoh.rule import standard_ruleset
+from pharaoh.tournament import Tournament, SeatRotation
+
+# Endgame solver against plain search: an MCTS player plays against two SmallestTuplePlayers with and without an
+# EndgameSolver for small endgames. Reports the win rate, the time the games took and the solver's counters (positions
+# solved, exact solutions, nodes searched and table hit rate). Games run in this process so the counters are kept.
+PLAYERS: int = 3
+SEED: int = 2022
+
+
+def run(moves: Sequence[Move], solver: Optional[EndgameSolver], iterations: int, games: int) -> Tuple[float, float]:
+    roster: List[Player] = [MCTSPlayer('mcts', moves, iterations=iterations, endgame=solver)]
+    roster.extend(SmallestTuplePlayer(f'smallest{k}') for k in range(PLAYERS - 1))
+    start: float = perf_counter()
+    stats = Tournament(roster, games, SeatRotation.ROTATE, workers=1, seed=SEED, max_moves=500).run()
+    return stats.win_rate(0), perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move quality and cost of the endgame solver.')
+    parser.add_argument('-g', '--games', type=int, default=30)
+    parser.add_argument('-i', '--iterations', type=int, default=50)
+    parser.add_argument('-c', '--max-cards', type=int, default=6)
+    parser.add_argument('-s', '--max-stock', type=int, default=6)
+    parser.add_argument('-n', '--max-nodes', type=int, default=2_000)
+    args = parser.parse_args()
+    set_validation_mode(ValidationMode.OFF)
+
+    _, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+    solver = EndgameSolver(moves, args.max_cards, args.max_stock, args.max_nodes)
+    print(f'{args.iterations} iterations, {args.games} games')
+    print(f'{"endgame":<10} {"win rate":>9} {"seconds":>9}')
+    for name, endgame in (('search', None), ('solver', solver)):
+        rate, seconds = run(moves, endgame, args.iterations, args.games)
+        print(f'{name:<10} {rate:>9.2f} {seconds:>9.1f}')
+    print(', '.join(f'{name}: {value:.2f}' if isinstance(value, float) else f'{name}: {value}'
+                    for name, value in solver.counters().items()))
+
+
+if __name__ == '__main__':
+    main()
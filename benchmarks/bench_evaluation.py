@@ -0,0 +1,53 @@
+import argparse
+import os
+from time import perf_counter
+from typing import List, Optional, Tuple
+
+from pharaoh.card import GERMAN_CARDS_DECK
+from pharaoh.evaluation import HeuristicEvaluation, Evaluation
+from pharaoh.game import create_game
+from pharaoh.game_state import ValidationMode, set_validation_mode
+from pharaoh.mcts import MCTS
+from pharaoh.player import MCTSPlayer, SmallestTuplePlayer, Player
+from pharaoh.rule import standard_ruleset
+from pharaoh.tournament import Tournament, SeatRotation
+
+# Playout depth against move quality: an MCTS player with a fixed iteration budget plays against two
+# SmallestTuplePlayers, once with full-length playouts that score only finished games and once per depth with cut off
+# playouts scored by HeuristicEvaluation. Reports the win rate and the time the games took.
+PLAYERS: int = 3
+SEED: int = 2022
+
+Config = Tuple[str, int, Optional[Evaluation]]
+
+
+def run(depth: int, evaluation: Optional[Evaluation], iterations: int, games: int, workers: int) \
+        -> Tuple[float, float]:
+    _, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+    roster: List[Player] = [MCTSPlayer('mcts', moves, iterations=iterations, evaluation=evaluation, depth=depth)]
+    roster.extend(SmallestTuplePlayer(f'smallest{k}') for k in range(PLAYERS - 1))
+    start: float = perf_counter()
+    stats = Tournament(roster, games, SeatRotation.ROTATE, workers=workers, seed=SEED, max_moves=500).run()
+    return stats.win_rate(0), perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move quality and cost of evaluated playout cutoffs.')
+    parser.add_argument('-g', '--games', type=int, default=30)
+    parser.add_argument('-i', '--iterations', type=int, default=50)
+    parser.add_argument('-d', '--depths', type=int, nargs='+', default=[5, 10, 20])
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    set_validation_mode(ValidationMode.OFF)
+
+    configs: List[Config] = [('unscored', MCTS.DEPTH, None)]
+    configs.extend(('heuristic', depth, HeuristicEvaluation()) for depth in sorted(args.depths))
+    print(f'{args.iterations} iterations, {args.games} games')
+    print(f'{"cutoff":<10} {"depth":>6} {"win rate":>9} {"seconds":>9}')
+    for config in configs:
+        rate, seconds = run(config[1], config[2], args.iterations, args.games, args.workers)
+        print(f'{config[0]:<10} {config[1]:>6} {rate:>9.2f} {seconds:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
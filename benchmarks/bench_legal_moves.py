@@ -0,0 +1,55 @@
+import random
+import sys
+from time import perf_counter
+from typing import List
+
+from pyrsistent import pvector
+
+from pharaoh.card import GERMAN_CARDS_DECK
+from pharaoh.game import create_game, legal_moves, play_game
+from pharaoh.player import RandomPlayer
+from pharaoh.rule import standard_ruleset
+
+PLAYERS: int = 4
+GAMES: int = 20
+SEED: int = 2022
+
+
+def run(games: int, indexed: bool) -> float:
+    random.seed(SEED)
+    players = pvector(RandomPlayer(str(i)) for i in range(PLAYERS))
+    elapsed: float = 0
+    for _ in range(games):
+        state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+        table = moves if indexed else pvector(moves)
+        start = perf_counter()
+        play_game(state, players, table)
+        elapsed += perf_counter() - start
+    return elapsed
+
+
+def check(games: int) -> None:
+    random.seed(SEED)
+    players = pvector(RandomPlayer(str(i)) for i in range(PLAYERS))
+    for _ in range(games):
+        state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+        states, _ = play_game(state, players, moves)
+        for s in states:
+            expected: List = [mv for mv in moves if mv.test(s)]
+            if legal_moves(s, moves) != expected:
+                raise AssertionError('indexed lookup differs from linear scan')
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else GAMES
+    check(min(games, 5))
+    linear = run(games, indexed=False)
+    indexed = run(games, indexed=True)
+    print(f'{games} random games, {PLAYERS} players')
+    print(f'linear scan:   {linear:.3f}s ({linear / games * 1000:.1f} ms/game)')
+    print(f'indexed moves: {indexed:.3f}s ({indexed / games * 1000:.1f} ms/game)')
+    print(f'speedup:       {linear / indexed:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import random
+import sys
+import tracemalloc
+from time import perf_counter
+from typing import List, Tuple
+
+from pharaoh.card import GERMAN_CARDS_DECK, DOUBLE_GERMAN_CARDS_DECK, Deck
+from pharaoh.game import create_game, legal_moves, finished
+from pharaoh.game_state import GameState, ValidationMode, set_validation_mode
+from pharaoh.move_cache import MoveTableCache
+from pharaoh.move_index import MoveIndex
+from pharaoh.rule import standard_ruleset
+
+GAMES: int = 10
+SEED: int = 2022
+
+
+def build(deck: Deck, players: int, parametric: bool) -> Tuple[MoveIndex, float, int]:
+    tracemalloc.start()
+    start = perf_counter()
+    moves = MoveTableCache().moves(standard_ruleset, deck, players, parametric=parametric)
+    elapsed = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return moves, elapsed, peak
+
+
+def corpus(deck: Deck, players: int, games: int) -> List[GameState]:
+    rnd = random.Random(SEED)
+    random.seed(SEED)
+    states: List[GameState] = []
+    for _ in range(games):
+        state, moves = create_game(standard_ruleset, deck, players, 5, parametric=True)
+        while not finished(state) and state.mc < 300:
+            states.append(state)
+            state = rnd.choice(legal_moves(state, moves)).apply(state)
+    return states
+
+
+def time_legal(states: List[GameState], moves: MoveIndex) -> float:
+    legal_moves(states[0], moves)
+    start = perf_counter()
+    for state in states:
+        legal_moves(state, moves)
+    return perf_counter() - start
+
+
+def main():
+    set_validation_mode(ValidationMode.OFF)
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else GAMES
+    for deck, players, tables in ((GERMAN_CARDS_DECK, 4, (False, True)), (DOUBLE_GERMAN_CARDS_DECK, 10, (True,))):
+        states = corpus(deck, players, games)
+        print(f'{len(deck.cards)} cards, {players} players, {len(states)} positions from {games} random games')
+        for parametric in tables:
+            moves, elapsed, peak = build(deck, players, parametric)
+            legal = time_legal(states, moves)
+            print(f'  {"parametric" if parametric else "full table"}: {len(moves)} table moves, built in '
+                  f'{elapsed * 1000:.1f} ms (peak {peak / 1024:.0f} KiB), legal_moves '
+                  f'{legal / len(states) * 1e6:.1f} us/position')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import os
+from typing import Dict, List, Tuple
+
+from pharaoh import instrumentation
+from pharaoh.card import GERMAN_CARDS_DECK
+from pharaoh.game import create_game
+from pharaoh.game_state import ValidationMode, set_validation_mode
+from pharaoh.mcts import MCTS
+from pharaoh.player import MCTSPlayer, SmallestTuplePlayer, BiggestTuplePlayer, Player
+from pharaoh.rollout import RolloutPolicy, RandomRollout, PlayerRollout, ScoredRollout, EpsilonGreedyRollout, \
+    shed_cards, attack
+from pharaoh.rule import standard_ruleset
+from pharaoh.tournament import Tournament, SeatRotation
+
+# Move quality of MCTS with every rollout policy at growing iteration budgets: an MCTS player plays against two
+# SmallestTuplePlayers and its win rate is the quality. The report lists the fewest iterations with which a policy
+# reaches the win rate of random rollouts at the biggest budget, and the share of playouts cut off at MCTS.DEPTH.
+PLAYERS: int = 3
+SEED: int = 2022
+
+POLICIES: Dict[str, RolloutPolicy] = {
+    'random': RandomRollout(),
+    'smallest': PlayerRollout(SmallestTuplePlayer('rollout')),
+    'biggest': PlayerRollout(BiggestTuplePlayer('rollout')),
+    'shed': ScoredRollout(shed_cards),
+    'attack': ScoredRollout(attack),
+    'shed-eps': EpsilonGreedyRollout(ScoredRollout(shed_cards), 0.1),
+}
+
+
+def win_rate(policy: RolloutPolicy, iterations: int, games: int, workers: int) -> float:
+    _, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+    roster: List[Player] = [MCTSPlayer('mcts', moves, iterations=iterations, policy=policy)]
+    roster.extend(SmallestTuplePlayer(f'smallest{k}') for k in range(PLAYERS - 1))
+    stats = Tournament(roster, games, SeatRotation.ROTATE, workers=workers, seed=SEED, max_moves=500).run()
+    return stats.win_rate(0)
+
+
+def cutoff_share(policy: RolloutPolicy, iterations: int) -> float:
+    state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+    with instrumentation.collecting() as collector:
+        mcts = MCTS(state, moves, iterations=iterations, policy=policy)
+        mcts.EARLY_STOP = False
+        mcts.search()
+    return collector.counters.get('mcts.depth_cutoffs', 0) / max(1, iterations - 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move quality of MCTS rollout policies.')
+    parser.add_argument('-g', '--games', type=int, default=30)
+    parser.add_argument('-i', '--iterations', type=int, nargs='+', default=[10, 30, 90])
+    parser.add_argument('-p', '--policy', action='append', choices=sorted(POLICIES))
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    set_validation_mode(ValidationMode.OFF)
+
+    names: List[str] = args.policy or list(POLICIES)
+    if 'random' not in names:
+        names.insert(0, 'random')
+    budgets: List[int] = sorted(args.iterations)
+    rates: Dict[Tuple[str, int], float] = {}
+    print(f'{"policy":<10} {"cutoffs":>8} ' + ' '.join(f'{n:>7}' for n in budgets))
+    for name in names:
+        for n in budgets:
+            rates[name, n] = win_rate(POLICIES[name], n, args.games, args.workers)
+        print(f'{name:<10} {cutoff_share(POLICIES[name], budgets[-1]):>8.2f} ' +
+              ' '.join(f'{rates[name, n]:>7.2f}' for n in budgets))
+    target: float = rates['random', budgets[-1]]
+    print(f'\nwin rate of random rollouts with {budgets[-1]} iterations: {target:.2f} ({args.games} games)')
+    for name in names:
+        reached = [n for n in budgets if rates[name, n] >= target]
+        print(f'{name:<10} reaches it with {reached[0] if reached else "more than " + str(budgets[-1])} iterations')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from statistics import mean
+from time import perf_counter
+from typing import Callable, Dict, List, Any, Tuple
+
+from pharaoh.card import GERMAN_CARDS_DECK
+from pharaoh.game import create_game, legal_moves, finished, play_game
+from pharaoh.game_state import GameState, ValidationMode, set_validation_mode, validation
+from pharaoh.mcts import MCTS
+from pharaoh.player import RandomPlayer
+from pharaoh.rule import standard_ruleset
+
+# Seeded benchmarks of the engine hot paths. `run` writes a JSON file with the best and mean time and the peak
+# traced memory of every case, `compare` flags cases that got slower (or use more memory) than a stored baseline.
+# Cases run in the default validation mode unless --validation asks for another one.
+PLAYERS: int = 4
+SEED: int = 2022
+CORPUS_GAMES: int = 20
+GAMES: int = 10
+MCTS_ITERATIONS: int = 200
+
+Case = Callable[[], Callable[[], Any]]
+
+
+def corpus() -> List[GameState]:
+    rnd = random.Random(SEED)
+    random.seed(SEED)
+    states: List[GameState] = []
+    for _ in range(CORPUS_GAMES):
+        state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+        while not finished(state) and state.mc < 300:
+            states.append(state)
+            state = rnd.choice(legal_moves(state, moves)).apply(state)
+    return states
+
+
+def case_create_game() -> Callable[[], Any]:
+    # generates the move table every time, the shared move_cache would turn the case into a dict lookup
+    return lambda: create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5, cache=None)
+
+
+def case_create_cached() -> Callable[[], Any]:
+    create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+    return lambda: create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+
+
+def case_legal_moves() -> Callable[[], Any]:
+    _, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+    states = corpus()
+    return lambda: [legal_moves(state, moves) for state in states]
+
+
+def case_apply() -> Callable[[], Any]:
+    _, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+    rnd = random.Random(SEED)
+    pairs = [(state, rnd.choice(legal_moves(state, moves))) for state in corpus()]
+    return lambda: [move.apply(state) for state, move in pairs]
+
+
+def case_play_game() -> Callable[[], Any]:
+    players = [RandomPlayer(str(i)) for i in range(PLAYERS)]
+
+    def run() -> None:
+        random.seed(SEED)
+        for _ in range(GAMES):
+            state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+            play_game(state, players, moves)
+    return run
+
+
+def case_mcts_search() -> Callable[[], Any]:
+    random.seed(SEED)
+    state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+
+    def run() -> None:
+        random.seed(SEED)
+        mcts = MCTS(state, moves, iterations=MCTS_ITERATIONS)
+        mcts.EARLY_STOP = False
+        mcts.search()
+    return run
+
+
+CASES: Dict[str, Case] = {
+    'create_game': case_create_game,
+    'create_cached': case_create_cached,
+    'legal_moves': case_legal_moves,
+    'apply': case_apply,
+    'play_game': case_play_game,
+    'mcts_search': case_mcts_search,
+}
+
+
+def measure(case: Case, repeat: int) -> Dict[str, Any]:
+    bench = case()
+    bench()
+    times: List[float] = []
+    for _ in range(repeat):
+        start = perf_counter()
+        bench()
+        times.append(perf_counter() - start)
+    # memory is traced in a separate run, tracing slows the timed runs down
+    tracemalloc.start()
+    bench()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'best': min(times), 'mean': mean(times), 'repeat': repeat, 'peak_memory': peak}
+
+
+def run(names: List[str], repeat: int, mode: ValidationMode = validation.mode) -> Dict[str, Any]:
+    set_validation_mode(mode)
+    results: Dict[str, Any] = {}
+    for name in names:
+        results[name] = measure(CASES[name], repeat)
+        print(f'{name:<13} best {results[name]["best"] * 1000:9.2f} ms   '
+              f'peak memory {results[name]["peak_memory"] / 1024:9.1f} KiB', file=sys.stderr)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'seed': SEED,
+            'validation': mode.value,
+        },
+        'cases': results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[Tuple[str, str, float]]:
+    regressions: List[Tuple[str, str, float]] = []
+    for name, result in current['cases'].items():
+        old = baseline['cases'].get(name)
+        if old is None:
+            continue
+        for metric in ('best', 'peak_memory'):
+            ratio: float = result[metric] / old[metric] if old[metric] else 1.0
+            flag = 'REGRESSION' if ratio > 1 + threshold else ''
+            print(f'{name:<13} {metric:<12} {old[metric]:>14.6g} -> {result[metric]:>14.6g} {ratio:6.2f}x {flag}')
+            if flag:
+                regressions.append((name, metric, ratio))
+    return regressions
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the engine hot paths.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('-o', '--output', default='results.json')
+    run_parser.add_argument('-r', '--repeat', type=int, default=5)
+    run_parser.add_argument('-c', '--case', action='append', choices=sorted(CASES), help='run only these cases')
+    run_parser.add_argument('-b', '--baseline', help='compare the results with this file')
+    run_parser.add_argument('-t', '--threshold', type=float, default=0.1)
+    run_parser.add_argument('-v', '--validation', type=ValidationMode, default=validation.mode,
+                            choices=list(ValidationMode), help='validation mode of the measured states')
+    compare_parser = commands.add_parser('compare', help='compare two result files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('-t', '--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        current = run(args.case or list(CASES), args.repeat, args.validation)
+        with open(args.output, 'w', encoding='utf8') as f:
+            json.dump(current, f, indent=2)
+        if args.baseline is None:
+            return
+        baseline = load(args.baseline)
+    else:
+        baseline, current = load(args.baseline), load(args.current)
+    if compare(baseline, current, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-from random import shuffle
+import os
 from typing import Tuple, List, Optional, Dict, Iterable
 
 import yaml
@@ -6,11 +6,12 @@ from pyrsistent import pvector
 from pyrsistent.typing import PVector
 
 from pharaoh.card import GERMAN_CARDS_DECK, Card, Suit, Value, symbols
-from pharaoh.game import finished, legal_moves, create_game, winners
-from pharaoh.game_state import GameState
+from pharaoh.game import finished, legal_moves, create_game, winners, game_steps
+from pharaoh.game_state import GameState, ValidationMode, set_validation_mode
 from pharaoh.move import Move
 from pharaoh.player import Player, RandomPlayer, BiggestTuplePlayer, SmallestTuplePlayer, HumanPlayer, MCTSPlayer
 from pharaoh.rule import standard_ruleset
+from pharaoh.tournament import Tournament, SeatRotation
 
 CURSOR: str = '\033[32m>>>\033[m '
 EMPTY_STR: str = '""'
@@ -216,62 +217,28 @@ class ConsoleGame:
                 print("unknown command")
 
 
-def play_game(state: GameState, players: PVector[Player], moves: PVector[Move]) \
-        -> Tuple[List[GameState], List[Move]]:
-    if len(players) != len(state.lp):
-        raise Exception('Incompatible game state: len(players) != len(state.lp)')
-
-    state_history: List[GameState] = []
-    move_history: List[Move] = []
-    while not finished(state):
-        state_history.append(state)
-        legal: List[Move] = legal_moves(state, moves)
-        next_move: Move = players[state.i].play(state_history[-1], legal)
-        move_history.append(next_move)
-        state = next_move.apply(state)
-        if state.mc == 1000:
-            break
-    state_history.append(state)
-    return state_history, move_history
-
-
 def main():
     n = 5
     players: PVector[Player] = pvector(RandomPlayer(str(i)) for i in range(5))
     state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, n, 5)
-    state_history, move_history = play_game(state, players, moves)
-    for i in range(len(state_history)):
-        print(state_history[i], '\t', move_history[i] if i < len(move_history) else None)
-    print(winners(state_history[-1]))
+    for step in game_steps(state, players, moves):
+        print(step.state, '\t', step.move)
+        state = step.next_state
+    print(state, '\t', None)
+    print(winners(state))
 
 
 def main2():
-    n = 6
-    players: PVector[Player] = pvector(RandomPlayer('random' + str(i)) for i in range(2))
-    players = players.extend(BiggestTuplePlayer('biggest' + str(i)) for i in range(2))
-    players = players.extend(SmallestTuplePlayer('smallest' + str(i)) for i in range(2))
-
-    stats = [0] * n
-    length = 0
-    m = 200
-    players_numbers = [(players[i], i) for i in range(n)]
-    for j in range(m):
-        if j > 0 and j % 10 == 0:
-            print(j)
-        shuffle(players_numbers)
-        positions = [0] * n
-        for i in range(n):
-            player, number = players_numbers[i]
-            positions[i] = number
-        players2 = pvector(x[0] for x in players_numbers)
-        state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, n, 5)
-        state_history, move_history = play_game(state, players2, moves)
-        result = [x - 1 for x in winners(state_history[-1])]
-        for i in range(n):
-            stats[positions[result[i]]] += i
-        length += state_history[-1].mc
-    print(stats)
-    print(length / m / n)
+    set_validation_mode(ValidationMode.OFF)
+    roster: List[Player] = [RandomPlayer('random' + str(i)) for i in range(2)]
+    roster.extend(BiggestTuplePlayer('biggest' + str(i)) for i in range(2))
+    roster.extend(SmallestTuplePlayer('smallest' + str(i)) for i in range(2))
+
+    tournament = Tournament(roster, 200, SeatRotation.SHUFFLE, workers=os.cpu_count() or 1)
+    for _ in tournament.results():
+        if tournament.stats.games % 10 == 0:
+            print(tournament.stats.games)
+    print(tournament.stats.summary())
 
 
 def main3():
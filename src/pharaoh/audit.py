@@ -0,0 +1,48 @@
+from dataclasses import dataclass
+from typing import Iterable, List, Tuple, Optional
+
+from pharaoh.game_state import GameState, state_errors, validation, ValidationMode
+from pharaoh.move import Move
+
+
+@dataclass(frozen=True)
+class AuditIssue:
+    index: int
+    messages: Tuple[str, ...]
+
+    def __str__(self) -> str:
+        return f'state {self.index}: {"; ".join(self.messages)}'
+
+
+def audit_states(states: Iterable[GameState]) -> List[AuditIssue]:
+    issues: List[AuditIssue] = []
+    for index, state in enumerate(states):
+        errors = state_errors(state)
+        if errors:
+            issues.append(AuditIssue(index, tuple(errors)))
+    return issues
+
+
+def audit_game(state: GameState, moves: Iterable[Move], states: Optional[Iterable[GameState]] = None) \
+        -> List[AuditIssue]:
+    # Replays a recorded game with invariant checks switched off and checks every state afterwards. If the recorded
+    # states are given too, every replayed state is compared with the recorded one.
+    replayed: List[GameState] = [state]
+    issues: List[AuditIssue] = []
+    with validation.mode_set_to(ValidationMode.OFF):
+        for index, move in enumerate(moves):
+            if not move.test(replayed[-1]):
+                issues.append(AuditIssue(index, (f'illegal move {move!r}',)))
+                break
+            replayed.append(move.apply(replayed[-1]))
+    issues.extend(audit_states(replayed))
+    if states is not None:
+        recorded: List[GameState] = list(states)
+        if len(recorded) != len(replayed):
+            issues.append(AuditIssue(min(len(recorded), len(replayed)), (
+                f'{len(recorded)} states recorded, {len(replayed)} replayed',)))
+        for index, (expected, actual) in enumerate(zip(recorded, replayed)):
+            if str(expected) != str(actual):
+                issues.append(AuditIssue(index, ('replayed state differs from the recorded one',)))
+    issues.sort(key=lambda issue: issue.index)
+    return issues
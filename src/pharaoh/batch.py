@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import random
+from functools import partial
+from typing import List, Sequence, Dict, Tuple, Optional, Any, Callable
+
+import numpy as np
+
+from pharaoh.card import Deck, CardEncoding, Suit, Value
+from pharaoh.game_state import GameState, Hand
+from pharaoh.move import Move, VariableCondition, CardInHand, PlayCards, DrawCards, ChangeVariable
+from pharaoh.zobrist import full_hash
+
+# Lockstep engine for many games of one move table: every game is a row of structure-of-arrays NumPy tensors
+# (card counts per hand, stock and discard pile as arrays of card indices, one array per scalar variable). Conditions
+# and variable changes of the move table are compiled into lookup tables over the values a variable can take, so
+# legality of every move in every game is a few mask operations and chosen moves are applied to all games at once.
+SCALARS: Tuple[str, ...] = ('suit', 'val', 'ace', 'cnt', 'i')
+
+
+class BatchException(Exception):
+    pass
+
+
+def _cache_key(fn: Callable) -> Any:
+    if isinstance(fn, partial):
+        return fn.func, fn.args
+    return fn
+
+
+class BatchMoves:
+    def __init__(self, moves: Sequence[Move], deck: Deck):
+        if getattr(moves, 'generators', None):
+            raise BatchException('Moves generated from the hand (parametric tables) can not be compiled')
+        self.moves = moves
+        self.encoding: CardEncoding = deck.encoding
+        # every value of a scalar variable is an index into the tables; draw counts and aces grow with the deck
+        self.domain: int = 3 * len(deck.cards) + 16
+        self._predicates: Dict[Any, np.ndarray] = {}
+        self._changes: Dict[Any, np.ndarray] = {}
+        count: int = len(moves)
+        width: int = max([len(mv.cards) for mv in moves] + [1])
+        self.allowed: Dict[str, np.ndarray] = {}
+        self.possible = np.ones(count, dtype=bool)
+        self.required = np.zeros((len(self.encoding.cards), count), dtype=np.float32)
+        self.cards = np.full((count, width), -1, dtype=np.int64)
+        self.n_cards = np.zeros(count, dtype=np.int64)
+        self.draws = np.zeros(count, dtype=bool)
+        self.transitions: Dict[str, np.ndarray] = {var: np.tile(np.arange(self.domain), (count, 1))
+                                                   for var in SCALARS}
+        self.mc_steps = np.zeros(count, dtype=np.int64)
+        values: List[Value] = sorted({card.value for card in self.encoding.cards})
+        self.values = np.zeros((count, len(values)), dtype=bool)
+        self.first_value = np.zeros(count, dtype=np.int64)
+        for pos, mv in enumerate(moves):
+            self._compile_conditions(pos, mv)
+            self._compile_actions(pos, mv)
+            for card in mv.cards:
+                self.values[pos, values.index(card.value)] = True
+            if mv.cards:
+                self.first_value[pos] = values.index(mv.cards[0].value)
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def _compile_conditions(self, pos: int, mv: Move) -> None:
+        for leaf in (leaf for c in mv.conditions for leaf in c.leaves()):
+            if isinstance(leaf, VariableCondition) and leaf.variable in SCALARS:
+                if leaf.variable not in self.allowed:
+                    self.allowed[leaf.variable] = np.ones((self.domain, len(self.moves)), dtype=bool)
+                self.allowed[leaf.variable][:, pos] &= self._predicate(leaf)
+            elif isinstance(leaf, CardInHand):
+                if leaf.count > 1:
+                    raise BatchException(f'Unsupported condition on {leaf.count} copies of a card in {mv}')
+                if leaf.card in self.encoding.cards:
+                    self.required[self.encoding.index(leaf.card), pos] = 1
+                else:
+                    self.possible[pos] = False
+            else:
+                raise BatchException(f'Unsupported condition {leaf}')
+
+    def _compile_actions(self, pos: int, mv: Move) -> None:
+        changed: List[str] = []
+        for action in mv.actions:
+            if isinstance(action, (PlayCards, DrawCards)):
+                # card actions read the player and the draw count before the move changes them
+                if 'i' in changed or 'cnt' in changed or self.n_cards[pos] or self.draws[pos]:
+                    raise BatchException(f'Unsupported order of actions in {mv}')
+                if isinstance(action, DrawCards):
+                    self.draws[pos] = True
+                else:
+                    self.n_cards[pos] = len(action.cards)
+                    self.cards[pos, :len(action.cards)] = [self.encoding.index(card) for card in action.cards]
+            elif isinstance(action, ChangeVariable) and action.variable in SCALARS:
+                changed.append(action.variable)
+                table = self.transitions[action.variable]
+                table[pos] = self._change(action)[table[pos]]
+            elif isinstance(action, ChangeVariable) and action.variable == 'mc':
+                step: int = action.action(0)
+                if any(action.action(x) != x + step for x in (1, 2, 1000)):
+                    raise BatchException(f'Move counter has to change by a constant in {mv}')
+                self.mc_steps[pos] += step
+            else:
+                raise BatchException(f'Unsupported action {action}')
+
+    def _predicate(self, cond: VariableCondition) -> np.ndarray:
+        key = _cache_key(cond.predicate)
+        table = self._predicates.get(key)
+        if table is None:
+            table = self._predicates[key] = np.array([bool(cond.predicate(x)) for x in range(self.domain)])
+        return table
+
+    def _change(self, action: ChangeVariable) -> np.ndarray:
+        # the last entry marks values outside the domain, it is kept by every further change
+        key = _cache_key(action.action)
+        table = self._changes.get(key)
+        if table is None:
+            results = [int(action.action(x)) for x in range(self.domain)]
+            table = np.array([x if 0 <= x < self.domain else self.domain for x in results] + [self.domain])
+            self._changes[key] = table
+        return table
+
+
+class BatchGames:
+    def __init__(self, table: BatchMoves, states: Sequence[GameState],
+                 rngs: Optional[Sequence[random.Random]] = None):
+        if not states:
+            raise BatchException('No games')
+        self.table = table
+        self.size: int = len(states)
+        self.players: int = len(states[0].lp)
+        # reshuffles of game k use rngs[k] like Move.mix_cards does in the object engine
+        self.rngs: List[random.Random] = list(rngs) if rngs is not None else \
+            [random.Random(random.getrandbits(64)) for _ in states]
+        if len(self.rngs) != self.size:
+            raise BatchException('Every game needs its own random generator')
+        enc: CardEncoding = table.encoding
+        total: int = max(state.deck_size for state in states)
+        self.hands = np.zeros((self.size, self.players, len(enc.cards)), dtype=np.int8)
+        self.st = np.full((self.size, total), -1, dtype=np.int64)
+        self.st_head = np.zeros(self.size, dtype=np.int64)
+        self.st_len = np.zeros(self.size, dtype=np.int64)
+        self.dp = np.full((self.size, total), -1, dtype=np.int64)
+        self.dp_len = np.zeros(self.size, dtype=np.int64)
+        self.vars: Dict[str, np.ndarray] = {var: np.zeros(self.size, dtype=np.int64) for var in SCALARS}
+        self.mc = np.zeros(self.size, dtype=np.int64)
+        self.lp_mc = np.zeros((self.size, self.players), dtype=np.int64)
+        # the piles are padded to the biggest deck of the batch, every game keeps its own card count
+        self.deck_size = np.array([state.deck_size for state in states], dtype=np.int64)
+        for k, state in enumerate(states):
+            if len(state.lp) != self.players:
+                raise BatchException('All games need the same number of players')
+            for p, hand in enumerate(state.lp):
+                for card in hand:
+                    self.hands[k, p, enc.index(card)] += 1
+            self.st[k, :len(state.st)] = [enc.index(card) for card in state.st]
+            self.st_len[k] = len(state.st)
+            self.dp[k, :len(state.dp)] = [enc.index(card) for card in state.dp]
+            self.dp_len[k] = len(state.dp)
+            for var in SCALARS:
+                self.vars[var][k] = int(state[var])
+            self.mc[k] = state.mc
+            self.lp_mc[k] = state.lp_mc
+        if any((values >= table.domain).any() for values in self.vars.values()):
+            raise BatchException('Variable out of the supported range')
+
+    @property
+    def i(self) -> np.ndarray:
+        return self.vars['i']
+
+    @property
+    def finished(self) -> np.ndarray:
+        return (self.lp_mc == -1).sum(axis=1) == 1
+
+    def running(self, max_moves: Optional[int] = None) -> np.ndarray:
+        if max_moves is None:
+            return ~self.finished
+        return ~self.finished & (self.mc < max_moves)
+
+    def legal(self, games: np.ndarray) -> np.ndarray:
+        t = self.table
+        mask = np.repeat(t.possible[None, :], len(games), axis=0)
+        for var, allowed in t.allowed.items():
+            mask &= allowed[self.vars[var][games]]
+        missing = (self.hands[games, self.i[games]] == 0).astype(np.float32) @ t.required
+        mask &= missing == 0
+        return mask
+
+    def apply(self, games: np.ndarray, choices: np.ndarray) -> None:
+        t = self.table
+        players = self.i[games].copy()
+        n_cards = t.n_cards[choices]
+        for j in range(t.cards.shape[1]):
+            sel = n_cards > j
+            g = games[sel]
+            card = t.cards[choices[sel], j]
+            self.hands[g, players[sel], card] -= 1
+            self.dp[g, self.dp_len[g]] = card
+            self.dp_len[g] += 1
+        drawing = t.draws[choices]
+        g, p = games[drawing], players[drawing]
+        n = np.minimum(self.vars['cnt'][g], self.st_len[g])
+        for j in range(n.max(initial=0)):
+            sel = n > j
+            gs = g[sel]
+            self.hands[gs, p[sel], self.st[gs, self.st_head[gs]]] += 1
+            self.st_head[gs] += 1
+        self.st_len[g] -= n
+        for var in SCALARS:
+            new = t.transitions[var][choices, self.vars[var][games]]
+            if (new == t.domain).any():
+                raise BatchException(f'Variable {var} out of the supported range')
+            self.vars[var][games] = new
+        self.mc[games] += t.mc_steps[choices]
+        empty = self.hands[games, players].sum(axis=1) == 0
+        self.lp_mc[games[empty], players[empty]] = self.mc[games[empty]]
+        for _ in range(self.players):
+            g = games[self.lp_mc[games, self.i[games]] != -1]
+            if not len(g):
+                break
+            self.i[g] = (self.i[g] + 1) % self.players
+        for k in games[self.vars['cnt'][games] > self.st_len[games]]:
+            self._reshuffle(k)
+
+    def _reshuffle(self, k: int) -> None:
+        top = self.dp[k, self.dp_len[k] - 1]
+        cards: List[int] = self.dp[k, :self.dp_len[k] - 1].tolist()
+        self.rngs[k].shuffle(cards)
+        head = self.st_head[k]
+        stock: List[int] = self.st[k, head:head + self.st_len[k]].tolist() + cards
+        self.st[k, :len(stock)] = stock
+        self.st_head[k] = 0
+        self.st_len[k] = len(stock)
+        self.dp[k, 0] = top
+        self.dp_len[k] = 1
+
+    def winners(self, k: int) -> Optional[List[int]]:
+        if not self.finished[k]:
+            return None
+        final_lp_mc = np.where(self.lp_mc[k] == -1, self.mc[k], self.lp_mc[k])
+        return sorted(range(self.players), key=lambda p: (final_lp_mc[p], p))
+
+    def to_state(self, k: int) -> GameState:
+        cards = self.table.encoding.cards
+        head = self.st_head[k]
+        state = GameState(
+            dp=[cards[c] for c in self.dp[k, :self.dp_len[k]]],
+            st=[cards[c] for c in self.st[k, head:head + self.st_len[k]]],
+            lp=[Hand(cards[c] for c in np.repeat(np.arange(len(cards)), hand)) for hand in self.hands[k]],
+            ace=int(self.vars['ace'][k]),
+            suit=Suit(self.vars['suit'][k]),
+            val=Value(self.vars['val'][k]),
+            cnt=int(self.vars['cnt'][k]),
+            i=int(self.i[k]),
+            mc=int(self.mc[k]),
+            lp_mc=[int(x) for x in self.lp_mc[k]],
+            deck_size=int(self.deck_size[k])
+        )
+        return state.set(zh=full_hash(state))
+
+
+class Policy:
+    def choose(self, games: BatchGames, rows: np.ndarray, legal: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}()'
+
+
+class RandomPolicy(Policy):
+    # Draws from the game's own generator exactly like RandomPlayer draws from the global one.
+    def choose(self, games: BatchGames, rows: np.ndarray, legal: np.ndarray) -> np.ndarray:
+        return np.array([games.rngs[k].choice(np.flatnonzero(row)) for k, row in zip(rows, legal)], dtype=np.int64)
+
+
+class UniformPolicy(Policy):
+    def __init__(self, seed: Optional[int] = None):
+        self._generator = np.random.default_rng(seed)
+
+    def choose(self, games: BatchGames, rows: np.ndarray, legal: np.ndarray) -> np.ndarray:
+        picks = (self._generator.random(len(rows)) * legal.sum(axis=1)).astype(np.int64)
+        return np.argmax(np.cumsum(legal, axis=1) > picks[:, None], axis=1)
+
+
+class BiggestTuplePolicy(Policy):
+    def choose(self, games: BatchGames, rows: np.ndarray, legal: np.ndarray) -> np.ndarray:
+        return np.argmax(np.where(legal, games.table.n_cards, -1), axis=1)
+
+
+class SmallestTuplePolicy(Policy):
+    def choose(self, games: BatchGames, rows: np.ndarray, legal: np.ndarray) -> np.ndarray:
+        t = games.table
+        sizes = np.where(legal, t.n_cards, 0)
+        longest = np.stack([np.where(t.values[:, v], sizes, 0).max(axis=1) for v in range(t.values.shape[1])],
+                           axis=1)
+        keys = longest[:, t.first_value] * (t.cards.shape[1] + 1) - t.n_cards
+        keys = np.where(legal & (t.n_cards > 0), keys, np.iinfo(np.int64).max)
+        return np.where(legal.sum(axis=1) == 1, np.argmax(legal, axis=1), np.argmin(keys, axis=1))
+
+
+def simulate(games: BatchGames, policies: Sequence[Policy], max_moves: Optional[int] = 1000) -> BatchGames:
+    # policies[p] plays for the player with index p in every game
+    if len(policies) != games.players:
+        raise BatchException('Incompatible policies: len(policies) != number of players')
+    while True:
+        active = np.flatnonzero(games.running(max_moves))
+        if not len(active):
+            return games
+        legal = games.legal(active)
+        if not legal.any(axis=1).all():
+            raise BatchException('No legal move')
+        choices = np.empty(len(active), dtype=np.int64)
+        seats = games.i[active]
+        for seat, policy in enumerate(policies):
+            sel = seats == seat
+            if sel.any():
+                choices[sel] = policy.choose(games, active[sel], legal[sel])
+        games.apply(active, choices)
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from collections import Counter
+from functools import partial
+from typing import Iterable, List, Dict, Tuple, Any, Optional, Hashable
+
+from pharaoh.card import Card, Suit
+from pharaoh.move import Move, VariableCondition, CardInHand, PlayCards, ChangeVariable, DrawCards
+
+# Two moves are effect-equivalent when they have the same conditions and the same variable changes, take the same
+# cards from the hand and leave the same card on top of the discard pile. They only differ in the order of the cards
+# under the top one, which is reshuffled before anyone sees it again. Rules whose effect depends on the first card
+# (aces, sevens, the leaf under) express it in the variable changes, so such moves stay apart.
+EffectKey = Tuple[Hashable, ...]
+
+
+def _callable_key(fn: Any) -> Hashable:
+    if isinstance(fn, partial):
+        return fn.func, fn.args
+    return fn
+
+
+def _bag(items: Iterable[Hashable]) -> frozenset:
+    return frozenset(Counter(items).items())
+
+
+def effect_key(move: Move) -> EffectKey:
+    conditions: List[Hashable] = []
+    for leaf in (leaf for c in move.conditions for leaf in c.leaves()):
+        if isinstance(leaf, VariableCondition):
+            conditions.append((leaf.variable, _callable_key(leaf.predicate)))
+        elif isinstance(leaf, CardInHand):
+            conditions.extend([leaf.card] * leaf.count)
+        else:
+            conditions.append(id(leaf))
+    actions: List[Hashable] = []
+    for action in move.actions:
+        if isinstance(action, PlayCards):
+            actions.append(('play', _bag(action.cards), action.cards[-1] if action.cards else None))
+        elif isinstance(action, ChangeVariable):
+            actions.append((action.variable, _callable_key(action.action)))
+        elif isinstance(action, DrawCards):
+            actions.append('draw')
+        else:
+            actions.append(id(action))
+    return _bag(conditions), tuple(actions), move.suit
+
+
+class MoveClasses:
+    # Equivalence classes of a move table; every class is represented by its first move in table order.
+    def __init__(self, moves: Iterable[Move]):
+        self._classes: Dict[EffectKey, List[Move]] = {}
+        self._by_play: Dict[Tuple[Tuple[Card, ...], Optional[Suit]], List[Move]] = {}
+        for mv in moves:
+            self._classes.setdefault(effect_key(mv), []).append(mv)
+        self._representative: Dict[int, Move] = {}
+        for members in self._classes.values():
+            for mv in members:
+                self._representative[id(mv)] = members[0]
+                found = self._by_play.setdefault((tuple(mv.cards), mv.suit), [])
+                if members[0] not in found:
+                    found.append(members[0])
+
+    @property
+    def representatives(self) -> List[Move]:
+        return [members[0] for members in self._classes.values()]
+
+    def __len__(self) -> int:
+        return len(self._classes)
+
+    def representative(self, move: Move) -> Move:
+        return self._representative[id(move)]
+
+    def members(self, move: Move) -> List[Move]:
+        return self._classes[effect_key(move)]
+
+    def find(self, cards: Iterable[Card], suit: Optional[Suit]) -> List[Move]:
+        # representatives of the moves playing `cards` in this order (one per rule that generates the play)
+        return self._by_play.get((tuple(cards), suit), [])
@@ -1,7 +1,11 @@
+from __future__ import annotations
+
+from collections import Counter
 from enum import IntEnum
 from dataclasses import dataclass
+from functools import cached_property
 from itertools import product
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator
 
 from pyrsistent import pvector, pbag
 from pyrsistent.typing import PVector, PBag
@@ -21,6 +25,12 @@ class Suit(IntEnum):
 
 
 class Value(IntEnum):
+    # TWO to SIX only occur in the French deck, whose jack, queen and king are UNDER, OVER and KING
+    TWO = 2
+    THREE = 3
+    FOUR = 4
+    FIVE = 5
+    SIX = 6
     VII = 7
     VIII = 8
     IX = 9
@@ -42,6 +52,15 @@ class Card:
     suit: Suit
     value: Value
 
+    @property
+    def code(self) -> int:
+        # a number below CARD_CODES that does not depend on the deck and is never 0
+        return (self.suit - 1) * 16 + self.value
+
+    @classmethod
+    def from_code(cls, code: int) -> Card:
+        return cls(Suit(code // 16 + 1), Value(code % 16))
+
     def __repr__(self) -> str:
         return f'({repr(self.suit)}, {repr(self.value)})'
 
@@ -55,11 +74,86 @@ class Deck:
     suits: PVector[Suit]
     values: PVector[Value]
 
+    @classmethod
+    def build(cls, suits: Iterable[Suit], values: Iterable[Value], copies: int = 1) -> Deck:
+        suits, values = pvector(suits), pvector(values)
+        if copies < 1:
+            raise ValueError('a deck needs at least one copy of every card')
+        return cls(pbag(Card(s, v) for s, v in product(suits, values) for _ in range(copies)), suits, values)
+
+    @property
+    def copies(self) -> int:
+        return max(Counter(self.cards).values())
+
+    @property
+    def value_group_size(self) -> int:
+        return max(Counter(card.value for card in self.cards).values())
+
+    @cached_property
+    def encoding(self) -> CardEncoding:
+        return CardEncoding(self.cards)
+
+
+class CardEncoding:
+    # Every card of a deck gets a field of `width` bits in an int, wide enough to count all of its copies,
+    # so a multiset of the deck's cards is a single int and adding or removing cards is integer arithmetic.
+    def __init__(self, cards: Iterable[Card]):
+        counts: Counter[Card] = Counter(cards)
+        self._cards: List[Card] = sorted(counts)
+        self._width: int = max(counts.values()).bit_length()
+        self._index: Dict[Card, int] = {card: k for k, card in enumerate(self._cards)}
+        self._units: Dict[Card, int] = {card: 1 << (k * self._width) for k, card in enumerate(self._cards)}
+        self._fields: Dict[Card, int] = {card: unit * ((1 << self._width) - 1) for card, unit in self._units.items()}
+
+    @property
+    def cards(self) -> List[Card]:
+        return self._cards
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    def index(self, card: Card) -> int:
+        return self._index[card]
+
+    def unit(self, card: Card) -> int:
+        return self._units[card]
+
+    def field(self, card: Card) -> int:
+        return self._fields.get(card, 0)
+
+    def mask(self, cards: Iterable[Card]) -> int:
+        units = self._units
+        return sum(units[card] for card in cards)
+
+    def count(self, mask: int, card: Card) -> int:
+        return (mask & self._fields.get(card, 0)) >> (self._index[card] * self._width)
+
+    def size(self, mask: int) -> int:
+        if self._width == 1:
+            return mask.bit_count()
+        return sum(self.count(mask, card) for card in self._cards)
+
+    def decode(self, mask: int) -> Iterator[Card]:
+        if self._width == 1:
+            while mask:
+                low = mask & -mask
+                yield self._cards[low.bit_length() - 1]
+                mask ^= low
+            return
+        for card in self._cards:
+            for _ in range(self.count(mask, card)):
+                yield card
+
 
 symbols: Dict[str, str] = {s.name: s.name for s in Suit} | {v.name: v.name for v in Value} | {
     "__PREFIX__": "(", "__SUFFIX__": ")", "__DELIMITER__": ", "}
 
+CARD_CODES: int = 16 * len(Suit)
 SUITS: PVector[Suit] = pvector(s for s in Suit)
-VALUES: PVector[Value] = pvector(v for v in Value)
+VALUES: PVector[Value] = pvector(v for v in Value if v >= Value.VII)
+FRENCH_VALUES: PVector[Value] = pvector(v for v in Value)
 GERMAN_CARDS: List[Card] = [Card(s, v) for s, v in product(SUITS, VALUES)]
 GERMAN_CARDS_DECK: Deck = Deck(pbag(GERMAN_CARDS), SUITS, VALUES)
+DOUBLE_GERMAN_CARDS_DECK: Deck = Deck.build(SUITS, VALUES, copies=2)
+FRENCH_CARDS_DECK: Deck = Deck.build(SUITS, FRENCH_VALUES)
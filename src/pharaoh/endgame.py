@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from enum import Enum
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple, Iterable, Set
+
+from pharaoh import instrumentation, zobrist
+from pharaoh.card import Card
+from pharaoh.evaluation import Evaluation, HeuristicEvaluation, outcome_scores
+from pharaoh.game import legal_moves, winners
+from pharaoh.game_state import GameState
+from pharaoh.move import Move
+from pharaoh.sim_state import SimState
+
+# Search of small endgames to the end of the game. Between reshuffles a game is deterministic (the stock order is part
+# of the state), so it is searched with paranoid alpha-beta: the player on the move at the root maximises their
+# outcome_scores value and the other players minimise it together (plain minimax with two players). A reshuffle of
+# different cards is a chance node with too many outcomes to search and a position repeated on the searched line (e.g.
+# drawing from an empty stock) would never end; both are scored by `evaluation` and the solution is no longer exact.
+# Searches over the node or time budget are not solved. Values and bounds are kept in a table that lives across
+# searches, keyed by the zobrist hash with the finishing move counts replaced by the finishing order, and the root
+# player.
+Key = Tuple[int, Tuple[int, ...], int]
+
+
+class Bound(Enum):
+    EXACT = 'exact'
+    LOWER = 'lower'
+    UPPER = 'upper'
+
+
+Entry = Tuple[float, Bound, bool]
+
+
+class _Unsolved(Exception):
+    pass
+
+
+class _Reshuffle:
+    # the rng of the search: keeps the order of the cards going to the stock and notes if the order was left to chance
+    def __init__(self):
+        self.chance: bool = False
+
+    def shuffle(self, cards: List[Card]) -> None:
+        self.chance = self.chance or len(set(cards)) > 1
+
+
+@dataclass(frozen=True)
+class Solution:
+    move: Move
+    # outcome_scores value of the move for the player on the move, exact if no reshuffle had to be evaluated
+    value: float
+    exact: bool
+    nodes: int
+    elapsed: float
+
+
+class EndgameSolver:
+    def __init__(self, moves: Iterable[Move], max_cards: int = 6, max_stock: int = 6, max_nodes: int = 2_000,
+                 time_limit: Optional[float] = None, evaluation: Optional[Evaluation] = None,
+                 capacity: int = 1_000_000):
+        # positions qualify when the players still in the game hold at most `max_cards` cards together and the stock
+        # has at most `max_stock` cards (with a long stock the lines where players draw are too long to search); the
+        # table is cleared when it holds `capacity` positions
+        if max_nodes < 1:
+            raise ValueError('max_nodes must be at least 1')
+        self._moves = moves
+        self.max_cards = max_cards
+        self.max_stock = max_stock
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.evaluation: Evaluation = HeuristicEvaluation() if evaluation is None else evaluation
+        self._capacity = capacity
+        self._table: Dict[Key, Entry] = {}
+        self._reshuffle = _Reshuffle()
+        self._line: Set[Key] = set()
+        self._root: int = 0
+        self._searched: int = 0
+        self._deadline: Optional[float] = None
+        self.nodes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.solved: int = 0
+        self.exact: int = 0
+        self.unsolved: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def counters(self) -> Dict[str, float]:
+        return {'solved': self.solved, 'exact': self.exact, 'unsolved': self.unsolved, 'nodes': self.nodes,
+                'size': len(self), 'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate}
+
+    def clear(self) -> None:
+        self._table.clear()
+
+    def applies(self, state: GameState) -> bool:
+        cards: int = sum(len(hand) for hand, mc in zip(state.lp, state.lp_mc) if mc == -1)
+        return cards <= self.max_cards and len(state.st) <= self.max_stock
+
+    def solve(self, state: GameState) -> Optional[Solution]:
+        # the best move of the player on the move, None if the position can not be solved within the budgets
+        start: float = perf_counter()
+        self._deadline = None if self.time_limit is None else start + self.time_limit
+        self._root = state.i
+        self._searched = 0
+        sim = SimState(state)
+        self._line = {self._key(sim)}
+        try:
+            move, value, exact = self._best(sim, -1.0, 1.0)
+        except _Unsolved:
+            solution = None
+        else:
+            solution = Solution(move, value, exact, self._searched, perf_counter() - start)
+        self._record(solution, self._searched, perf_counter() - start)
+        return solution
+
+    def _record(self, solution: Optional[Solution], nodes: int, elapsed: float) -> None:
+        self.nodes += nodes
+        if solution is None:
+            self.unsolved += 1
+        else:
+            self.solved += 1
+            self.exact += solution.exact
+        collector = instrumentation.collector
+        if collector is not None:
+            collector.count('endgame.solved' if solution else 'endgame.unsolved')
+            if solution is not None and solution.exact:
+                collector.count('endgame.exact')
+            collector.count('endgame.nodes', nodes)
+            collector.observe('endgame.search', elapsed)
+
+    def _key(self, state: SimState) -> Key:
+        out: List[Tuple[int, int]] = sorted((mc, seat) for seat, mc in enumerate(state.lp_mc) if mc != -1)
+        h: int = state.zobrist - sum(zobrist.lp_mc_key(seat, mc) for mc, seat in out)
+        return h & zobrist.MASK64, tuple(seat for _, seat in out), self._root
+
+    def _value(self, state: SimState, alpha: float, beta: float) -> Tuple[float, bool]:
+        order: Optional[List[int]] = winners(state)  # type: ignore
+        if order is not None:
+            return outcome_scores(order)[self._root], True
+        key: Key = self._key(state)
+        if key in self._line:
+            return self.evaluation(state)[self._root], False  # type: ignore
+        entry: Optional[Entry] = self._table.get(key)
+        if entry is not None:
+            value, bound, exact = entry
+            if bound is Bound.EXACT or bound is Bound.LOWER and value >= beta or \
+                    bound is Bound.UPPER and value <= alpha:
+                self.hits += 1
+                return value, exact
+        self.misses += 1
+        self._line.add(key)
+        try:
+            _, value, exact = self._best(state, alpha, beta)
+        finally:
+            self._line.discard(key)
+        bound = Bound.UPPER if value <= alpha else Bound.LOWER if value >= beta else Bound.EXACT
+        if len(self._table) >= self._capacity:
+            self._table.clear()
+        self._table[key] = value, bound, exact
+        return value, exact
+
+    def _best(self, state: SimState, alpha: float, beta: float) -> Tuple[Move, float, bool]:
+        self._searched += 1
+        if self._searched > self.max_nodes:
+            raise _Unsolved('node budget')
+        if self._deadline is not None and self._searched % 256 == 0 and perf_counter() > self._deadline:
+            raise _Unsolved('time budget')
+        maximise: bool = state.i == self._root
+        best: Optional[Tuple[Move, float]] = None
+        exact: bool = True
+        # moves playing more cards first: they end the game sooner and cut off the other moves more often
+        for move in sorted(legal_moves(state, self._moves), key=lambda mv: -len(mv.cards)):  # type: ignore
+            self._reshuffle.chance = False
+            state.apply(move, self._reshuffle)  # type: ignore
+            try:
+                if self._reshuffle.chance:
+                    value, known = self.evaluation(state)[self._root], False  # type: ignore
+                else:
+                    value, known = self._value(state, alpha, beta)
+            finally:
+                state.undo()
+            exact = exact and known
+            if best is None or (value > best[1] if maximise else value < best[1]):
+                best = move, value
+            if maximise:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+        if best is None:
+            raise _Unsolved('no legal move')
+        return best[0], best[1], exact
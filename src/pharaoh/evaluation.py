@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from math import exp
+from typing import List, Callable, Sequence
+
+from pharaoh.card import Suit, Value
+from pharaoh.game_state import GameState
+
+# Evaluations score positions where a playout stops at the depth limit before the game is finished. A score is given
+# per seat and uses the scale of a finished playout (outcome_scores): +1 for the winner, -1 for the last player and
+# 0 for the others. A graded score is the expected value of that outcome, so it backpropagates like a real result.
+# The state may be a SimState. Evaluations are pickled to root-parallel workers.
+Evaluation = Callable[[GameState], List[float]]
+
+
+def outcome_scores(order: Sequence[int]) -> List[float]:
+    # `order` lists the seats in finishing order (game.winners)
+    scores: List[float] = [0.0] * len(order)
+    scores[order[0]] += 1.0
+    scores[order[-1]] -= 1.0
+    return scores
+
+
+def _shares(weights: List[float]) -> List[float]:
+    top = max(weights)
+    exps = [exp(w - top) for w in weights]
+    total = sum(exps)
+    return [e / total for e in exps]
+
+
+@dataclass(frozen=True)
+class HeuristicEvaluation:
+    # Estimates how many cards every player still has to get rid of: the hand size, the pending draws (after sevens)
+    # and waits (after aces) of the player on the move unless they can answer them, and a penalty for every suit
+    # missing from the hand (fewer suits, fewer cards to follow with). The chances to win and to finish last are
+    # softmax shares of these estimates; `temperature` is the difference in cards that makes a player e times as
+    # likely to win.
+    hand: float = 1.0
+    draws: float = 1.0
+    waits: float = 1.0
+    suits: float = 0.5
+    temperature: float = 2.0
+
+    def __post_init__(self):
+        if self.temperature <= 0:
+            raise ValueError('temperature must be positive')
+
+    def cards_left(self, state: GameState, seat: int) -> float:
+        cards = state.lp[seat]
+        estimate: float = self.hand * len(cards)
+        if seat == state.i and (state.cnt > 1 or state.ace > 0):
+            answer: Value = Value.VII if state.cnt > 1 else Value.ACE
+            if not any(card.value == answer for card in cards):
+                estimate += self.draws * state.cnt if state.cnt > 1 else self.waits * state.ace
+        if cards:
+            estimate += self.suits * (len(Suit) - len({card.suit for card in cards}))
+        return estimate
+
+    def __call__(self, state: GameState) -> List[float]:
+        scores: List[float] = [0.0] * len(state.lp)
+        playing: List[int] = [seat for seat, mc in enumerate(state.lp_mc) if mc == -1]
+        left: List[float] = [self.cards_left(state, seat) / self.temperature for seat in playing]
+        out: List[int] = sorted((seat for seat, mc in enumerate(state.lp_mc) if mc != -1), key=state.lp_mc.__getitem__)
+        if out:
+            scores[out[0]] += 1.0
+        else:
+            for seat, share in zip(playing, _shares([-x for x in left])):
+                scores[seat] += share
+        for seat, share in zip(playing, _shares(left)):
+            scores[seat] -= share
+        return scores
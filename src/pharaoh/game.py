@@ -1,25 +1,62 @@
-from typing import List, Iterable, Tuple, Optional
+from __future__ import annotations
 
-from pyrsistent import pvector
-from pyrsistent.typing import PVector
+from random import Random
+from time import perf_counter
+from typing import List, Iterable, Tuple, Optional, Sequence, Iterator, NamedTuple, TYPE_CHECKING
 
+from pharaoh import instrumentation
 from pharaoh.card import Deck
 from pharaoh.game_state import GameState
+from pharaoh.move_cache import MoveTableCache, move_cache
+from pharaoh.move_index import MoveIndex
+from pharaoh.rng import GameRandom
 from pharaoh.rule import Move, Rule
 
+if TYPE_CHECKING:
+    from pharaoh.player import Player
 
-def create_game(ruleset: Iterable[Rule], deck: Deck, player_count: int, init_cards: int) \
-        -> Tuple[GameState, PVector[Move]]:
-    moves: List[Move] = []
-    for rule in ruleset:
-        moves.extend(rule.generate_moves(deck, player_count))
-    return GameState.init_state(deck, player_count, init_cards), pvector(moves)
+
+# decks with more cards of one value than this get a parametric move table unless create_game is told otherwise
+PARAMETRIC_GROUP_SIZE: int = 4
+
+
+def create_game(ruleset: Iterable[Rule], deck: Deck, player_count: int, init_cards: int,
+                compact_hands: bool = False, cache: Optional[MoveTableCache] = move_cache, canonical: bool = False,
+                parametric: Optional[bool] = None, rng: Optional[GameRandom] = None) -> Tuple[GameState, MoveIndex]:
+    # the move table is shared by every game with the same ruleset, deck and player count unless cache is None;
+    # a canonical table keeps one move per class of effect-equivalent moves (see pharaoh.canonical), a parametric one
+    # generates the plays from the hand of the player on the move (see pharaoh.parametric); the deal is shuffled with
+    # the deal stream of `rng` if given
+    if cache is None:
+        cache = MoveTableCache()
+    if parametric is None:
+        parametric = not canonical and deck.value_group_size > PARAMETRIC_GROUP_SIZE
+    moves: MoveIndex = cache.moves(ruleset, deck, player_count, canonical, parametric)
+    if rng is None:
+        return GameState.init_state(deck, player_count, init_cards, compact_hands=compact_hands), moves
+    return GameState.init_state(deck, player_count, init_cards, rng.deal.shuffle, compact_hands=compact_hands), moves
 
 
 def legal_moves(state: GameState, moves: Iterable[Move]) -> List[Move]:
+    if instrumentation.collector is not None:
+        return _legal_moves_instrumented(state, moves, instrumentation.collector)
+    if isinstance(moves, MoveIndex):
+        return moves.legal(state)
     return [mv for mv in moves if mv.test(state)]
 
 
+def _legal_moves_instrumented(state: GameState, moves: Iterable[Move], collector: instrumentation.Collector) \
+        -> List[Move]:
+    start = perf_counter()
+    candidates: List[Move] = [mv for _, mv in moves.candidates(state)] if isinstance(moves, MoveIndex) else \
+        list(moves)
+    legal: List[Move] = [mv for mv in candidates if mv.test(state)]
+    collector.observe('game.legal_moves', perf_counter() - start)
+    collector.count('game.legal_moves.tested', len(candidates))
+    collector.count('game.legal_moves.passed', len(legal))
+    return legal
+
+
 def finished(state: GameState) -> bool:
     return state.lp_mc.count(-1) == 1
 
@@ -28,6 +65,67 @@ def winners(state: GameState) -> Optional[List[int]]:
     if not finished(state):
         return None
     final_lp_mc = state.lp_mc.set(state.lp_mc.index(-1), state.mc)
-    order = list(zip(final_lp_mc, range(10)))
+    order = list(zip(final_lp_mc, range(len(final_lp_mc))))
     order.sort()
     return [x[1] for x in order]
+
+
+class GameStep(NamedTuple):
+    state: GameState
+    move: Move
+    next_state: GameState
+
+
+def game_steps(state: GameState, players: Sequence[Player], moves: Iterable[Move], max_moves: int = 1000,
+               rng: Optional[GameRandom] = None) -> Iterator[GameStep]:
+    # The game loop as a generator of the moves played: the caller decides what to keep and stops the game early by
+    # leaving the loop, the next_state of the last step is the position to continue from. With `rng` the players get
+    # the streams of their seats for the game (their own rngs are put back when it ends or the generator is closed)
+    # and reshuffles use its reshuffle stream, so the game only depends on the seed.
+    if len(players) != len(state.lp):
+        raise Exception('Incompatible game state: len(players) != len(state.lp)')
+
+    reshuffle: Optional[Random] = None
+    saved: List[Optional[Random]] = []
+    if rng is not None:
+        reshuffle = rng.reshuffle
+        saved = [player.rng for player in players]
+        for seat, player in enumerate(players):
+            player.rng = rng.seat(seat)
+    played: int = 0
+    try:
+        while not finished(state):
+            legal: List[Move] = legal_moves(state, moves)
+            next_move: Move = players[state.i].play(state, legal)
+            next_state: GameState = next_move.apply(state, reshuffle)
+            played += 1
+            yield GameStep(state, next_move, next_state)
+            state = next_state
+            if state.mc == max_moves:
+                break
+    finally:
+        # also when the caller stops the game early (closes the generator)
+        for player, own in reversed(list(zip(players, saved))):
+            player.rng = own
+        if instrumentation.collector is not None:
+            instrumentation.collector.count('game.games')
+            instrumentation.collector.count('game.moves', played)
+
+
+def final_state(state: GameState, players: Sequence[Player], moves: Iterable[Move], max_moves: int = 1000,
+                rng: Optional[GameRandom] = None) -> GameState:
+    for step in game_steps(state, players, moves, max_moves, rng):
+        state = step.next_state
+    return state
+
+
+def play_game(state: GameState, players: Sequence[Player], moves: Iterable[Move], max_moves: int = 1000,
+              rng: Optional[GameRandom] = None) -> Tuple[List[GameState], List[Move]]:
+    state_history: List[GameState] = []
+    move_history: List[Move] = []
+    for step in game_steps(state, players, moves, max_moves, rng):
+        state_history.append(step.state)
+        move_history.append(step.move)
+        state = step.next_state
+    state_history.append(state)
+    return state_history, move_history
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
-from random import shuffle
-from typing import List, Iterable, Callable
+from collections import Counter
+from contextlib import contextmanager
+from enum import Enum
+from random import shuffle, Random
+from typing import List, Iterable, Callable, Optional, Tuple, Iterator
 
 from pyrsistent import field, pvector_field, PClass, pbag
 from pyrsistent.typing import PBag, PVector
 
-from pharaoh.card import Suit, Card, Value, Deck
+from pharaoh.card import Suit, Card, Value, Deck, CardEncoding
+from pharaoh.zobrist import full_hash
 
 Pile = PVector[Card]
 
@@ -18,6 +22,9 @@ class Hand:
     def __contains__(self, elt) -> bool:
         return self._bag.__contains__(elt)
 
+    def count(self, elt) -> int:
+        return self._bag.count(elt)
+
     def __sub__(self, other) -> Hand:
         return self.__class__(self._bag.__sub__(other))
 
@@ -27,6 +34,14 @@ class Hand:
     def __len__(self):
         return len(self._bag)
 
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Hand):
+            return NotImplemented
+        return self._bag == other._bag
+
+    def __hash__(self) -> int:
+        return hash(self._bag)
+
     def __iter__(self):
         return self._bag.__iter__()
 
@@ -34,6 +49,150 @@ class Hand:
         return f'{self.__class__.__name__}({", ".join(str(x) for x in self._bag)})'
 
 
+class BitHand(Hand):
+    # Hand stored as an int in the deck's CardEncoding; the Hand API works on top of it.
+    def __init__(self, cards: Iterable[Card], encoding: CardEncoding):
+        self._enc = encoding
+        self._mask: int = encoding.mask(cards)
+        self._len: int = encoding.size(self._mask)
+
+    @classmethod
+    def from_mask(cls, mask: int, encoding: CardEncoding, size: Optional[int] = None) -> BitHand:
+        hand = cls.__new__(cls)
+        hand._enc = encoding
+        hand._mask = mask
+        hand._len = encoding.size(mask) if size is None else size
+        return hand
+
+    @property
+    def mask(self) -> int:
+        return self._mask
+
+    @property
+    def encoding(self) -> CardEncoding:
+        return self._enc
+
+    @property
+    def _bag(self) -> PBag[Card]:
+        return pbag(self)
+
+    def __contains__(self, elt) -> bool:
+        return self._mask & self._enc.field(elt) != 0
+
+    def count(self, elt) -> int:
+        return self._enc.count(self._mask, elt) if elt in self._enc.cards else 0
+
+    def __sub__(self, other) -> BitHand:
+        # removes every card as often as `other` holds it, at most as often as the hand does (like a pbag); cards
+        # outside the deck are ignored
+        if self._enc.width == 1:
+            fields: int = 0
+            for card in other:
+                fields |= self._enc.field(card)
+            return self.from_mask(self._mask & ~fields, self._enc)
+        removed: List[Card] = [c for c, n in Counter(other).items() for _ in range(min(self.count(c), n))]
+        return self.from_mask(self._mask - self._enc.mask(removed), self._enc, self._len - len(removed))
+
+    def update(self, iterable) -> BitHand:
+        cards = list(iterable)
+        return self.from_mask(self._mask + self._enc.mask(cards), self._enc, self._len + len(cards))
+
+    def __len__(self):
+        return self._len
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, BitHand) and other._enc is self._enc:
+            return self._mask == other._mask
+        return super().__eq__(other)
+
+    def __hash__(self) -> int:
+        return super().__hash__()
+
+    def __iter__(self):
+        return self._enc.decode(self._mask)
+
+
+class ValidationMode(Enum):
+    FULL = 'full'
+    SAMPLED = 'sampled'
+    OFF = 'off'
+
+
+def state_checks(s: GameState) -> Tuple[Tuple[bool, str], ...]:
+    return ((len(s.dp) > 0, 'discard pile can not be empty'),
+            (len(s.lp) > 1, 'at least 2 players must play'),
+            (s.i < len(s.lp), 'index must be smaller than number of players'),
+            (len(s.lp_mc) == len(s.lp), "size of LP_MC must match size of LP"),
+            (s.cnt == 0 or len(s.st) > 0 or len(s.dp) == 1, "cnt==0 or len(st)>0 or len(dp)==1"),
+            (any(x == -1 for x in s.lp_mc), "at least one player must be in game"),
+            (not s.ace == 0 or s.cnt > 0, 'ace == 0 implies cnt > 0'),
+            (not s.ace > 0 or s.cnt == 0, 'ace > 0 implies cnt == 0'),
+            (s.deck_size == sum(map(len, s.lp)) + len(s.dp) + len(s.st), 'card disappeared'),
+            (s.lp_mc[s.i] == -1, 'finished player is on the move'))
+
+
+def state_errors(s: GameState) -> List[str]:
+    # the invariant checks and, as it rehashes the whole position, the zobrist hash (for the auditor and tests only)
+    errors: List[str] = [msg for ok, msg in state_checks(s) if not ok]
+    if s.zh is not None and s.zh != full_hash(s):
+        errors.append('zobrist hash is stale')
+    return errors
+
+
+class Validation:
+    # Decides which new states run the GameState invariant: every state (FULL, for tests), every `every`-th state
+    # or a `rate` fraction of states (SAMPLED, for canaries) or none (OFF, the default).
+    _PASSED: Tuple[bool, str] = (True, 'not checked')
+
+    def __init__(self, mode: ValidationMode = ValidationMode.OFF, every: int = 1, rate: Optional[float] = None,
+                 seed: Optional[int] = None):
+        self.mode: ValidationMode = mode
+        self.every: int = every
+        self.rate: Optional[float] = rate
+        self.checked: int = 0
+        self._counter: int = 0
+        self._random: Random = Random(seed)
+
+    def configure(self, mode: ValidationMode, every: int = 1, rate: Optional[float] = None) -> None:
+        if every < 1:
+            raise ValueError('every must be at least 1')
+        if rate is not None and not 0 <= rate <= 1:
+            raise ValueError('rate must be in [0, 1]')
+        self.mode, self.every, self.rate = mode, every, rate
+        self._counter = 0
+
+    @contextmanager
+    def mode_set_to(self, mode: ValidationMode, every: int = 1, rate: Optional[float] = None) -> Iterator[None]:
+        previous = self.mode, self.every, self.rate
+        self.configure(mode, every, rate)
+        try:
+            yield
+        finally:
+            self.configure(*previous)
+
+    def _sampled(self) -> bool:
+        if self.rate is not None:
+            return self._random.random() < self.rate
+        self._counter += 1
+        if self._counter < self.every:
+            return False
+        self._counter = 0
+        return True
+
+    def check(self, s: GameState) -> Tuple[Tuple[bool, str], ...] | Tuple[bool, str]:
+        if self.mode is ValidationMode.OFF or self.mode is ValidationMode.SAMPLED and not self._sampled():
+            return self._PASSED
+        self.checked += 1
+        return state_checks(s)
+
+
+validation: Validation = Validation()
+
+
+def set_validation_mode(mode: ValidationMode, every: int = 1, rate: Optional[float] = None) -> None:
+    validation.configure(mode, every, rate)
+
+
 class GameState(PClass):
     dp: Pile = pvector_field(Card)
     st: Pile = pvector_field(Card)
@@ -46,24 +205,20 @@ class GameState(PClass):
     i: int = field(type=int, mandatory=True, invariant=lambda x: (x >= 0, 'index can not be negative'))
     mc: int = field(type=int, mandatory=True)
     deck_size: int = field(type=int, mandatory=True)
-    __invariant__: Callable = \
-        lambda s: ((len(s.dp) > 0, 'discard pile can not be empty'),
-                   (len(s.lp) > 1, 'at least 2 players must play'),
-                   (s.i < len(s.lp), 'index must be smaller than number of players'),
-                   (len(s.lp_mc) == len(s.lp), "size of LP_MC must match size of LP"),
-                   (s.cnt == 0 or len(s.st) > 0 or len(s.dp) == 1, "cnt==0 or len(st)>0 or len(dp)==1"),
-                   (any(x == -1 for x in s.lp_mc), "at least one player must be in game"),
-                   (not s.ace == 0 or s.cnt > 0, 'ace == 0 implies cnt > 0'),
-                   (not s.ace > 0 or s.cnt == 0, 'ace > 0 implies cnt == 0'),
-                   (s.deck_size == sum(map(len, s.lp)) + len(s.dp) + len(s.st), 'card disappeared'),
-                   (s.lp_mc[s.i] == -1, 'finished player is on the move'))
+    # incrementally updated zobrist hash of the position, None if it was not computed yet
+    zh: Optional[int] = field(type=(int, type(None)), initial=None)
+    __invariant__: Callable = lambda s: validation.check(s)
 
     def __getitem__(self, name: str) -> Pile | PVector | int | Suit | Value:
         return self.__getattribute__(name)
 
+    @property
+    def zobrist(self) -> int:
+        return full_hash(self) if self.zh is None else self.zh
+
     @classmethod
     def init_state(cls, deck: Deck, player_cnt: int, init_cards: int,
-                   mix_cards: Callable[[List[Card]], None] = shuffle) -> GameState:
+                   mix_cards: Callable[[List[Card]], None] = shuffle, compact_hands: bool = False) -> GameState:
         cards_list: List[Card] = [*deck.cards]
         mix_cards(cards_list)
         top: Card = cards_list.pop()
@@ -82,10 +237,10 @@ class GameState(PClass):
         else:
             cnt = 1
             ace = 0
-        return cls(
+        state = cls(
             dp=(top,),
             st=cards_list,
-            lp=(Hand(h) for h in hands),
+            lp=(BitHand(h, deck.encoding) if compact_hands else Hand(h) for h in hands),
             ace=ace,
             suit=top.suit,
             val=top.value,
@@ -95,3 +250,4 @@ class GameState(PClass):
             lp_mc=(-1,) * player_cnt,
             deck_size=len(deck.cards)
         )
+        return state.set(zh=full_hash(state))
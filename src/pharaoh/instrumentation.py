@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Iterator, List
+
+# Counters and timers of the game loop, moves and MCTS. Instrumented code checks the module-level `collector` and does
+# nothing else while it is None, so the hooks cost one attribute lookup when no collector is attached.
+
+
+class Collector:
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+        # name -> [count, total, min, max]
+        self.observations: Dict[str, List[float]] = {}
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, value: float) -> None:
+        entry = self.observations.get(name)
+        if entry is None:
+            self.observations[name] = [1, value, value, value]
+            return
+        entry[0] += 1
+        entry[1] += value
+        entry[2] = min(entry[2], value)
+        entry[3] = max(entry[3], value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'counters': dict(self.counters),
+            'observations': {name: {'count': int(count), 'total': total, 'mean': total / count, 'min': low,
+                                    'max': high}
+                             for name, (count, total, low, high) in self.observations.items()},
+        }
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.observations.clear()
+
+
+collector: Optional[Collector] = None
+
+
+def attach(new: Optional[Collector] = None) -> Collector:
+    global collector
+    collector = new if new is not None else Collector()
+    return collector
+
+
+def detach() -> Optional[Collector]:
+    global collector
+    old, collector = collector, None
+    return old
+
+
+@contextmanager
+def collecting(new: Optional[Collector] = None) -> Iterator[Collector]:
+    global collector
+    old = collector
+    try:
+        yield attach(new)
+    finally:
+        collector = old
+
+
+def snapshot() -> Dict[str, Any]:
+    return collector.snapshot() if collector is not None else {'counters': {}, 'observations': {}}
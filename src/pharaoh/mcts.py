@@ -1,30 +1,104 @@
 from __future__ import annotations
+
+import os
+import random
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
+from enum import Enum
+from heapq import nlargest
 from math import sqrt, log
-from random import choice as rand_choice
-from typing import List, Optional, Iterable
+from time import perf_counter
+from typing import List, Optional, Iterable, Sequence, Dict, Tuple
 
+from pharaoh import instrumentation
+from pharaoh.evaluation import Evaluation, outcome_scores
 from pharaoh.game import finished, legal_moves, winners
 from pharaoh.game_state import GameState
 from pharaoh.move import Move
+from pharaoh.move_index import MoveIndex, MoveKey
+from pharaoh.rollout import RolloutPolicy, RandomRollout
+from pharaoh.sim_state import SimState
 
 
 class MonteCarloException(Exception):
     pass
 
 
+@dataclass
+class Stats:
+    visits: int = 0
+    wins: float = 0
+
+
+class TranspositionTable:
+    # Shares node statistics between all nodes holding the same position (same zobrist hash). Holds at most `capacity`
+    # positions and evicts the least recently used one; nodes keep the statistics of evicted positions.
+    def __init__(self, capacity: int = 100_000):
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        self._capacity = capacity
+        self._entries: OrderedDict[int, Stats] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, state: GameState) -> bool:
+        return state.zobrist in self._entries
+
+    def stats_for(self, state: GameState) -> Stats:
+        key: int = state.zobrist
+        stats: Optional[Stats] = self._entries.get(key)
+        if stats is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return stats
+        self.misses += 1
+        stats = self._entries[key] = Stats()
+        if len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return stats
+
+    def counters(self) -> Dict[str, float]:
+        return {'size': len(self), 'capacity': self._capacity, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'hit_rate': self.hit_rate}
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
 @dataclass
 class Node:
     state: GameState = field(repr=False)
     move: Optional[Move] = field(repr=False)
     parent: Optional[Node] = field(repr=False)
     children: List[Node] = field(default_factory=list, repr=False)
-    visits: int = 0
-    wins: int = 0
+    stats: Stats = field(default_factory=Stats)
 
     UCT_MAX = 2 ** 64
     EXPL_CONST = sqrt(2)
 
+    @property
+    def visits(self) -> int:
+        return self.stats.visits
+
+    @property
+    def wins(self) -> float:
+        return self.stats.wins
+
     @property
     def _player_no(self) -> int:
         return (self.state.i - 1) % len(self.state.lp)
@@ -54,39 +128,137 @@ class Node:
             raise MonteCarloException("Can not expand - terminal node")
         self.children.extend(children)
 
-    def update_score(self, result: Optional[List[int]]) -> None:
-        self.visits += 1
-        if result is None:
-            return
-        if result[0] == self._player_no:
-            self.wins += 1
-        elif result[-1] == self._player_no:
-            self.wins -= 1
+    def update_score(self, result: Optional[Sequence[float]]) -> None:
+        # `result` holds a score per seat (evaluation.outcome_scores or an Evaluation), None counts only the visit
+        self.stats.visits += 1
+        if result is not None:
+            self.stats.wins += result[self._player_no]
+
+
+class StopReason(Enum):
+    FORCED = 'forced'
+    ITERATIONS = 'iterations'
+    DEADLINE = 'deadline'
+    DECIDED = 'decided'
+    SOLVED = 'solved'
+
+
+@dataclass(frozen=True)
+class SearchStats:
+    move: Move
+    iterations: int
+    elapsed: float
+    reason: StopReason
+
+    @property
+    def iterations_per_second(self) -> float:
+        return self.iterations / self.elapsed if self.elapsed else 0.0
 
 
 class MCTS:
     _root: Node
     _moves: Iterable[Move]
+    stats: Optional[SearchStats] = None
     ITERATIONS: int = 50
     DEPTH: int = 50
+    MUTABLE_PLAYOUTS: bool = True
+    EARLY_STOP: bool = True
 
-    def __init__(self, state: GameState, moves: Iterable[Move]):
-        self._root = Node(state, None, None)
+    def __init__(self, state: GameState, moves: Iterable[Move], iterations: Optional[int] = None,
+                 table: Optional[TranspositionTable] = None, rng: Optional[random.Random] = None,
+                 policy: Optional[RolloutPolicy] = None, evaluation: Optional[Evaluation] = None,
+                 depth: Optional[int] = None):
+        # `rng` chooses the playout moves and shuffles simulated reshuffles, without it the random module does;
+        # `policy` chooses the playout moves (uniformly at random by default); `evaluation` scores playouts cut off
+        # after `depth` moves (without it they only count as a visit)
+        self.rng: Optional[random.Random] = rng
+        self.policy: RolloutPolicy = RandomRollout() if policy is None else policy
+        self.evaluation: Optional[Evaluation] = evaluation
+        self.depth: int = self.DEPTH if depth is None else depth
+        self._table = table
+        self._root = self._node(state, None, None)
         self._moves = moves
+        self._iterations: int = self.ITERATIONS if iterations is None else iterations
+
+    def _node(self, state: GameState, move: Optional[Move], parent: Optional[Node]) -> Node:
+        if self._table is None:
+            return Node(state, move, parent)
+        return Node(state, move, parent, stats=self._table.stats_for(state))
+
+    @property
+    def root(self) -> Node:
+        return self._root
 
-    def search(self) -> Move:
-        if len(legal_moves(self._root.state, self._moves)) == 1:
-            return legal_moves(self._root.state, self._moves)[0]
-        for i in range(self._root.visits, self.ITERATIONS):
-            print(i, end=' ')
+    def search(self, time_limit: Optional[float] = None) -> Move:
+        return self.run(time_limit).move
+
+    def run(self, time_limit: Optional[float] = None) -> SearchStats:
+        # Anytime search: stops after the iteration budget (counting visits the root already has), when `time_limit`
+        # seconds have passed or when the most visited root child can not be overtaken in the remaining budget. The root
+        # is always expanded, so a move is found even when the time is up before the first iteration.
+        start: float = perf_counter()
+        legal: List[Move] = legal_moves(self._root.state, self._moves)
+        if len(legal) == 1:
+            self.stats = SearchStats(legal[0], 0, perf_counter() - start, StopReason.FORCED)
+            self._record(self.stats)
+            return self.stats
+        deadline: Optional[float] = None if time_limit is None else start + time_limit
+        done: int = 0
+        reason: StopReason = StopReason.ITERATIONS
+        for i in range(0 if self._root.is_leaf else self._root.visits, self._iterations):
+            now = perf_counter()
+            if deadline is not None and now >= deadline and not self._root.is_leaf:
+                reason = StopReason.DEADLINE
+                break
+            remaining: float = self._iterations - i
+            if deadline is not None and done:
+                remaining = min(remaining, (deadline - now) * done / (now - start))
+            if self.EARLY_STOP and self._decided(remaining):
+                reason = StopReason.DECIDED
+                break
             leaf: Node = self._select_next()
-            leaf.expand(Node(mv.apply(leaf.state), mv, leaf) for mv in legal_moves(leaf.state, self._moves))
+            leaf.expand(self._node(mv.apply(leaf.state, self.rng), mv, leaf)
+                        for mv in legal_moves(leaf.state, self._moves))
             while len(leaf.children) == 1:
                 leaf = leaf.children[0]
             simulation_result = self._random_playout(leaf)
             self._backpropagate(leaf, simulation_result)
-        print()
-        return self._best_move()
+            done += 1
+        self.stats = SearchStats(self._best_move(), done, perf_counter() - start, reason)
+        self._record(self.stats)
+        return self.stats
+
+    @staticmethod
+    def _record(stats: SearchStats) -> None:
+        collector = instrumentation.collector
+        if collector is not None:
+            collector.count('mcts.searches')
+            collector.count(f'mcts.stop.{stats.reason.value}')
+            collector.count('mcts.iterations', stats.iterations)
+            collector.observe('mcts.search', stats.elapsed)
+
+    def _decided(self, remaining: float) -> bool:
+        if len(self._root.children) < 2:
+            return False
+        first, second = nlargest(2, (child.visits for child in self._root.children))
+        return first - second > remaining
+
+    def advance(self, state: GameState) -> bool:
+        # Moves the root to the descendant holding `state` (every move increments mc, so it can only be on the level
+        # state.mc - root.mc) and keeps its statistics. Returns False if the tree does not contain the state.
+        depth: int = state.mc - self._root.state.mc
+        if depth < 0:
+            return False
+        level: List[Node] = [self._root]
+        for _ in range(depth):
+            level = [child for node in level for child in node.children]
+        for node in level:
+            if node.state == state:
+                node.parent = None
+                node.move = None
+                self._root = node
+                return True
+        return False
 
     def _select_next(self) -> Node:
         node: Node = self._root
@@ -94,17 +266,39 @@ class MCTS:
             node = node.best_child()
         return node
 
-    def _random_playout(self, leaf: Node) -> Optional[List[int]]:
+    def _random_playout(self, leaf: Node) -> Optional[List[float]]:
+        if self.MUTABLE_PLAYOUTS:
+            return self._random_playout_in_place(SimState(leaf.state))
         state: GameState = leaf.state
+        choose, rnd = self.policy.choose, random if self.rng is None else self.rng
+        cnt: int = 0
+        while not finished(state) and cnt < self.depth:
+            cnt += 1
+            move: Move = choose(state, legal_moves(state, self._moves), rnd)
+            state = move.apply(state, self.rng)
+        return self._playout_result(state, cnt)
+
+    def _random_playout_in_place(self, state: SimState) -> Optional[List[float]]:
+        choose, rnd = self.policy.choose, random if self.rng is None else self.rng
         cnt: int = 0
-        while not finished(state) and cnt < self.DEPTH:
+        while not finished(state) and cnt < self.depth:
             cnt += 1
-            move: Move = rand_choice(legal_moves(state, self._moves))
-            state = move.apply(state)
-        return winners(state)
+            state.apply(choose(state, legal_moves(state, self._moves), rnd), self.rng)  # type: ignore
+        return self._playout_result(state, cnt)
+
+    def _playout_result(self, state, length: int) -> Optional[List[float]]:
+        order: Optional[List[int]] = winners(state)
+        collector = instrumentation.collector
+        if collector is not None:
+            collector.observe('mcts.playout_length', length)
+            if order is None:
+                collector.count('mcts.depth_cutoffs')
+        if order is not None:
+            return outcome_scores(order)
+        return None if self.evaluation is None else self.evaluation(state)
 
     @staticmethod
-    def _backpropagate(leaf: Node, result: Optional[List[int]]) -> None:
+    def _backpropagate(leaf: Node, result: Optional[Sequence[float]]) -> None:
         node: Optional[Node] = leaf
         while node is not None:
             node.update_score(result)
@@ -116,3 +310,99 @@ class MCTS:
         if best_node.move is None:
             raise MonteCarloException("Node's move is None")
         return best_node.move
+
+
+# Root parallelisation: every worker process searches its own tree from the same root with a different seed and only
+# the visit counts of the root's children (keyed by MoveIndex.key, the move's position in the move table or the cards
+# of a generated move) are sent back and merged.
+_worker_moves: MoveIndex = MoveIndex(())
+_worker_policy: Optional[RolloutPolicy] = None
+_worker_evaluation: Optional[Evaluation] = None
+_worker_depth: Optional[int] = None
+
+
+def _index(moves: Sequence[Move]) -> MoveIndex:
+    return moves if isinstance(moves, MoveIndex) else MoveIndex(moves)
+
+
+def _key_order(key: MoveKey) -> Tuple[int, MoveKey]:
+    return (0, key) if isinstance(key, int) else (1, key)
+
+
+def _init_worker(moves: MoveIndex, policy: Optional[RolloutPolicy] = None, evaluation: Optional[Evaluation] = None,
+                 depth: Optional[int] = None) -> None:
+    global _worker_moves, _worker_policy, _worker_evaluation, _worker_depth
+    _worker_moves = moves
+    _worker_policy = policy
+    _worker_evaluation = evaluation
+    _worker_depth = depth
+
+
+def _search_worker(state: GameState, iterations: int, time_limit: Optional[float], seed: int) \
+        -> List[Tuple[MoveKey, int, float]]:
+    mcts = MCTS(state, _worker_moves, iterations, rng=random.Random(seed), policy=_worker_policy,
+                evaluation=_worker_evaluation, depth=_worker_depth)
+    mcts.EARLY_STOP = False
+    mcts.search(time_limit)
+    return [(_worker_moves.key(child.move), child.visits, child.wins) for child in mcts.root.children]
+
+
+class RootParallelMCTS:
+    def __init__(self, moves: Sequence[Move], workers: Optional[int] = None, iterations: int = MCTS.ITERATIONS,
+                 seed: Optional[int] = None, time_limit: Optional[float] = None,
+                 policy: Optional[RolloutPolicy] = None, evaluation: Optional[Evaluation] = None,
+                 depth: Optional[int] = None):
+        self._moves: MoveIndex = _index(moves)
+        self._policy = policy
+        self._evaluation = evaluation
+        self._depth = depth
+        self._workers: int = workers if workers else os.cpu_count() or 1
+        self._iterations = iterations
+        self._time_limit = time_limit
+        self._random = random.Random(seed)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self._workers, initializer=_init_worker,
+                                                 initargs=(self._moves, self._policy, self._evaluation, self._depth))
+        return self._executor
+
+    def visit_counts(self, state: GameState, rng: Optional[random.Random] = None) \
+            -> Dict[MoveKey, Tuple[int, float]]:
+        # worker seeds come from `rng` if given, otherwise from the generator seeded in the constructor
+        rng = self._random if rng is None else rng
+        seeds = [rng.getrandbits(64) for _ in range(self._workers)]
+        futures = [self._pool().submit(_search_worker, state, self._iterations, self._time_limit, seed)
+                   for seed in seeds]
+        merged: Dict[MoveKey, Tuple[int, float]] = {}
+        for future in futures:
+            for position, visits, wins in future.result():
+                old_visits, old_wins = merged.get(position, (0, 0))
+                merged[position] = (old_visits + visits, old_wins + wins)
+        return merged
+
+    def search(self, state: GameState, rng: Optional[random.Random] = None) -> Move:
+        legal: List[Move] = legal_moves(state, self._moves)
+        if len(legal) == 1:
+            return legal[0]
+        merged = self.visit_counts(state, rng)
+        if not merged:
+            raise MonteCarloException("No root statistics returned by workers")
+        best: MoveKey = max(sorted(merged, key=_key_order), key=lambda key: merged[key][0])
+        return self._moves.resolve(best)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> RootParallelMCTS:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
-from random import shuffle
-from typing import Callable, Union, Optional, Any, Iterable, List, cast
+from random import shuffle, Random
+from time import perf_counter
+from typing import Callable, Union, Optional, Any, Iterable, Iterator, List, Dict, Tuple, cast
 
 from pyrsistent import v, pbag, pvector
 from pyrsistent.typing import PVector
 
+from pharaoh import zobrist, instrumentation
 from pharaoh.card import Card, Value, Suit
 from pharaoh.game_state import GameState
 
@@ -22,6 +24,7 @@ class Move:
 
     def __init__(self, conditions: Iterable[Condition], actions: Iterable[Action], suit: Optional[Suit] = None):
         self._conds = pvector(conditions)
+        self._test: Callable[[GameState], bool] = compile_conditions(self._conds)
         self._actions = pvector(actions)
         for a in actions:
             if isinstance(a, PlayCards):
@@ -41,26 +44,76 @@ class Move:
     def suit(self) -> Optional[Suit]:
         return self._suit
 
+    @property
+    def conditions(self) -> PVector[Condition]:
+        return self._conds
+
+    @property
+    def actions(self) -> PVector[Action]:
+        return self._actions
+
     def test(self, state: GameState) -> bool:
-        return all(c.test(state) for c in self._conds)
+        return self._test(state)
 
-    def apply(self, state: GameState) -> GameState:
+    def apply(self, state: GameState, rng: Optional[Random] = None) -> GameState:
+        # `rng` shuffles the discard pile when it becomes the stock, without it the class-level mix_cards does
+        collector = instrumentation.collector
+        start: float = perf_counter() if collector is not None else 0.0
         if not self.test(state):
             raise MoveException()
         s_evolver = state.evolver()
-        new_state: GameState = cast(GameState, s_evolver)
+        self._apply_actions(cast(GameState, s_evolver), state.i, rng)
+        new_state = cast(GameState, s_evolver.persistent())
+        if collector is not None:
+            collector.observe('move.apply', perf_counter() - start)
+        return new_state
+
+    def apply_in_place(self, state, rng: Optional[Random] = None) -> None:
+        collector = instrumentation.collector
+        start: float = perf_counter() if collector is not None else 0.0
+        if not self.test(state):
+            raise MoveException()
+        self._apply_actions(state, state.i, rng)
+        if collector is not None:
+            collector.observe('move.apply_in_place', perf_counter() - start)
+
+    def _apply_actions(self, new_state: GameState, i: int, rng: Optional[Random]) -> None:
         for a in self._actions:
             a.apply(new_state)
-        while new_state.lp_mc[new_state.i] != -1:
-            new_state.i = (new_state.i + 1) % len(new_state.lp)
+        hashed: bool = new_state.zh is not None
+        # the finish is recorded first: a player emptying their hand with four cards is still on the move
+        if len(new_state.lp[i]) == 0:
+            if hashed:
+                new_state.zh = zobrist.finished_player(new_state.zh, i, new_state.lp_mc[i], new_state.mc)
+            new_state.lp_mc = new_state.lp_mc.set(i, new_state.mc)
+        if new_state.lp_mc[new_state.i] != -1:
+            old_i: int = new_state.i
+            while new_state.lp_mc[new_state.i] != -1:
+                new_state.i = (new_state.i + 1) % len(new_state.lp)
+            if hashed:
+                new_state.zh = zobrist.changed(new_state.zh, 'i', old_i, new_state.i)
         if new_state.cnt > len(new_state.st):
             cards: List[Card] = list(new_state.dp[0:-1])
-            self.__class__.mix_cards(cards)
+            if rng is None:
+                self.__class__.mix_cards(cards)
+            else:
+                rng.shuffle(cards)
+            old_st = new_state.st
             new_state.st = new_state.st.extend(cards)
             new_state.dp = new_state.dp.delete(0, -1)
-        if len(new_state.lp[state.i]) == 0:
-            new_state.lp_mc = new_state.lp_mc.set(state.i, new_state.mc)
-        return cast(GameState, s_evolver.persistent())
+            if hashed:
+                new_state.zh = zobrist.reshuffled(new_state.zh, old_st, cards, new_state.st)
+            if instrumentation.collector is not None:
+                instrumentation.collector.count('move.reshuffles')
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state['_test']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._test = compile_conditions(self._conds)
 
     def __repr__(self) -> str:
         return f'Move(cond={self._conds}, actions={self._actions})'
@@ -70,6 +123,9 @@ class Condition:
     def test(self, state: GameState) -> bool:
         raise NotImplementedError
 
+    def leaves(self) -> Iterator[Condition]:
+        yield self
+
     def _description(self) -> str:
         raise NotImplementedError
 
@@ -84,6 +140,10 @@ class CondAnd(Condition):
     def test(self, state: GameState) -> bool:
         return all(c.test(state) for c in self._conditions)
 
+    def leaves(self) -> Iterator[Condition]:
+        for c in self._conditions:
+            yield from c.leaves()
+
     def _description(self) -> str:
         return ', '.join(repr(x) for x in self._conditions)
 
@@ -94,6 +154,14 @@ class VariableCondition(Condition):
         self._var = variable
         self._cond = condition
 
+    @property
+    def variable(self) -> str:
+        return self._var
+
+    @property
+    def predicate(self) -> ConditionCallable:
+        return self._cond
+
     def test(self, state: GameState) -> bool:
         return self._cond(state[self._var])
 
@@ -102,14 +170,68 @@ class VariableCondition(Condition):
 
 
 class CardInHand(Condition):
-    def __init__(self, card: Card):
+    # `count` > 1 asks for several copies of the card, which only multi-deck games have
+    def __init__(self, card: Card, count: int = 1):
         self._card = card
+        self._count = count
+
+    @property
+    def card(self) -> Card:
+        return self._card
+
+    @property
+    def count(self) -> int:
+        return self._count
 
     def test(self, state: GameState) -> bool:
-        return self._card in state.lp[state.i]
+        if self._count == 1:
+            return self._card in state.lp[state.i]
+        return state.lp[state.i].count(self._card) >= self._count
 
     def _description(self) -> str:
-        return repr(self._card)
+        return repr(self._card) if self._count == 1 else f'{self._card!r} x{self._count}'
+
+
+_predicate_factories: Dict[Tuple[Tuple[str, ...], int, int], Callable[..., Callable[[GameState], bool]]] = {}
+
+
+def _predicate_factory(variables: Tuple[str, ...], cards: int, others: int) \
+        -> Callable[..., Callable[[GameState], bool]]:
+    params = [f'f{k}' for k in range(len(variables))] + [f'c{k}' for k in range(cards)] + \
+             [f'o{k}' for k in range(others)]
+    lines = [f'def factory({", ".join(params)}):', '    def test(s):']
+    if variables:
+        lines.append(f'        if not ({" and ".join(f"f{k}(s.{var})" for k, var in enumerate(variables))}):')
+        lines.append('            return False')
+    checks = [f'o{k}(s)' for k in range(others)]
+    if cards:
+        lines.append('        h = s.lp[s.i]')
+        checks = [f'c{k} in h' for k in range(cards)] + checks
+    lines.append(f'        return {" and ".join(checks) if checks else "True"}')
+    lines.append('    return test')
+    namespace: Dict[str, Any] = {}
+    exec('\n'.join(lines), namespace)
+    return namespace['factory']
+
+
+def compile_conditions(conditions: Iterable[Condition]) -> Callable[[GameState], bool]:
+    # Flattens a list of conditions into one predicate: variables are read as attributes and the hand is looked up
+    # once. Generated code is shared by all condition lists with the same shape.
+    var_conds: List[VariableCondition] = []
+    cards: List[Card] = []
+    others: List[Condition] = []
+    for leaf in (leaf for c in conditions for leaf in c.leaves()):
+        if isinstance(leaf, VariableCondition) and leaf.variable.isidentifier():
+            var_conds.append(leaf)
+        elif isinstance(leaf, CardInHand) and leaf.count == 1:
+            cards.append(leaf.card)
+        else:
+            others.append(leaf)
+    shape = (tuple(c.variable for c in var_conds), len(cards), len(others))
+    factory = _predicate_factories.get(shape)
+    if factory is None:
+        factory = _predicate_factories[shape] = _predicate_factory(*shape)
+    return factory(*(c.predicate for c in var_conds), *cards, *(c.test for c in others))
 
 
 class Action:
@@ -126,28 +248,45 @@ class Action:
 class PlayCards(Action):
     def __init__(self, cards: PVector[Card]):
         self._cards = cards
+        self._bag = pbag(cards)
 
     @property
     def cards(self) -> PVector[Card]:
         return self._cards
 
     def apply(self, s_evolver) -> None:
-        current_hand = s_evolver.lp[s_evolver.i] - pbag(self._cards)
+        current_hand = s_evolver.lp[s_evolver.i] - self._bag
         s_evolver.lp = s_evolver.lp.set(s_evolver.i, current_hand)
         s_evolver.dp = s_evolver.dp.extend(self._cards)
+        if s_evolver.zh is not None:
+            s_evolver.zh = zobrist.played(s_evolver.zh, self._cards, s_evolver.i)
 
     def _description(self) -> str:
         return repr(', '.join(map(repr, self._cards)))
 
 
 class ChangeVariable(Action):
+    # `action` has to be a pure function of the old value: the batched engine tabulates it over the value domain and
+    # canonical move classes treat changes by the same function as the same change
     def __init__(self, variable: str, action: ActionCallable, description: Optional[str]):
         self._action = action
         self._desc = description if description else 'unknown'
         self._var = variable
+        self._hashed: bool = variable in zobrist.SCALARS
+
+    @property
+    def variable(self) -> str:
+        return self._var
+
+    @property
+    def action(self) -> ActionCallable:
+        return self._action
 
     def apply(self, s_evolver) -> None:
-        s_evolver[self._var] = self._action(s_evolver[self._var])
+        old = s_evolver[self._var]
+        s_evolver[self._var] = new = self._action(old)
+        if self._hashed and s_evolver.zh is not None:
+            s_evolver.zh = zobrist.changed(s_evolver.zh, self._var, old, new)
 
     def _description(self) -> str:
         return f'variable={self._var}, action=<{self._desc}>'
@@ -155,6 +294,8 @@ class ChangeVariable(Action):
 
 class DrawCards(Action):
     def apply(self, s_evolver) -> None:
+        if s_evolver.zh is not None:
+            s_evolver.zh = zobrist.drawn(s_evolver.zh, s_evolver.st, s_evolver.cnt, s_evolver.i)
         cards = s_evolver.st[:s_evolver.cnt]
         s_evolver.st = s_evolver.st.delete(0, s_evolver.cnt)
         current_player = s_evolver.lp[s_evolver.i]
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import zlib
+from functools import partial
+from types import CodeType
+from typing import Dict, Iterable, Optional, Tuple, Any, List
+
+from pharaoh.canonical import MoveClasses
+from pharaoh.card import Deck
+from pharaoh.move import Move
+from pharaoh.move_index import MoveIndex
+from pharaoh.parametric import HandMoves
+from pharaoh.rule import Rule
+
+# Generated move tables only depend on the ruleset, the deck and the player count. The cache keeps one MoveIndex per
+# combination in memory and, with a directory, stores it as a compressed pickle named by a fingerprint of the rules
+# (their classes, attributes and the bytecode of the functions they use), of the modules that generate moves and of
+# the deck, so changing any of them makes a fresh process generate (and store) the table again. Parametric tables
+# (see pharaoh.parametric) are cheap to build and only kept in memory.
+MAGIC: bytes = b'PHMT'
+VERSION: int = 1
+
+MemoryKey = Tuple[Tuple[Rule, ...], Deck, int, bool, bool]
+
+logger = logging.getLogger(__name__)
+
+
+class MoveCacheException(Exception):
+    pass
+
+
+def generate_moves(ruleset: Iterable[Rule], deck: Deck, player_count: int, parametric: bool = False) -> MoveIndex:
+    moves: List[Move] = []
+    generators: List[HandMoves] = []
+    for rule in ruleset:
+        found: Optional[List[HandMoves]] = rule.generators(deck, player_count) if parametric else None
+        if found is None:
+            moves.extend(rule.generate_moves(deck, player_count))
+        else:
+            generators.extend(found)
+    return MoveIndex(moves, generators)
+
+
+def _code_digest(code: CodeType) -> str:
+    h = hashlib.sha256(code.co_code)
+    h.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        h.update((_code_digest(const) if isinstance(const, CodeType) else repr(const)).encode())
+    return h.hexdigest()
+
+
+def _describe(value: Any) -> str:
+    if isinstance(value, partial):
+        return f'partial({", ".join(_describe(x) for x in (value.func, *value.args))})'
+    code: Optional[CodeType] = getattr(value, '__code__', None)
+    if code is not None:
+        return f'{value.__module__}.{value.__qualname__}:{_code_digest(code)}'
+    if isinstance(value, Rule):
+        attributes = ', '.join(f'{name}={_describe(x)}' for name, x in sorted(vars(value).items()))
+        return f'{type(value).__module__}.{type(value).__qualname__}({attributes})'
+    if isinstance(value, (list, tuple)):
+        return f'[{", ".join(_describe(x) for x in value)}]'
+    return repr(value)
+
+
+def _module_digest(name: str) -> str:
+    path: Optional[str] = getattr(sys.modules.get(name), '__file__', None)
+    if path is None:
+        return name
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def fingerprint(ruleset: Iterable[Rule], deck: Deck, player_count: int) -> str:
+    rules: List[Rule] = list(ruleset)
+    modules = sorted({'pharaoh.move', 'pharaoh.rule'} | {type(rule).__module__ for rule in rules})
+    h = hashlib.sha256(f'{VERSION}:{player_count}'.encode())
+    for module in modules:
+        h.update(_module_digest(module).encode())
+    for rule in rules:
+        h.update(_describe(rule).encode())
+    h.update(repr(sorted(deck.cards)).encode())
+    h.update(repr((list(deck.suits), list(deck.values))).encode())
+    return h.hexdigest()
+
+
+def save_moves(path: str, moves: MoveIndex) -> None:
+    data: bytes = MAGIC + bytes([VERSION]) + zlib.compress(pickle.dumps(moves, pickle.HIGHEST_PROTOCOL))
+    tmp: str = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def load_moves(path: str) -> MoveIndex:
+    # every failure to read the table (a damaged file, or classes that changed since it was written) is reported as
+    # a MoveCacheException
+    try:
+        with open(path, 'rb') as f:
+            data: bytes = f.read()
+    except OSError as e:
+        raise MoveCacheException(f'{path} can not be read') from e
+    if data[:len(MAGIC)] != MAGIC or data[len(MAGIC):len(MAGIC) + 1] != bytes([VERSION]):
+        raise MoveCacheException(f'{path} is not a move table of version {VERSION}')
+    try:
+        moves = pickle.loads(zlib.decompress(data[len(MAGIC) + 1:]))
+    except Exception as e:
+        raise MoveCacheException(f'{path} is damaged') from e
+    if not isinstance(moves, MoveIndex):
+        raise MoveCacheException(f'{path} does not contain a move table')
+    return moves
+
+
+class MoveTableCache:
+    def __init__(self, directory: Optional[str] = None):
+        self._directory = directory
+        self._tables: Dict[MemoryKey, MoveIndex] = {}
+        self._classes: Dict[MemoryKey, MoveClasses] = {}
+        self.hits: int = 0
+        self.loads: int = 0
+        self.misses: int = 0
+
+    @property
+    def directory(self) -> Optional[str]:
+        return self._directory
+
+    def configure(self, directory: Optional[str]) -> None:
+        self._directory = directory
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def path(self, ruleset: Iterable[Rule], deck: Deck, player_count: int) -> Optional[str]:
+        if self._directory is None:
+            return None
+        return os.path.join(self._directory, f'moves-{fingerprint(ruleset, deck, player_count)[:32]}.bin')
+
+    def moves(self, ruleset: Iterable[Rule], deck: Deck, player_count: int, canonical: bool = False,
+              parametric: bool = False) -> MoveIndex:
+        # the canonical table is built from the classes of the full one, so MoveClasses.find returns its moves
+        rules: Tuple[Rule, ...] = tuple(ruleset)
+        key: MemoryKey = (rules, deck, player_count, canonical, parametric)
+        table: Optional[MoveIndex] = self._tables.get(key)
+        if table is not None:
+            self.hits += 1
+            return table
+        if canonical and parametric:
+            raise MoveCacheException('Canonical tables need every move of the table, they can not be parametric')
+        if canonical:
+            table = self._tables[key] = MoveIndex(self.classes(rules, deck, player_count).representatives)
+            return table
+        if parametric:
+            table = self._tables[key] = generate_moves(rules, deck, player_count, parametric=True)
+            self.misses += 1
+            return table
+        path: Optional[str] = self.path(rules, deck, player_count)
+        if path is not None and os.path.exists(path):
+            try:
+                table = load_moves(path)
+                self.loads += 1
+            except MoveCacheException as e:
+                logger.warning('%s (%s), generating the move table again', e, e.__cause__ or 'no details')
+                table = None
+        if table is None:
+            table = generate_moves(rules, deck, player_count)
+            self.misses += 1
+            if path is not None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                save_moves(path, table)
+        self._tables[key] = table
+        return table
+
+    def classes(self, ruleset: Iterable[Rule], deck: Deck, player_count: int) -> MoveClasses:
+        rules: Tuple[Rule, ...] = tuple(ruleset)
+        key: MemoryKey = (rules, deck, player_count, True, False)
+        classes: Optional[MoveClasses] = self._classes.get(key)
+        if classes is None:
+            classes = self._classes[key] = MoveClasses(self.moves(rules, deck, player_count))
+        return classes
+
+    def clear(self) -> None:
+        self._tables.clear()
+        self._classes.clear()
+
+
+move_cache: MoveTableCache = MoveTableCache(os.environ.get('PHARAOH_MOVE_CACHE'))
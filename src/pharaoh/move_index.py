@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+from operator import itemgetter
+from typing import Iterable, List, Dict, Tuple, Optional, Sequence, Iterator, Any, Union, overload
+
+from pyrsistent import pvector
+from pyrsistent.typing import PVector
+
+from pharaoh.card import Card, Suit, CARD_CODES
+from pharaoh.game_state import GameState
+from pharaoh.move import Move, VariableCondition, CardInHand
+from pharaoh.parametric import HandMoves
+
+Entry = Tuple[int, Move]
+Bucket = Tuple[Dict[Card, List[Entry]], List[Entry]]
+FeatureKey = Tuple
+# a position in the table or (generator, cards, suit) of a generated move; the same in every process
+MoveKey = Union[int, Tuple[int, Tuple[Card, ...], Optional[Suit]]]
+
+
+class MoveIndex(Sequence[Move]):
+    # Moves are bucketed lazily by the state features their conditions read and by the first card
+    # they need in hand; legal() returns the same list as a linear scan over the table. Moves of generators (see
+    # pharaoh.parametric) follow the moves of the table.
+    FEATURES: Tuple[str, ...] = ('suit', 'val', 'ace', 'cnt')
+
+    def __init__(self, moves: Iterable[Move], generators: Iterable[HandMoves] = ()):
+        self._moves: PVector[Move] = pvector(moves)
+        self._generators: List[HandMoves] = list(generators)
+        self._buckets: Dict[FeatureKey, Bucket] = {}
+        self._positions: Dict[int, int] = {}
+        self._var_conds: List[List[VariableCondition]] = []
+        self._first_cards: List[Optional[Card]] = []
+        for mv in self._moves:
+            var_conds: List[VariableCondition] = []
+            first_card: Optional[Card] = None
+            for cond in (leaf for c in mv.conditions for leaf in c.leaves()):
+                if isinstance(cond, VariableCondition) and cond.variable in self.FEATURES:
+                    var_conds.append(cond)
+                elif isinstance(cond, CardInHand) and first_card is None:
+                    first_card = cond.card
+            self._var_conds.append(var_conds)
+            self._first_cards.append(first_card)
+
+    @overload
+    def __getitem__(self, index: int) -> Move: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> PVector[Move]: ...
+
+    def __getitem__(self, index):
+        return self._moves[index]
+
+    def __len__(self) -> int:
+        return len(self._moves)
+
+    def __iter__(self) -> Iterator[Move]:
+        return iter(self._moves)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state['_buckets'] = {}
+        state['_positions'] = {}
+        return state
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(moves={len(self._moves)}, generators={len(self._generators)}, ' \
+               f'buckets={len(self._buckets)})'
+
+    @property
+    def generators(self) -> List[HandMoves]:
+        return self._generators
+
+    def _bucket(self, key: FeatureKey) -> Bucket:
+        bucket: Optional[Bucket] = self._buckets.get(key)
+        if bucket is None:
+            features = dict(zip(self.FEATURES, key))
+            by_card: Dict[Card, List[Entry]] = {}
+            without_cards: List[Entry] = []
+            for pos, mv in enumerate(self._moves):
+                if not all(c.test(features) for c in self._var_conds[pos]):  # type: ignore
+                    continue
+                card = self._first_cards[pos]
+                if card is None:
+                    without_cards.append((pos, mv))
+                else:
+                    by_card.setdefault(card, []).append((pos, mv))
+            bucket = self._buckets[key] = (by_card, without_cards)
+        return bucket
+
+    def candidates(self, state: GameState) -> List[Entry]:
+        by_card, without_cards = self._bucket(tuple(state[f] for f in self.FEATURES))
+        found: List[Entry] = list(without_cards)
+        for card in set(state.lp[state.i]):
+            found.extend(by_card.get(card, ()))
+        found.sort(key=itemgetter(0))
+        for generator in self._generators:
+            found.extend((len(self._moves), mv) for mv in generator.candidates(state))
+        return found
+
+    def legal(self, state: GameState) -> List[Move]:
+        return [mv for _, mv in self.candidates(state) if mv.test(state)]
+
+    def key(self, move: Move) -> MoveKey:
+        if not self._positions:
+            self._positions = {id(mv): pos for pos, mv in enumerate(self._moves)}
+        pos: Optional[int] = self._positions.get(id(move))
+        if pos is not None:
+            return pos
+        for k, generator in enumerate(self._generators):
+            if generator.owns(move):
+                return k, tuple(move.cards), move.suit
+        raise KeyError(move)
+
+    def resolve(self, key: MoveKey) -> Move:
+        if isinstance(key, int):
+            return self._moves[key]
+        k, cards, suit = key
+        return self._generators[k].resolve(cards, suit)
+
+    def move_id(self, move: Move) -> int:
+        # stable number of a move for the same ruleset, deck and player count: its position in the table or, for a
+        # generated move, a number past the table built from the generator, the suit and the codes of its cards
+        key: MoveKey = self.key(move)
+        if isinstance(key, int):
+            return key
+        k, cards, suit = key
+        number: int = 0
+        for card in reversed(cards):
+            number = number * CARD_CODES + card.code
+        number = number * (len(Suit) + 1) + (int(suit) if suit is not None else 0)
+        return len(self._moves) + number * len(self._generators) + k
+
+    def from_id(self, move_id: int) -> Move:
+        if move_id < len(self._moves):
+            return self._moves[move_id]
+        if not self._generators:
+            raise KeyError(move_id)
+        number, k = divmod(move_id - len(self._moves), len(self._generators))
+        number, suit_code = divmod(number, len(Suit) + 1)
+        cards: List[Card] = []
+        while number:
+            number, code = divmod(number, CARD_CODES)
+            cards.append(Card.from_code(code))
+        return self.resolve((k, tuple(cards), Suit(suit_code) if suit_code else None))
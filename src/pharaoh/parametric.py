@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from collections import Counter, OrderedDict
+from threading import Lock
+from typing import Dict, List, Tuple, Iterator, Callable, Any, Optional, TYPE_CHECKING
+from weakref import WeakSet
+
+from pharaoh.card import Card, Deck, Suit, Value
+from pharaoh.game_state import GameState
+from pharaoh.move import Move, compile_conditions
+
+if TYPE_CHECKING:
+    from pharaoh.rule import PlayRule
+
+# With several decks (or bigger value groups) a table of every playable sequence does not fit in memory any more:
+# a group of eight cards has 7364 distinct sequences where a group of four has 64. A parametric table keeps the moves
+# that do not play cards and generates the plays from the cards in the hand of the player on the move. Generated moves
+# are memoized by their cards, so a sequence is the same Move object in every state it is played in while it stays in
+# the memo (the least recently used sequences are evicted past its capacity).
+
+
+def distinct_sequences(counts: Dict[Card, int], max_length: int) -> Iterator[Tuple[Card, ...]]:
+    # every ordering of every sub-multiset of `counts` with at most `max_length` cards once, the empty one included
+    cards: List[Card] = sorted(card for card, count in counts.items() if count > 0)
+    remaining: Dict[Card, int] = dict(counts)
+    sequence: List[Card] = []
+
+    def walk() -> Iterator[Tuple[Card, ...]]:
+        yield tuple(sequence)
+        if len(sequence) == max_length:
+            return
+        for card in cards:
+            if remaining[card]:
+                remaining[card] -= 1
+                sequence.append(card)
+                yield from walk()
+                sequence.pop()
+                remaining[card] += 1
+
+    return walk()
+
+
+class HandMoves:
+    # The moves of one PlayRule for the cards of the player on the move. The conditions on the first card (suit,
+    # value, draw and ace counters) are checked before any sequence starting with it is generated.
+    def __init__(self, rule: PlayRule, deck: Deck, player_count: int, capacity: int = 20_000):
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        self._rule = rule
+        self._capacity = capacity
+        self._deck = deck
+        self._player_count = player_count
+        groups: Counter[Value] = Counter(card.value for card in deck.cards)
+        self._max_length: Dict[Value, int] = {val: groups[val] + rule.size for val in rule.values(deck)}
+        self._moves: OrderedDict[Tuple[Card, ...], List[Move]] = OrderedDict()
+        # every generated move still in use, evicted ones included, so their keys can still be found
+        self._owned: WeakSet[Move] = WeakSet()
+        # tables share the generators of the move cache and may search in threads (see pharaoh.server)
+        self._lock: Lock = Lock()
+        self._first_tests: Dict[Card, Callable[[GameState], bool]] = {}
+        self.evictions: int = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state['_moves'] = OrderedDict()
+        state['_owned'] = None
+        state['_lock'] = None
+        state['_first_tests'] = {}
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._owned = WeakSet()
+        self._lock = Lock()
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(values={len(self._max_length)}, generated={len(self._moves)})'
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def generated(self) -> int:
+        with self._lock:
+            return sum(len(moves) for moves in self._moves.values())
+
+    def moves(self, cards: Tuple[Card, ...]) -> List[Move]:
+        with self._lock:
+            moves: Optional[List[Move]] = self._moves.get(cards)
+            if moves is not None:
+                self._moves.move_to_end(cards)
+                return moves
+            moves = self._moves[cards] = self._rule.moves_for(cards, self._deck, self._player_count)
+            self._owned.update(moves)
+            if len(self._moves) > self._capacity:
+                self._moves.popitem(last=False)
+                self.evictions += 1
+            return moves
+
+    def _first_test(self, card: Card) -> Callable[[GameState], bool]:
+        test = self._first_tests.get(card)
+        if test is None:
+            test = self._first_tests[card] = compile_conditions(self._rule.conditions(card.suit, card.value))
+        return test
+
+    def candidates(self, state: GameState) -> List[Move]:
+        counts: Counter[Card] = Counter(card for card in state.lp[state.i] if card.value in self._max_length)
+        found: List[Move] = []
+        for first in sorted(counts):
+            limit: int = self._max_length[first.value]
+            if limit < 1 or not self._first_test(first)(state):
+                continue
+            rest: Dict[Card, int] = {card: count for card, count in counts.items() if card.value == first.value}
+            rest[first] -= 1
+            for tail in distinct_sequences(rest, limit - 1):
+                found.extend(self.moves((first, *tail)))
+        return found
+
+    def owns(self, move: Move) -> bool:
+        with self._lock:
+            return move in self._owned
+
+    def resolve(self, cards: Tuple[Card, ...], suit: Optional[Suit]) -> Move:
+        for mv in self.moves(cards):
+            if mv.suit == suit:
+                return mv
+        raise KeyError((cards, suit))
@@ -1,19 +1,25 @@
 import itertools
 import random
 from collections import defaultdict
-from typing import List, Callable, Dict, Optional, Tuple, Iterable
+from typing import List, Callable, Dict, Optional, Tuple, Iterable, Sequence
 
 from pyrsistent.typing import PVector
 
+from pharaoh.canonical import MoveClasses
 from pharaoh.card import Value, Card, Suit
+from pharaoh.endgame import EndgameSolver
+from pharaoh.evaluation import Evaluation
 from pharaoh.game_state import GameState
-from pharaoh.mcts import MCTS
+from pharaoh.mcts import MCTS, RootParallelMCTS, TranspositionTable, SearchStats, StopReason
 from pharaoh.move import Move
+from pharaoh.rollout import RolloutPolicy
 
 
 class Player:
-    def __init__(self, name: str):
+    def __init__(self, name: str, rng: Optional[random.Random] = None):
         self._name = name
+        # random decisions of the player, game_steps gives every seat its own stream of a seeded game
+        self.rng: Optional[random.Random] = rng
 
     @property
     def name(self) -> str:
@@ -28,7 +34,7 @@ class Player:
 
 class RandomPlayer(Player):
     def play(self, state: GameState, legal_moves: List[Move]) -> Move:
-        return random.choice(legal_moves)
+        return (random if self.rng is None else self.rng).choice(legal_moves)
 
 
 class BiggestTuplePlayer(Player):
@@ -51,24 +57,70 @@ class SmallestTuplePlayer(Player):
 
 
 class HumanPlayer(Player):
-    def __init__(self, name: str, load_move: Callable[[int], Tuple[PVector[Card], Optional[Suit]]]):
+    def __init__(self, name: str, load_move: Callable[[int], Tuple[PVector[Card], Optional[Suit]]],
+                 classes: Optional[MoveClasses] = None):
         super().__init__(name)
         self._load_move = load_move
+        self._classes = classes
 
     def play(self, state: GameState, legal_moves: List[Move]) -> Move:
         for i in itertools.count():
             cards_list, suit = self._load_move(i)
             moves2 = list(mv for mv in legal_moves if mv.cards == cards_list and mv.suit == suit)
+            if not moves2 and self._classes is not None:
+                # with a canonical move table the entered order may only be a member of a legal move's class
+                moves2 = [mv for mv in self._classes.find(cards_list, suit) if mv in legal_moves]
             if moves2:
                 return moves2[0]
         raise Exception()
 
 
 class MCTSPlayer(Player):
-    def __init__(self, name: str, moves: Iterable[Move]):
-        super().__init__(name)
+    def __init__(self, name: str, moves: Sequence[Move], workers: int = 1, iterations: Optional[int] = None,
+                 reuse_tree: Optional[bool] = None, table: Optional[TranspositionTable] = None,
+                 time_limit: Optional[float] = None, rng: Optional[random.Random] = None,
+                 policy: Optional[RolloutPolicy] = None, evaluation: Optional[Evaluation] = None,
+                 depth: Optional[int] = None, endgame: Optional[EndgameSolver] = None):
+        # `endgame` plays the positions it applies to and can solve, the search plays the others. Root-parallel
+        # searches (workers > 1) build fresh trees in the workers, so they neither reuse trees nor share a table.
+        if workers > 1 and (reuse_tree or table is not None):
+            raise ValueError('reuse_tree and table need a search in this process (workers=1)')
+        super().__init__(name, rng)
         self._moves = moves
+        self._policy = policy
+        self._evaluation = evaluation
+        self._depth = depth
+        self.endgame = endgame
+        self._iterations = iterations
+        self._table = table
+        self._time_limit = time_limit
+        self.last_stats: Optional[SearchStats] = None
+        self._reuse_tree: bool = workers <= 1 if reuse_tree is None else reuse_tree
+        self._mcts: Optional[MCTS] = None
+        self.reused_trees: int = 0
+        self._parallel: Optional[RootParallelMCTS] = None
+        if workers > 1:
+            self._parallel = RootParallelMCTS(moves, workers, iterations if iterations else MCTS.ITERATIONS,
+                                              time_limit=time_limit, policy=policy,
+                                              evaluation=evaluation, depth=depth)
 
     def play(self, state: GameState, legal_moves: Iterable[Move]) -> Move:
-        mcts: MCTS = MCTS(state, self._moves)
-        return mcts.search()
+        if self.endgame is not None and self.endgame.applies(state):
+            solution = self.endgame.solve(state)
+            if solution is not None:
+                self.last_stats = SearchStats(solution.move, 0, solution.elapsed, StopReason.SOLVED)
+                return solution.move
+        if self._parallel is not None:
+            return self._parallel.search(state, self.rng)
+        if self._reuse_tree and self._mcts is not None and self._mcts.advance(state):
+            self.reused_trees += 1
+            self._mcts.rng = self.rng
+        else:
+            self._mcts = MCTS(state, self._moves, self._iterations, self._table, self.rng, self._policy,
+                              self._evaluation, self._depth)
+        self.last_stats = self._mcts.run(self._time_limit)
+        return self.last_stats.move
+
+    def close(self) -> None:
+        if self._parallel is not None:
+            self._parallel.close()
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import List, Tuple, Dict, Iterator, Optional, Sequence, Any, TYPE_CHECKING
+
+from pyrsistent import InvariantException
+
+from pharaoh.card import Card, Suit, Value
+from pharaoh.game import game_steps
+from pharaoh.game_state import GameState, Hand
+from pharaoh.move import Move, MoveException
+from pharaoh.move_index import MoveIndex
+from pharaoh.rng import GameRandom
+from pharaoh.zobrist import full_hash
+
+if TYPE_CHECKING:
+    from pharaoh.player import Player
+
+# A game record is the starting position, the seed of the game's GameRandom (whose reshuffle stream shuffles the
+# discard pile) and the ids of the played moves (MoveIndex.move_id), all written as unsigned LEB128 varints after a
+# magic and a version byte.
+# A game of a hundred moves takes a few hundred bytes; Replay rebuilds any of its states and keeps a snapshot every
+# `snapshot_every` moves, so reaching a state replays fewer moves than that.
+MAGIC: bytes = b'PHGR'
+VERSION: int = 2
+SCALARS: Tuple[str, ...] = ('ace', 'suit', 'val', 'cnt', 'i', 'mc')
+
+
+class RecordException(Exception):
+    pass
+
+
+def write_varint(out: bytearray, n: int) -> None:
+    if n < 0:
+        raise RecordException(f'Can not write negative number {n}')
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    n: int = 0
+    shift: int = 0
+    while True:
+        if pos >= len(data):
+            raise RecordException('Record ends inside a number')
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _write_cards(out: bytearray, cards: Sequence[Card]) -> None:
+    write_varint(out, len(cards))
+    for card in cards:
+        write_varint(out, card.code)
+
+
+def _read_cards(data: bytes, pos: int) -> Tuple[List[Card], int]:
+    count, pos = read_varint(data, pos)
+    cards: List[Card] = []
+    for _ in range(count):
+        code, pos = read_varint(data, pos)
+        cards.append(Card.from_code(code))
+    return cards, pos
+
+
+def write_state(out: bytearray, state: GameState) -> None:
+    write_varint(out, len(state.lp))
+    for hand in state.lp:
+        _write_cards(out, sorted(hand))
+    _write_cards(out, state.dp)
+    _write_cards(out, state.st)
+    for mc in state.lp_mc:
+        write_varint(out, mc + 1)
+    for name in SCALARS:
+        write_varint(out, int(state[name]))
+
+
+def read_state(data: bytes, pos: int) -> Tuple[GameState, int]:
+    players, pos = read_varint(data, pos)
+    hands: List[Hand] = []
+    for _ in range(players):
+        cards, pos = _read_cards(data, pos)
+        hands.append(Hand(cards))
+    dp, pos = _read_cards(data, pos)
+    st, pos = _read_cards(data, pos)
+    lp_mc: List[int] = []
+    for _ in range(players):
+        mc, pos = read_varint(data, pos)
+        lp_mc.append(mc - 1)
+    scalars: Dict[str, Any] = {}
+    for name in SCALARS:
+        scalars[name], pos = read_varint(data, pos)
+    scalars['suit'], scalars['val'] = Suit(scalars['suit']), Value(scalars['val'])
+    state = GameState(dp=dp, st=st, lp=hands, lp_mc=lp_mc,
+                      deck_size=sum(map(len, hands)) + len(dp) + len(st), **scalars)
+    return state.set(zh=full_hash(state)), pos
+
+
+@dataclass(frozen=True)
+class GameRecord:
+    initial: GameState
+    seed: int
+    moves: Tuple[int, ...]
+
+    def to_bytes(self) -> bytes:
+        out = bytearray(MAGIC)
+        out.append(VERSION)
+        write_varint(out, self.seed)
+        write_state(out, self.initial)
+        write_varint(out, len(self.moves))
+        for move_id in self.moves:
+            write_varint(out, move_id)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> GameRecord:
+        if data[:len(MAGIC)] != MAGIC or data[len(MAGIC):len(MAGIC) + 1] != bytes([VERSION]):
+            raise RecordException(f'Not a game record of version {VERSION}')
+        try:
+            seed, pos = read_varint(data, len(MAGIC) + 1)
+            initial, pos = read_state(data, pos)
+            count, pos = read_varint(data, pos)
+            moves: List[int] = []
+            for _ in range(count):
+                move_id, pos = read_varint(data, pos)
+                moves.append(move_id)
+        except (ValueError, InvariantException) as e:
+            raise RecordException('Damaged game record') from e
+        if pos != len(data):
+            raise RecordException('Unexpected data after the last move')
+        return cls(initial, seed, tuple(moves))
+
+
+def record_game(state: GameState, players: Sequence[Player], moves: MoveIndex, seed: Optional[int] = None,
+                max_moves: int = 1000) -> GameRecord:
+    # plays the game with a GameRandom of `seed`, so replaying the record gives the same states
+    seed = random.getrandbits(64) if seed is None else seed
+    played: List[int] = [moves.move_id(step.move)
+                         for step in game_steps(state, players, moves, max_moves, GameRandom(seed))]
+    return GameRecord(state, seed, tuple(played))
+
+
+class Replay(Sequence[GameState]):
+    # replay[n] is the state after n moves; snapshots keep the state and the reshuffle generator of every
+    # `snapshot_every`-th state that was reached
+    def __init__(self, record: GameRecord, moves: MoveIndex, snapshot_every: int = 32):
+        if snapshot_every < 1:
+            raise ValueError('snapshot_every must be at least 1')
+        self._record = record
+        self._moves = moves
+        self._every = snapshot_every
+        rnd = GameRandom(record.seed).reshuffle
+        self._snapshots: Dict[int, Tuple[GameState, Any]] = {0: (record.initial, rnd.getstate())}
+
+    @property
+    def record(self) -> GameRecord:
+        return self._record
+
+    @property
+    def snapshots(self) -> int:
+        return len(self._snapshots)
+
+    def __len__(self) -> int:
+        return len(self._record.moves) + 1
+
+    def move(self, n: int) -> Move:
+        # the move played in state n
+        try:
+            return self._moves.from_id(self._record.moves[n])
+        except (KeyError, ValueError) as e:
+            raise RecordException(f'Unknown move id {self._record.moves[n]} at move {n}') from e
+
+    def __getitem__(self, n):
+        if isinstance(n, slice):
+            return [self[k] for k in range(*n.indices(len(self)))]
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            raise IndexError(n)
+        start: int = n - n % self._every
+        while start not in self._snapshots:
+            start -= self._every
+        state: GameState = self._snapshots[start][0]
+        for state in self._walk(start, n):
+            pass
+        return state
+
+    def __iter__(self) -> Iterator[GameState]:
+        yield self._record.initial
+        yield from self._walk(0, len(self) - 1)
+
+    def _walk(self, start: int, stop: int) -> Iterator[GameState]:
+        # yields the states after moves start, ..., stop - 1
+        state, rnd_state = self._snapshots[start]
+        rnd = random.Random()
+        rnd.setstate(rnd_state)
+        for k in range(start, stop):
+            try:
+                state = self.move(k).apply(state, rnd)
+            except MoveException as e:
+                raise RecordException(f'Move {k} is not legal in the recorded game') from e
+            if (k + 1) % self._every == 0 and k + 1 not in self._snapshots:
+                self._snapshots[k + 1] = (state, rnd.getstate())
+            yield state
+
+    def moves(self) -> List[Move]:
+        return [self.move(n) for n in range(len(self._record.moves))]
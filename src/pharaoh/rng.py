@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import hashlib
+from random import Random
+from typing import Dict, Union
+
+# Reproducible randomness: a seed is split into independent named streams (the deal, the reshuffles of the discard
+# pile, one stream per seat) and into child seeds for games and workers. Streams are derived with SHA-256 from the seed
+# and the name, so a simulated game only depends on its seed and is the same in every process. Code that gets no
+# stream falls back to the functions of the random module.
+MASK64: int = (1 << 64) - 1
+
+
+def derive_seed(seed: int, *parts: Union[int, str]) -> int:
+    h = hashlib.sha256(str(seed).encode())
+    for part in parts:
+        h.update(b'/' + str(part).encode())
+    return int.from_bytes(h.digest()[:8], 'little') & MASK64
+
+
+class GameRandom:
+    def __init__(self, seed: int):
+        self._seed = seed
+        self._streams: Dict[str, Random] = {}
+
+    @property
+    def seed(self) -> int:
+        return self._seed
+
+    def stream(self, name: str) -> Random:
+        stream = self._streams.get(name)
+        if stream is None:
+            stream = self._streams[name] = Random(derive_seed(self._seed, name))
+        return stream
+
+    @property
+    def deal(self) -> Random:
+        return self.stream('deal')
+
+    @property
+    def reshuffle(self) -> Random:
+        return self.stream('reshuffle')
+
+    def seat(self, seat: int) -> Random:
+        return self.stream(f'seat-{seat}')
+
+    def child(self, *parts: Union[int, str]) -> GameRandom:
+        # e.g. child('game', 7) for the 7th game of a tournament, child('worker', 2) for a worker process
+        return GameRandom(derive_seed(self._seed, 'child', *parts))
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(seed={self._seed})'
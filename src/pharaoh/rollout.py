@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import random
+from types import ModuleType
+from typing import List, Callable, Union, TYPE_CHECKING
+
+from pharaoh.card import Value
+from pharaoh.game_state import GameState
+from pharaoh.move import Move
+
+if TYPE_CHECKING:
+    from pharaoh.player import Player
+
+# Rollout policies choose the moves of MCTS playouts. Uniformly random playouts are noisy in Pharaoh (players pile up
+# draws after sevens and playouts end at the depth limit without a winner); the heuristic policies play more like the
+# simple players and end more playouts with a result. Policies get the random source of the search (a Random or the
+# random module) and are pickled to root-parallel workers.
+RandomSource = Union[random.Random, ModuleType]
+MoveScore = Callable[[GameState, Move], float]
+
+
+class RolloutPolicy:
+    def choose(self, state: GameState, legal: List[Move], rnd: RandomSource) -> Move:
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}()'
+
+
+class RandomRollout(RolloutPolicy):
+    def choose(self, state: GameState, legal: List[Move], rnd: RandomSource) -> Move:
+        return rnd.choice(legal)
+
+
+class PlayerRollout(RolloutPolicy):
+    # uses the choice of a Player that does not search (e.g. SmallestTuplePlayer), the state may be a SimState; the
+    # player draws from the random source of the search while it chooses
+    def __init__(self, player: Player):
+        self._player = player
+
+    def choose(self, state: GameState, legal: List[Move], rnd: RandomSource) -> Move:
+        own = self._player.rng
+        self._player.rng = rnd if isinstance(rnd, random.Random) else None
+        try:
+            return self._player.play(state, legal)
+        finally:
+            self._player.rng = own
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self._player!r})'
+
+
+class ScoredRollout(RolloutPolicy):
+    # plays a move with the highest score, ties are broken at random
+    def __init__(self, score: MoveScore):
+        self._score = score
+
+    def choose(self, state: GameState, legal: List[Move], rnd: RandomSource) -> Move:
+        scores = [self._score(state, mv) for mv in legal]
+        best = max(scores)
+        return rnd.choice([mv for mv, score in zip(legal, scores) if score == best])
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({getattr(self._score, "__name__", self._score)})'
+
+
+class EpsilonGreedyRollout(RolloutPolicy):
+    # a random move with probability epsilon, the move of `policy` otherwise
+    def __init__(self, policy: RolloutPolicy, epsilon: float = 0.1):
+        if not 0 <= epsilon <= 1:
+            raise ValueError('epsilon must be in [0, 1]')
+        self._policy = policy
+        self._epsilon = epsilon
+
+    def choose(self, state: GameState, legal: List[Move], rnd: RandomSource) -> Move:
+        if rnd.random() < self._epsilon:
+            return rnd.choice(legal)
+        return self._policy.choose(state, legal, rnd)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self._policy!r}, epsilon={self._epsilon})'
+
+
+def shed_cards(state: GameState, move: Move) -> float:
+    # get rid of as many cards as possible and keep aces and sevens (which answer attacks) for later; drawing is last
+    if not move.cards:
+        return -1.0
+    keep = sum(1 for card in move.cards if card.value in (Value.VII, Value.ACE))
+    return len(move.cards) - 0.5 * keep * (len(state.lp[state.i]) > len(move.cards))
+
+
+def attack(state: GameState, move: Move) -> float:
+    # prefer moves that make the next player draw or wait (sevens and aces), then the number of cards played
+    if not move.cards:
+        return -1.0
+    return len(move.cards) + 10 * (move.cards[0].value in (Value.VII, Value.ACE))
@@ -1,17 +1,60 @@
+from collections import Counter
+from functools import partial
 from itertools import permutations
-from typing import List, Optional, Tuple, Callable, Dict, cast, Iterator
+from operator import eq
+from typing import List, Optional, Tuple, Callable, Dict, cast, Iterator, TypeVar, Set
 
 from pyrsistent import pvector
 from pyrsistent.typing import PVector
 
 from pharaoh.card import Card, Value, Suit, Deck
 from pharaoh.move import Move, Action, ChangeVariable, Condition, VariableCondition, CardInHand, PlayCards, DrawCards
+from pharaoh.parametric import HandMoves
+
+
+T = TypeVar('T')
 
 
 def raise_(e: Exception):
     raise e
 
 
+# Actions and conditions of generated moves use module-level functions (bound with partial) instead of lambdas,
+# so move tables can be pickled and sent to other processes.
+def constant(value: T, _) -> T:
+    return value
+
+
+def add_aces(n: int, ace: int) -> int:
+    return ace + n - (ace != 0)
+
+
+def add_draw_count(n: int, cnt: int) -> int:
+    return n if cnt == 1 else cnt + n
+
+
+def decrement_ace(ace: int) -> int:
+    return max(0, ace - 1)
+
+
+def next_player(player_count: int, i: int) -> int:
+    return (i + 1) % player_count
+
+
+def increment(x: int) -> int:
+    return x + 1
+
+
+def ace_greater_than_one(ace: int) -> bool:
+    if not isinstance(ace, int):
+        raise_(TypeError(f'Expected int got {ace.__class__.__name__}'))
+    return ace > 1
+
+
+def cnt_at_most_one(cnt: int) -> bool:
+    return cnt == 1 or cnt == 0
+
+
 def partial_permutations(cards: List[Card], size: Optional[int] = None) -> Iterator[Tuple[Card]]:
     size = size if size else len(cards)
     for i in range(size):
@@ -19,51 +62,59 @@ def partial_permutations(cards: List[Card], size: Optional[int] = None) -> Itera
             yield cast(Tuple[Card], perm)
 
 
+def distinct_partial_permutations(cards: List[Card], size: Optional[int] = None) -> Iterator[Tuple[Card]]:
+    # copies of a card (multi-deck games) would repeat sequences, every sequence is kept once in its first position
+    seen: Set[Tuple[Card]] = set()
+    for perm in partial_permutations(cards, size):
+        if perm not in seen:
+            seen.add(perm)
+            yield perm
+
+
 def ace_played(cards: Tuple[Card], _: int) -> List[Action]:
     if cards[0].value == Value.ACE and len(cards) < 4:
-        return [ChangeVariable('ace', lambda ace, n=len(cards): ace + n - (ace != 0),
-                               f'ace += ace + {len(cards)} - (ace!=0)'),
-                ChangeVariable('cnt', lambda _: 0, 'cnt = 0')]
+        return [ChangeVariable('ace', partial(add_aces, len(cards)), f'ace += ace + {len(cards)} - (ace!=0)'),
+                ChangeVariable('cnt', partial(constant, 0), 'cnt = 0')]
     return []
 
 
 def vii_played(cards: Tuple[Card], _: int) -> List[Action]:
     if cards[0].value == Value.VII:
         n = len(cards) * 3
-        return [ChangeVariable('cnt', lambda cnt: n if cnt == 1 else cnt + n, 'cnt = n if cnt == 1 else cnt + n')]
+        return [ChangeVariable('cnt', partial(add_draw_count, n), 'cnt = n if cnt == 1 else cnt + n')]
     return []
 
 
 def leaves_under_played_as_first(cards: Tuple[Card], _: int) -> List[Action]:
     if cards[0].value == Value.UNDER and cards[0].suit == Suit.LEAF:
-        return [ChangeVariable('cnt', lambda _: 1, 'cnt = 1')]
+        return [ChangeVariable('cnt', partial(constant, 1), 'cnt = 1')]
     return []
 
 
 def change_suit_to_top(cards: Tuple[Card], _: int) -> List[Action]:
     if cards[0].value != Value.OVER:
-        return [ChangeVariable('suit', lambda _, s=cards[-1].suit: s, f'suit={cards[-1].suit}')]
+        return [ChangeVariable('suit', partial(constant, cards[-1].suit), f'suit={cards[-1].suit}')]
     return []
 
 
 def change_val_to_top(cards: Tuple[Card], _: int) -> List[Action]:
-    return [ChangeVariable('val', lambda _, val=cards[-1].value: val, f'suit={cards[-1].value}')]
+    return [ChangeVariable('val', partial(constant, cards[-1].value), f'suit={cards[-1].value}')]
 
 
 def change_ace_counter(cards: Tuple[Card] | Tuple[()], __) -> List[Action]:
     if cards and cards[0].value == Value.ACE:
         return []
-    return [ChangeVariable('ace', lambda ace: max(0, ace - 1), 'ace = max(0, ace - 1)')]
+    return [ChangeVariable('ace', decrement_ace, 'ace = max(0, ace - 1)')]
 
 
 def increment_player_index(cards: Tuple[Card] | Tuple[()], player_count: int) -> List[Action]:
     if len(cards) < 4:
-        return [ChangeVariable('i', lambda i, pc=player_count: (i + 1) % pc, f'(i + 1) % {player_count}')]
+        return [ChangeVariable('i', partial(next_player, player_count), f'(i + 1) % {player_count}')]
     return []
 
 
 def increment_move_counter(_, __) -> List[Action]:
-    return [ChangeVariable('mc', lambda mc: mc + 1, "mc += 1")]
+    return [ChangeVariable('mc', increment, "mc += 1")]
 
 
 game_mechanics_for_drawing: List[Callable[[Tuple[Card] | Tuple[()], int], List[Action]]] = [
@@ -87,6 +138,11 @@ class Rule:
     def generate_moves(self, deck: Deck, player_count: int) -> List[Move]:
         raise NotImplementedError
 
+    def generators(self, deck: Deck, player_count: int) -> Optional[List[HandMoves]]:
+        # rules that can generate their moves from the hand of the player on the move return the generators,
+        # None means the rule only has a move table
+        return None
+
 
 class DrawRule(Rule):
     def generate_moves(self, deck: Deck, player_count: int) -> List[Move]:
@@ -95,27 +151,47 @@ class DrawRule(Rule):
         actions.extend(a for m in game_mechanics_for_drawing
                        for a in m(cast(Tuple[()], tuple()), player_count))
 
-        cond_func: Callable = lambda ace: ace > 1 if isinstance(ace, int) \
-            else raise_(TypeError(f'Expected int got {ace.__class__.__name__}'))
-        moves.append(Move([VariableCondition('ace', cond_func, 'ace > 1')], actions))
+        moves.append(Move([VariableCondition('ace', ace_greater_than_one, 'ace > 1')], actions))
 
-        actions.append(ChangeVariable('cnt', lambda _: 1, 'cnt = 1'))
-        moves.append(Move([VariableCondition('ace', lambda ace: ace == 0, 'ace == 0')], actions))
-        moves.append(Move([VariableCondition('ace', lambda ace: ace == 1, 'ace == 1')], actions))
+        actions.append(ChangeVariable('cnt', partial(constant, 1), 'cnt = 1'))
+        moves.append(Move([VariableCondition('ace', partial(eq, 0), 'ace == 0')], actions))
+        moves.append(Move([VariableCondition('ace', partial(eq, 1), 'ace == 1')], actions))
 
         return moves
 
 
+def no_conditions(_: Suit, __: Value) -> List[Condition]:
+    return []
+
+
+def any_value(_: Value) -> bool:
+    return True
+
+
+def single_move(conds: List[Condition], actions: List[Action], _: Deck) -> List[Move]:
+    return [Move(conds, actions)]
+
+
 class PlayRule(Rule):
     def __init__(self, cond_generator: Optional[Callable[[Suit, Value], List[Condition]]] = None,
                  size: int = 0,
-                 value_filter: Callable[[Value], bool] = lambda _: True,
+                 value_filter: Callable[[Value], bool] = any_value,
                  move_generator: Optional[Callable[[List[Condition], List[Action], Deck], List[Move]]]
                  = None):
-        self._cond_generator = cond_generator if cond_generator else lambda _, __: []
+        self._cond_generator = cond_generator if cond_generator else no_conditions
         self._size = size
         self._value_filter = value_filter
-        self._move_generator = move_generator if move_generator else lambda c, a, _: [Move(c, a)]
+        self._move_generator = move_generator if move_generator else single_move
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def values(self, deck: Deck) -> List[Value]:
+        return list(filter(self._value_filter, deck.values))
+
+    def conditions(self, suit: Suit, val: Value) -> List[Condition]:
+        return self._cond_generator(suit, val)
 
     @staticmethod
     def _sort_deck(deck: Deck) -> Tuple[Dict[Suit, List[Card]], Dict[Value, List[Card]]]:
@@ -126,22 +202,28 @@ class PlayRule(Rule):
             v_dict[card.value].append(card)
         return s_dict, v_dict
 
+    def moves_for(self, perm: Tuple[Card, ...], deck: Deck, player_count: int) -> List[Move]:
+        conds: List[Condition] = self._cond_generator(perm[0].suit, perm[0].value)
+        conds.extend(CardInHand(card, count) for card, count in Counter(perm).items())
+        actions: List[Action] = [PlayCards(pvector(perm))]
+        actions.extend(a for m in game_mechanics_for_played_cards for a in m(cast(Tuple[Card], perm), player_count))
+        return self._move_generator(conds, actions, deck)
+
     def generate_moves(self, deck: Deck, player_count: int) -> List[Move]:
         s_dict, v_dict = self._sort_deck(deck)
         moves: List[Move] = []
-        for val in filter(self._value_filter, deck.values):
-            for perm in partial_permutations(v_dict[val], len(v_dict[val]) + self._size):
-                suit: Suit = perm[0].suit
-                conds: List[Condition] = self._cond_generator(suit, val)
-                conds.extend(CardInHand(card) for card in perm)
-                actions: List[Action] = [PlayCards(pvector(perm))]
-                actions.extend(a for m in game_mechanics_for_played_cards for a in m(perm, player_count))
-                moves.extend(self._move_generator(conds, actions, deck))
+        for val in self.values(deck):
+            for perm in distinct_partial_permutations(v_dict[val], len(v_dict[val]) + self._size):
+                moves.extend(self.moves_for(perm, deck, player_count))
         return moves
 
+    def generators(self, deck: Deck, player_count: int) -> Optional[List[HandMoves]]:
+        return [HandMoves(self, deck, player_count)]
+
 
 def play_over_move_generator(conds: List[Condition], actions: List[Action], deck: Deck) -> List[Move]:
-    change_suit_vars = {suit: ChangeVariable('suit', lambda _, s=suit: s, f'suit={repr(suit)}') for suit in deck.suits}
+    change_suit_vars = {suit: ChangeVariable('suit', partial(constant, suit), f'suit={repr(suit)}')
+                        for suit in deck.suits}
     moves = []
     for suit, change_var in change_suit_vars.items():
         actions.append(change_var)
@@ -151,11 +233,11 @@ def play_over_move_generator(conds: List[Condition], actions: List[Action], deck
 
 
 def f_generator(arg: Suit | Value) -> Callable[[PVector | int | Suit | Value], bool]:
-    return lambda a: a == arg
+    return partial(eq, arg)
 
 
-ace_is_zero: Condition = VariableCondition('ace', lambda ace: ace == 0, 'ace == 0')
-cnt_is_one: Condition = VariableCondition('cnt', lambda cnt: cnt == 1, 'cnt == 1')
+ace_is_zero: Condition = VariableCondition('ace', partial(eq, 0), 'ace == 0')
+cnt_is_one: Condition = VariableCondition('cnt', partial(eq, 1), 'cnt == 1')
 suit_conds: Dict[Suit, Condition] = {
     suit: VariableCondition('suit', f_generator(suit), f'suit=={suit}')
     for suit in Suit
@@ -170,18 +252,27 @@ def cond_generator_for_state_check(value: Value) -> List[Condition]:
     if value == Value.VII:
         return [ace_is_zero]
     if value == Value.ACE:
-        return [VariableCondition('cnt', lambda cnt: cnt == 1 or cnt == 0, 'cnt <= 1')]
+        return [VariableCondition('cnt', cnt_at_most_one, 'cnt <= 1')]
+    return [ace_is_zero, cnt_is_one]
+
+
+def match_suit_conditions(suit: Suit, val: Value) -> List[Condition]:
+    return [suit_conds[suit]] + cond_generator_for_state_check(val)
+
+
+def match_value_conditions(_: Suit, val: Value) -> List[Condition]:
+    return [val_conds[val]] + cond_generator_for_state_check(val)
+
+
+def play_over_conditions(_: Suit, __: Value) -> List[Condition]:
     return [ace_is_zero, cnt_is_one]
 
 
-match_suit_rule: PlayRule = PlayRule(
-    cond_generator=lambda suit, val: [suit_conds[suit]] + cond_generator_for_state_check(val))
-match_value_rule: PlayRule = PlayRule(
-    cond_generator=lambda _, val: [val_conds[val]] + cond_generator_for_state_check(val),
-    size=-1)
+match_suit_rule: PlayRule = PlayRule(cond_generator=match_suit_conditions)
+match_value_rule: PlayRule = PlayRule(cond_generator=match_value_conditions, size=-1)
 play_over_rule: PlayRule = PlayRule(
-    cond_generator=lambda _, __: [ace_is_zero, cnt_is_one],
-    value_filter=lambda val: val == Value.OVER,
+    cond_generator=play_over_conditions,
+    value_filter=partial(eq, Value.OVER),
     move_generator=play_over_move_generator)
 standard_ruleset: List[Rule] = [
     match_suit_rule,
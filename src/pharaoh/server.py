@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import List, Optional, Dict, Any, Sequence, Callable, Iterable
+
+from pharaoh.card import Card, Deck, Suit, GERMAN_CARDS_DECK
+from pharaoh.game import create_game, finished, legal_moves, winners
+from pharaoh.game_state import GameState
+from pharaoh.move import Move
+from pharaoh.player import Player, MCTSPlayer
+from pharaoh.rng import GameRandom
+from pharaoh.rule import Rule, standard_ruleset
+
+# Many tables in one process: every table is an asyncio task and every seat an AsyncPlayer, so a seat waiting for a
+# remote client (or a search running in an executor) never blocks the other tables. Clients connect over TCP or a Unix
+# socket and speak a line protocol; client lines are `COMMAND args`, server lines are `COMMAND <json>`:
+#
+#   client: JOIN <table> <name>      server: JOINED {"table", "seat", "players"}
+#   server: TURN {"mc", "seat", "hand", "top", "suit", "val", "cnt", "ace", "legal": [{"cards", "suit"}, ...]}
+#   client: PLAY <index into legal>
+#   server: MOVE {"seat", "cards", "suit"}  after every move of the table
+#   server: END {"placements", "moves", "reason"}  placements are seats in finishing order (null if unfinished)
+#   server: ERROR {"message"}  after a line it can not use, the client may try again
+#
+# Cards are written as SUIT:VALUE, e.g. HEART:VII.
+
+
+class ServerException(Exception):
+    pass
+
+
+class SeatDisconnected(ServerException):
+    pass
+
+
+def card_text(card: Card) -> str:
+    return f'{card.suit.name}:{card.value.name}'
+
+
+def move_payload(move: Move) -> Dict[str, Any]:
+    return {'cards': [card_text(card) for card in move.cards], 'suit': move.suit.name if move.suit else None}
+
+
+def turn_payload(state: GameState, legal: Sequence[Move]) -> Dict[str, Any]:
+    return {
+        'mc': state.mc,
+        'seat': state.i,
+        'hand': sorted(card_text(card) for card in state.lp[state.i]),
+        'top': card_text(state.dp[-1]),
+        'suit': Suit(state.suit).name,
+        'val': state.val.name,
+        'cnt': state.cnt,
+        'ace': state.ace,
+        'legal': [move_payload(mv) for mv in legal],
+    }
+
+
+async def read_line(reader: asyncio.StreamReader, name: str) -> str:
+    # a line from a client, undecodable bytes are replaced; a broken connection (or a line over the reader's limit,
+    # which readline reports as ValueError) is a disconnect
+    try:
+        line: bytes = await reader.readline()
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError) as e:
+        raise SeatDisconnected(name) from e
+    if not line:
+        raise SeatDisconnected(name)
+    return line.decode(errors='replace').strip()
+
+
+def parse_index(argument: str, size: int) -> Optional[int]:
+    try:
+        index = int(argument)
+    except ValueError:
+        return None
+    return index if 0 <= index < size else None
+
+
+class AsyncPlayer:
+    def __init__(self, name: str):
+        self._name = name
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    async def play(self, state: GameState, legal: List[Move]) -> Move:
+        raise NotImplementedError
+
+    async def notify(self, command: str, payload: Dict[str, Any]) -> None:
+        pass
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(name={self.name})'
+
+
+class LocalSeat(AsyncPlayer):
+    # A synchronous Player in the server process. Searching players (MCTSPlayer by default) run in the executor, so the
+    # event loop keeps serving the other tables while they think.
+    def __init__(self, player: Player, executor: Optional[Executor] = None, offload: Optional[bool] = None):
+        super().__init__(player.name)
+        self.player = player
+        self._executor = executor
+        self._offload: bool = isinstance(player, MCTSPlayer) if offload is None else offload
+
+    async def play(self, state: GameState, legal: List[Move]) -> Move:
+        if not self._offload:
+            return self.player.play(state, legal)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.player.play, state, legal)
+
+
+class RemoteSeat(AsyncPlayer):
+    def __init__(self, name: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        super().__init__(name)
+        self._reader = reader
+        self._writer = writer
+
+    async def send(self, command: str, payload: Dict[str, Any]) -> None:
+        try:
+            self._writer.write(f'{command} {json.dumps(payload)}\n'.encode())
+            await self._writer.drain()
+        except (ConnectionError, RuntimeError) as e:
+            raise SeatDisconnected(self.name) from e
+
+    async def notify(self, command: str, payload: Dict[str, Any]) -> None:
+        await self.send(command, payload)
+
+    async def play(self, state: GameState, legal: List[Move]) -> Move:
+        await self.send('TURN', turn_payload(state, legal))
+        while True:
+            line: str = await read_line(self._reader, self.name)
+            command, _, argument = line.partition(' ')
+            index: Optional[int] = parse_index(argument, len(legal)) if command == 'PLAY' else None
+            if index is not None:
+                return legal[index]
+            await self.send('ERROR', {'message': f'expected PLAY 0..{len(legal) - 1}, got {line!r}'})
+
+
+@dataclass(frozen=True)
+class TableResult:
+    table: str
+    placements: Optional[List[int]]
+    moves: int
+    reason: str
+
+
+class Table:
+    def __init__(self, name: str, players: int, ruleset: Iterable[Rule] = standard_ruleset,
+                 deck: Deck = GERMAN_CARDS_DECK, init_cards: int = 5, seed: Optional[int] = None,
+                 max_moves: int = 1000):
+        if players < 2:
+            raise ServerException('Not enough players')
+        self.name = name
+        self.rng = GameRandom(random.getrandbits(64) if seed is None else seed)
+        self.state, self.moves = create_game(ruleset, deck, players, init_cards, rng=self.rng)
+        self.seats: List[Optional[AsyncPlayer]] = [None] * players
+        self.max_moves = max_moves
+        self.done: asyncio.Future[TableResult] = asyncio.get_running_loop().create_future()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def full(self) -> bool:
+        return all(seat is not None for seat in self.seats)
+
+    @property
+    def started(self) -> bool:
+        return self._task is not None
+
+    def seat(self, player: AsyncPlayer, seat: Optional[int] = None) -> int:
+        free: List[int] = [k for k, s in enumerate(self.seats) if s is None]
+        if not free or seat is not None and seat not in free:
+            raise ServerException(f'No free seat at table {self.name}')
+        seat = free[0] if seat is None else seat
+        self.seats[seat] = player
+        if self.full:
+            self._task = asyncio.create_task(self._run())
+        return seat
+
+    async def _broadcast(self, command: str, payload: Dict[str, Any]) -> None:
+        await asyncio.gather(*(seat.notify(command, payload) for seat in self.seats if seat is not None),
+                             return_exceptions=True)
+
+    async def _run(self) -> None:
+        state: GameState = self.state
+        reason: str = 'finished'
+        try:
+            while not finished(state):
+                legal: List[Move] = legal_moves(state, self.moves)
+                seat: int = state.i
+                move: Move = await self.seats[seat].play(state, legal)  # type: ignore
+                state = move.apply(state, self.rng.reshuffle)
+                await self._broadcast('MOVE', {'seat': seat, **move_payload(move)})
+                if state.mc == self.max_moves:
+                    reason = 'move limit'
+                    break
+        except SeatDisconnected as e:
+            reason = f'{e} disconnected'
+        except Exception as e:
+            self.done.set_exception(e)
+            return
+        self.state = state
+        result = TableResult(self.name, winners(state), state.mc, reason)
+        await self._broadcast('END', {'placements': result.placements, 'moves': result.moves, 'reason': reason})
+        self.done.set_result(result)
+
+
+class GameServer:
+    def __init__(self, executor: Optional[Executor] = None):
+        self._executor = executor
+        self.tables: Dict[str, Table] = {}
+        self._servers: List[asyncio.AbstractServer] = []
+
+    def add_table(self, name: str, players: int, bots: Optional[Dict[int, Player]] = None, **options) -> Table:
+        # bots take the given seats, the others are filled by clients in the order they join
+        if name in self.tables:
+            raise ServerException(f'Table {name} exists')
+        table = self.tables[name] = Table(name, players, **options)
+        for seat, bot in (bots or {}).items():
+            bot.rng = table.rng.seat(seat)
+            table.seat(LocalSeat(bot, self._executor), seat)
+        return table
+
+    async def start_tcp(self, host: str = '127.0.0.1', port: int = 0) -> asyncio.AbstractServer:
+        server = await asyncio.start_server(self._handle, host, port)
+        self._servers.append(server)
+        return server
+
+    async def start_unix(self, path: str) -> asyncio.AbstractServer:
+        server = await asyncio.start_unix_server(self._handle, path)
+        self._servers.append(server)
+        return server
+
+    async def results(self) -> List[TableResult]:
+        return list(await asyncio.gather(*(table.done for table in self.tables.values())))
+
+    async def close(self) -> None:
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers.clear()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # a connection joins one table and stays open until the table ends
+        try:
+            while True:
+                parts = (await read_line(reader, 'client')).split()
+                table = self.tables.get(parts[1]) if len(parts) == 3 and parts[0] == 'JOIN' else None
+                if table is None or table.full:
+                    writer.write(f'ERROR {json.dumps({"message": "expected JOIN <open table> <name>"})}\n'.encode())
+                    await writer.drain()
+                    continue
+                # the seat is taken before anything is awaited, the table's first TURN is written after JOINED
+                seat = RemoteSeat(parts[2], reader, writer)
+                number: int = table.seat(seat)
+                await seat.send('JOINED', {'table': table.name, 'seat': number, 'players': len(table.seats)})
+                try:
+                    await asyncio.shield(table.done)
+                except Exception as e:
+                    # the game failed: the clients get the reason before their connections close
+                    await seat.send('ERROR', {'message': f'table {table.name} failed: {e!r}'})
+                return
+        except (ConnectionError, SeatDisconnected):
+            return
+        finally:
+            writer.close()
+
+
+async def run_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, table: str, name: str,
+                     choose: Callable[[Dict[str, Any]], int] = lambda turn: 0) -> Dict[str, Any]:
+    # A scripted client: joins `table`, answers every TURN with choose(turn) and returns the END payload. An ERROR
+    # before JOINED, or as the last line before the server closes the connection, raises a ServerException.
+    writer.write(f'JOIN {table} {name}\n'.encode())
+    await writer.drain()
+    joined: bool = False
+    error: Optional[str] = None
+    try:
+        while True:
+            line: bytes = await reader.readline()
+            if not line:
+                if error is not None:
+                    raise ServerException(error)
+                raise SeatDisconnected(name)
+            command, _, payload = line.decode().strip().partition(' ')
+            error = json.loads(payload)['message'] if command == 'ERROR' else None
+            if command == 'JOINED':
+                joined = True
+            elif command == 'TURN':
+                writer.write(f'PLAY {choose(json.loads(payload))}\n'.encode())
+                await writer.drain()
+            elif command == 'END':
+                return json.loads(payload)
+            elif command == 'ERROR' and not joined:
+                raise ServerException(error)
+    finally:
+        writer.close()
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from random import Random
+from typing import List, Tuple, Any, Iterable, Optional
+
+from pharaoh.game_state import GameState
+from pharaoh.move import Move
+from pharaoh.zobrist import full_hash
+
+
+class SimStateException(Exception):
+    pass
+
+
+class SimState:
+    # Mutable counterpart of GameState for simulations. Fields keep the same (persistent) values as in GameState,
+    # but moves are applied in place and every overwritten field is recorded in a log, so undo() restores the state
+    # before the last applied move without copying anything.
+    FIELDS: Tuple[str, ...] = tuple(GameState._pclass_fields)
+    __slots__ = FIELDS + ('_log', '_marks')
+
+    def __init__(self, state: GameState):
+        for name in self.FIELDS:
+            object.__setattr__(self, name, getattr(state, name))
+        object.__setattr__(self, '_log', [])
+        object.__setattr__(self, '_marks', [])
+
+    @classmethod
+    def from_state(cls, state: GameState) -> SimState:
+        return cls(state)
+
+    def to_state(self) -> GameState:
+        return GameState(**{name: getattr(self, name) for name in self.FIELDS})
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        self._log.append((name, getattr(self, name)))
+        object.__setattr__(self, name, value)
+
+    def __getitem__(self, name: str) -> Any:
+        return getattr(self, name)
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        self.__setattr__(name, value)
+
+    @property
+    def zobrist(self) -> int:
+        return full_hash(self) if self.zh is None else self.zh
+
+    @property
+    def depth(self) -> int:
+        return len(self._marks)
+
+    def apply(self, move: Move, rng: Optional[Random] = None) -> None:
+        self._marks.append(len(self._log))
+        try:
+            move.apply_in_place(self, rng)
+        except Exception:
+            self.undo()
+            raise
+
+    def apply_all(self, moves: Iterable[Move], rng: Optional[Random] = None) -> None:
+        for move in moves:
+            self.apply(move, rng)
+
+    def undo(self) -> None:
+        if not self._marks:
+            raise SimStateException('no move to undo')
+        mark: int = self._marks.pop()
+        log: List[Tuple[str, Any]] = self._log
+        while len(log) > mark:
+            name, value = log.pop()
+            object.__setattr__(self, name, value)
+
+    def forget(self) -> None:
+        self._log.clear()
+        self._marks.clear()
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.FIELDS)
+        return f'{self.__class__.__name__}({fields})'
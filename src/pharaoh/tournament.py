@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from enum import Enum
+from math import sqrt
+from typing import List, Sequence, Optional, Tuple, Iterator, Iterable
+
+from pharaoh.card import Deck, GERMAN_CARDS_DECK
+from pharaoh.game import create_game, final_state, winners
+from pharaoh.game_state import GameState
+from pharaoh.move import Move
+from pharaoh.player import Player
+from pharaoh.rng import GameRandom
+from pharaoh.rule import Rule, standard_ruleset
+
+
+class TournamentException(Exception):
+    pass
+
+
+class SeatRotation(Enum):
+    FIXED = 'fixed'
+    ROTATE = 'rotate'
+    SHUFFLE = 'shuffle'
+
+
+@dataclass(frozen=True)
+class GameResult:
+    game: int
+    # seats[s] is the roster index of the player on seat s, placements are roster indices in finishing order
+    seats: Tuple[int, ...]
+    placements: Optional[Tuple[int, ...]]
+    length: int
+
+    @property
+    def finished(self) -> bool:
+        return self.placements is not None
+
+
+class TournamentStats:
+    # Running aggregates over the game results seen so far; games stopped at the move limit only count for the
+    # game length.
+    def __init__(self, names: Sequence[str]):
+        self.names: List[str] = list(names)
+        self.games: int = 0
+        self.unfinished: int = 0
+        self.total_length: int = 0
+        self.placements: List[List[int]] = [[0] * len(names) for _ in names]
+
+    def add(self, result: GameResult) -> None:
+        self.games += 1
+        self.total_length += result.length
+        if result.placements is None:
+            self.unfinished += 1
+            return
+        for place, player in enumerate(result.placements):
+            self.placements[player][place] += 1
+
+    @property
+    def finished(self) -> int:
+        return self.games - self.unfinished
+
+    @property
+    def mean_length(self) -> float:
+        return self.total_length / self.games if self.games else 0.0
+
+    def wins(self, player: int) -> int:
+        return self.placements[player][0]
+
+    def win_rate(self, player: int) -> float:
+        return self.wins(player) / self.finished if self.finished else 0.0
+
+    def win_interval(self, player: int, z: float = 1.96) -> Tuple[float, float]:
+        # Wilson score interval, it stays inside [0, 1] for small samples and extreme rates
+        n: int = self.finished
+        if n == 0:
+            return 0.0, 1.0
+        p: float = self.win_rate(player)
+        center: float = (p + z * z / (2 * n)) / (1 + z * z / n)
+        margin: float = z * sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return max(0.0, center - margin), min(1.0, center + margin)
+
+    def mean_placement(self, player: int) -> float:
+        counts = self.placements[player]
+        return sum(place * count for place, count in enumerate(counts)) / self.finished if self.finished else 0.0
+
+    def summary(self) -> str:
+        lines: List[str] = [f'games: {self.games} (unfinished: {self.unfinished}), '
+                            f'mean length: {self.mean_length:.1f}']
+        for player, name in enumerate(self.names):
+            low, high = self.win_interval(player)
+            lines.append(f'{name}: win rate {self.win_rate(player):.3f} [{low:.3f}, {high:.3f}], '
+                         f'mean placement {self.mean_placement(player):.2f}, placements {self.placements[player]}')
+        return '\n'.join(lines)
+
+
+class _Table:
+    # Everything a worker needs to play any game of the tournament; game `j` only depends on `j` and the seed (every
+    # game has its own GameRandom, a child of the tournament seed).
+    def __init__(self, roster: Sequence[Player], moves: Sequence[Move], deck: Deck, init_cards: int,
+                 rotation: SeatRotation, seed: int, max_moves: int):
+        self.roster = roster
+        self.moves = moves
+        self.deck = deck
+        self.init_cards = init_cards
+        self.rotation = rotation
+        self.seed = seed
+        self.max_moves = max_moves
+
+    def seats(self, game: int, rnd: random.Random) -> Tuple[int, ...]:
+        order: List[int] = list(range(len(self.roster)))
+        if self.rotation == SeatRotation.ROTATE:
+            shift: int = game % len(order)
+            order = order[shift:] + order[:shift]
+        elif self.rotation == SeatRotation.SHUFFLE:
+            rnd.shuffle(order)
+        return tuple(order)
+
+    def play(self, game: int) -> GameResult:
+        rng: GameRandom = GameRandom(self.seed).child('game', game)
+        seats = self.seats(game, rng.stream('seats'))
+        state: GameState = GameState.init_state(self.deck, len(seats), self.init_cards, rng.deal.shuffle)
+        state = final_state(state, [self.roster[player] for player in seats], self.moves, self.max_moves, rng)
+        order: Optional[List[int]] = winners(state)
+        placements = None if order is None else tuple(seats[seat] for seat in order)
+        return GameResult(game, seats, placements, state.mc)
+
+    def play_all(self, games: Iterable[int]) -> List[GameResult]:
+        return [self.play(game) for game in games]
+
+
+_worker_table: Optional[_Table] = None
+
+
+def _init_worker(table: _Table) -> None:
+    global _worker_table
+    _worker_table = table
+
+
+def _play_worker(first: int, last: int) -> List[GameResult]:
+    if _worker_table is None:
+        raise TournamentException('Worker was not initialized')
+    return _worker_table.play_all(range(first, last))
+
+
+class Tournament:
+    def __init__(self, roster: Sequence[Player], games: int, rotation: SeatRotation = SeatRotation.ROTATE,
+                 workers: int = 1, seed: Optional[int] = None, ruleset: Iterable[Rule] = standard_ruleset,
+                 deck: Deck = GERMAN_CARDS_DECK, init_cards: int = 5, max_moves: int = 1000,
+                 chunk_size: Optional[int] = None):
+        if len(roster) < 2:
+            raise TournamentException('Not enough players')
+        _, moves = create_game(ruleset, deck, len(roster), init_cards)
+        self._table = _Table(roster, moves, deck, init_cards, rotation,
+                             random.getrandbits(32) if seed is None else seed, max_moves)
+        self._games = games
+        self._workers = workers
+        self._chunk_size: int = chunk_size if chunk_size else max(1, min(100, games // (8 * workers)))
+        self.stats = TournamentStats([player.name for player in roster])
+
+    @property
+    def seed(self) -> int:
+        return self._table.seed
+
+    def results(self) -> Iterator[GameResult]:
+        # Yields every game result as soon as its chunk is done (in completion order, not game order) after adding
+        # it to `stats`, so the aggregates are a partial summary at any point of the iteration.
+        if self._workers <= 1:
+            for game in range(self._games):
+                yield from self._collect([self._table.play(game)])
+            return
+        chunks = [(first, min(first + self._chunk_size, self._games))
+                  for first in range(0, self._games, self._chunk_size)]
+        with ProcessPoolExecutor(self._workers, initializer=_init_worker, initargs=(self._table,)) as executor:
+            futures = [executor.submit(_play_worker, first, last) for first, last in chunks]
+            try:
+                for future in as_completed(futures):
+                    yield from self._collect(future.result())
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def _collect(self, results: List[GameResult]) -> Iterator[GameResult]:
+        for result in results:
+            self.stats.add(result)
+            yield result
+
+    def run(self) -> TournamentStats:
+        for _ in self.results():
+            pass
+        return self.stats
@@ -0,0 +1,95 @@
+from functools import lru_cache
+from typing import Iterable, Tuple, Sequence
+
+from pharaoh.card import Card
+
+# Zobrist-style position hash: every (card, location) pair and every value of a hashed scalar field has a fixed
+# pseudo-random 64-bit key and the hash is the sum of the keys of the position modulo 2**64. Sums (unlike xor) keep
+# copies of the same card in one location apart, and every action can update the hash by adding and subtracting keys.
+# Keys are derived with splitmix64 from the field and card numbers, so they are the same in every process.
+MASK64: int = (1 << 64) - 1
+SCALARS: Tuple[str, ...] = ('suit', 'val', 'ace', 'cnt', 'i')
+
+_DISCARD_PILE: int = 1
+_STOCK: int = 2
+_HAND: int = 3
+_SCALAR: int = 4
+_LP_MC: int = 5
+
+
+def _mix(x: int) -> int:
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+@lru_cache(maxsize=None)
+def _key(*parts: int) -> int:
+    h: int = 0
+    for part in parts:
+        h = _mix(h ^ (part & MASK64))
+    return h
+
+
+def _card(card: Card) -> int:
+    return int(card.suit) << 8 | int(card.value)
+
+
+def discard_key(card: Card) -> int:
+    return _key(_DISCARD_PILE, _card(card))
+
+
+def stock_key(card: Card, position: int) -> int:
+    # cards are drawn from the front of the stock, so the position is counted from its bottom (the end)
+    return _key(_STOCK, _card(card), position)
+
+
+def hand_key(card: Card, player: int) -> int:
+    return _key(_HAND, _card(card), player)
+
+
+def scalar_key(name: str, value: int) -> int:
+    return _key(_SCALAR, SCALARS.index(name), int(value))
+
+
+def lp_mc_key(player: int, mc: int) -> int:
+    return _key(_LP_MC, player, mc)
+
+
+def stock_hash(stock: Iterable[Card]) -> int:
+    cards = list(stock)
+    return sum(stock_key(card, len(cards) - 1 - k) for k, card in enumerate(cards)) & MASK64
+
+
+def full_hash(state) -> int:
+    h: int = 0
+    for player, hand in enumerate(state.lp):
+        h += sum(hand_key(card, player) for card in hand)
+    h += sum(discard_key(card) for card in state.dp)
+    h += stock_hash(state.st)
+    h += sum(scalar_key(name, state[name]) for name in SCALARS)
+    h += sum(lp_mc_key(player, mc) for player, mc in enumerate(state.lp_mc))
+    return h & MASK64
+
+
+def played(h: int, cards: Iterable[Card], player: int) -> int:
+    return (h + sum(discard_key(card) - hand_key(card, player) for card in cards)) & MASK64
+
+
+def drawn(h: int, stock: Sequence[Card], count: int, player: int) -> int:
+    n: int = len(stock)
+    return (h + sum(hand_key(card, player) - stock_key(card, n - 1 - k)
+                    for k, card in enumerate(stock[:count]))) & MASK64
+
+
+def reshuffled(h: int, old_stock: Iterable[Card], cards: Iterable[Card], new_stock: Iterable[Card]) -> int:
+    return (h - stock_hash(old_stock) - sum(discard_key(card) for card in cards) + stock_hash(new_stock)) & MASK64
+
+
+def changed(h: int, name: str, old: int, new: int) -> int:
+    return (h + scalar_key(name, new) - scalar_key(name, old)) & MASK64
+
+
+def finished_player(h: int, player: int, old: int, new: int) -> int:
+    return (h + lp_mc_key(player, new) - lp_mc_key(player, old)) & MASK64
@@ -0,0 +1,87 @@
+import random
+import unittest
+from typing import List
+
+from pharaoh.card import GERMAN_CARDS_DECK, Card, Suit, Value
+from pharaoh.game import create_game, legal_moves, finished, winners
+from pharaoh.game_state import GameState, Hand
+from pharaoh.move import Move
+from pharaoh.player import BiggestTuplePlayer, SmallestTuplePlayer
+from pharaoh.rule import standard_ruleset
+
+try:
+    import numpy as np
+    from pharaoh.batch import BatchMoves, BatchGames, RandomPolicy, UniformPolicy, BiggestTuplePolicy, \
+        SmallestTuplePolicy, simulate
+except ImportError:
+    np = None
+
+PLAYERS: int = 3
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class TestBatch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.mix_cards = Move.mix_cards
+        _, self.moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, PLAYERS, 5)
+        self.table = BatchMoves(self.moves, GERMAN_CARDS_DECK)
+
+    def tearDown(self) -> None:
+        Move.mix_cards = self.mix_cards
+
+    def games(self, seeds: range) -> 'BatchGames':
+        rngs = [random.Random(seed) for seed in seeds]
+        states = [GameState.init_state(GERMAN_CARDS_DECK, PLAYERS, 5, mix_cards=rng.shuffle) for rng in rngs]
+        return BatchGames(self.table, states, rngs)
+
+    def play(self, seed: int) -> GameState:
+        rng = random.Random(seed)
+        state = GameState.init_state(GERMAN_CARDS_DECK, PLAYERS, 5, mix_cards=rng.shuffle)
+        Move.mix_cards = rng.shuffle
+        players = [None, BiggestTuplePlayer('biggest'), SmallestTuplePlayer('smallest')]
+        while not finished(state) and state.mc < 1000:
+            legal: List[Move] = legal_moves(state, self.moves)
+            player = players[state.i]
+            state = (rng.choice(legal) if player is None else player.play(state, legal)).apply(state)
+        return state
+
+    def test_same_games_as_object_engine(self):
+        seeds = range(20)
+        games = simulate(self.games(seeds), [RandomPolicy(), BiggestTuplePolicy(), SmallestTuplePolicy()])
+        for k, seed in enumerate(seeds):
+            expected, state = self.play(seed), games.to_state(k)
+            self.assertEqual(winners(expected), games.winners(k))
+            self.assertEqual(expected.mc, state.mc)
+            self.assertEqual([sorted(hand) for hand in expected.lp], [sorted(hand) for hand in state.lp])
+            self.assertEqual((expected.st, expected.dp), (state.st, state.dp))
+
+    def test_games_keep_their_deck_size(self):
+        top = Card(Suit.HEART, Value.IX)
+        small = GameState(dp=[top], st=[Card(Suit.ACORN, Value.IX)],
+                          lp=(Hand([Card(Suit.HEART, Value.X)]), Hand([Card(Suit.HEART, Value.KING)]),
+                              Hand([Card(Suit.BELL, Value.VIII)])),
+                          ace=0, suit=top.suit, val=top.value, cnt=1, i=0, mc=20, lp_mc=(-1, -1, -1), deck_size=5)
+        full = GameState.init_state(GERMAN_CARDS_DECK, PLAYERS, 5, mix_cards=random.Random(1).shuffle)
+        games = BatchGames(self.table, [small, full], [random.Random(1), random.Random(2)])
+        self.assertEqual([5, 32], [games.to_state(k).deck_size for k in range(2)])
+
+    def test_legal_moves(self):
+        games = self.games(range(10))
+        rows = np.arange(games.size)
+        for _ in range(40):
+            rows = rows[games.running()[rows]]
+            legal = games.legal(rows)
+            for row, k in enumerate(rows):
+                state = games.to_state(k)
+                expected = [pos for pos, mv in enumerate(self.moves) if mv.test(state)]
+                self.assertEqual(expected, list(np.flatnonzero(legal[row])))
+            games.apply(rows, UniformPolicy(1).choose(games, rows, legal))
+
+    def test_uniform_policy_finishes_games(self):
+        games = simulate(self.games(range(50)), [UniformPolicy(3)] * PLAYERS, max_moves=None)
+        self.assertTrue(games.finished.all())
+        self.assertTrue(all(sorted(games.winners(k)) == list(range(PLAYERS)) for k in range(games.size)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import random
+import unittest
+
+from pyrsistent import pvector
+
+from pharaoh.canonical import MoveClasses
+from pharaoh.card import GERMAN_CARDS_DECK, Card, Suit, Value
+from pharaoh.game import create_game, legal_moves, finished
+from pharaoh.game_state import GameState, ValidationMode, validation
+from pharaoh.move import Move
+from pharaoh.move_cache import move_cache
+from pharaoh.player import HumanPlayer
+from pharaoh.rule import standard_ruleset
+
+
+def effect(state: GameState):
+    return ([sorted(hand) for hand in state.lp], state.st, sorted(state.dp), state.dp[-1],
+            [state[name] for name in ('suit', 'val', 'ace', 'cnt', 'i', 'mc', 'lp_mc')])
+
+
+class TestCanonicalMoves(unittest.TestCase):
+    def setUp(self) -> None:
+        random.seed(6)
+        self.mix_cards = Move.mix_cards
+        Move.mix_cards = lambda cards: cards.sort()
+        self.state, self.full = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5)
+        _, self.canonical = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5, canonical=True)
+        self.classes: MoveClasses = move_cache.classes(standard_ruleset, GERMAN_CARDS_DECK, 3)
+
+    def tearDown(self) -> None:
+        Move.mix_cards = self.mix_cards
+
+    def test_classes(self):
+        self.assertEqual(len(self.classes), len(self.canonical))
+        self.assertLess(len(self.canonical), len(self.full))
+        for mv in self.full:
+            representative = self.classes.representative(mv)
+            self.assertIn(representative, self.classes.members(mv))
+            self.assertEqual(sorted(mv.cards), sorted(representative.cards))
+            self.assertEqual(mv.cards[-1:], representative.cards[-1:])
+
+    def test_members_have_same_effect(self):
+        rnd = random.Random(3)
+        state = self.state
+        while not finished(state) and state.mc < 200:
+            legal = legal_moves(state, self.full)
+            self.assertEqual({id(self.classes.representative(mv)) for mv in legal},
+                             {id(mv) for mv in legal_moves(state, self.canonical)})
+            for mv in legal:
+                self.assertEqual(effect(mv.apply(state)), effect(self.classes.representative(mv).apply(state)))
+            state = rnd.choice(legal).apply(state)
+
+    def test_human_player_maps_order_to_class(self):
+        cards = [Card(suit, Value.IX) for suit in (Suit.HEART, Suit.BELL, Suit.ACORN, Suit.LEAF)]
+        with validation.mode_set_to(ValidationMode.OFF):
+            state = self.state.set(lp=self.state.lp.set(0, self.state.lp[0].update(cards)), suit=Suit.HEART,
+                                   val=Value.KING, ace=0, cnt=1, i=0, zh=None)
+        played = pvector([cards[0], cards[2], cards[1], cards[3]])
+        self.assertNotIn(played, [mv.cards for mv in self.canonical])
+        player = HumanPlayer('human', lambda _: (played, Suit.LEAF), self.classes)
+        legal = legal_moves(state, self.canonical)
+        move = player.play(state, legal)
+        self.assertIn(move, legal)
+        self.assertEqual(sorted(played), sorted(move.cards))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import pickle
+import random
+import unittest
+
+from pharaoh import instrumentation
+from pharaoh.card import GERMAN_CARDS_DECK, Card, Suit, Value
+from pharaoh.endgame import EndgameSolver
+from pharaoh.game import create_game, legal_moves, finished
+from pharaoh.game_state import GameState, Hand
+from pharaoh.mcts import StopReason
+from pharaoh.player import MCTSPlayer
+from pharaoh.rule import standard_ruleset
+
+
+class TestEndgameSolver(unittest.TestCase):
+    def setUp(self) -> None:
+        _, self.moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 2, 5)
+        # player 0 wins by playing both tens at once, after a single ten player 1 wins with the king
+        top = Card(Suit.HEART, Value.VIII)
+        self.state = GameState(dp=[top], st=[Card(Suit.ACORN, Value.IX), Card(Suit.LEAF, Value.IX)],
+                               lp=(Hand([Card(Suit.HEART, Value.X), Card(Suit.BELL, Value.X)]),
+                                   Hand([Card(Suit.HEART, Value.KING)])),
+                               ace=0, suit=top.suit, val=top.value, cnt=1, i=0, mc=20, lp_mc=(-1, -1), deck_size=6)
+
+    def test_winning_move(self):
+        solver = EndgameSolver(self.moves)
+        self.assertTrue(solver.applies(self.state))
+        solution = solver.solve(self.state)
+        self.assertEqual((2, 1, True), (len(solution.move.cards), solution.value, solution.exact))
+        self.assertTrue(finished(solution.move.apply(self.state)))
+        self.assertEqual({'solved': 1, 'exact': 1, 'unsolved': 0}, {k: solver.counters()[k] for k in
+                                                                       ('solved', 'exact', 'unsolved')})
+
+    def test_budget_and_threshold(self):
+        rnd = random.Random(3)
+        state, _ = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5)
+        self.assertFalse(EndgameSolver(self.moves).applies(state))
+        for _ in range(6):
+            state = rnd.choice(legal_moves(state, self.moves)).apply(state)
+        solver = EndgameSolver(self.moves, max_cards=40, max_stock=40, max_nodes=5)
+        with instrumentation.collecting() as collector:
+            self.assertIsNone(solver.solve(state))
+        self.assertEqual(1, collector.counters['endgame.unsolved'])
+        self.assertRaises(ValueError, EndgameSolver, self.moves, max_nodes=0)
+
+    def test_table_reused(self):
+        state = self.state.set(lp=self.state.lp.set(0, Hand([Card(Suit.HEART, Value.X), Card(Suit.BELL, Value.IX)])))
+        solver = EndgameSolver(self.moves)
+        first = solver.solve(state)
+        second = solver.solve(state)
+        self.assertEqual((first.move, first.value), (second.move, second.value))
+        self.assertLessEqual(second.nodes, first.nodes)
+        self.assertGreater(solver.hits, 0)
+        self.assertEqual(solver.hits / (solver.hits + solver.misses), solver.counters()['hit_rate'])
+        solver = pickle.loads(pickle.dumps(solver))
+        solver.clear()
+        self.assertEqual(0, len(solver))
+
+    def test_player_uses_solver(self):
+        player = MCTSPlayer('mcts', self.moves, iterations=10, endgame=EndgameSolver(self.moves))
+        move = player.play(self.state, legal_moves(self.state, self.moves))
+        self.assertEqual(2, len(move.cards))
+        self.assertIs(StopReason.SOLVED, player.last_stats.reason)
+
+
+if __name__ == '__main__':
+    unittest.main()
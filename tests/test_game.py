@@ -0,0 +1,106 @@
+import random
+import unittest
+from typing import List
+
+from pyrsistent import pvector
+
+from pharaoh.card import GERMAN_CARDS_DECK
+from pharaoh.game import create_game, legal_moves, finished, game_steps, final_state, play_game
+from pharaoh.game_state import GameState, ValidationMode, set_validation_mode
+from pharaoh.move import Move, Condition, compile_conditions, ace_is_zero_cond, cond1
+from pharaoh.move_index import MoveIndex
+from pharaoh.player import RandomPlayer
+from pharaoh.rule import standard_ruleset
+
+
+def setUpModule():
+    # every state of these tests runs the invariant checks
+    set_validation_mode(ValidationMode.FULL)
+
+
+def tearDownModule():
+    set_validation_mode(ValidationMode.OFF)
+
+
+def random_states(games: int, player_count: int) -> List[GameState]:
+    rnd = random.Random(7)
+    states: List[GameState] = []
+    for _ in range(games):
+        state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, player_count, 5)
+        while not finished(state) and state.mc < 300:
+            states.append(state)
+            state = rnd.choice(legal_moves(state, moves)).apply(state)
+    return states
+
+
+class TestMoveIndex(unittest.TestCase):
+    def test_create_game_returns_index(self):
+        _, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5)
+        self.assertIsInstance(moves, MoveIndex)
+        self.assertEqual(len(moves), len(list(moves)))
+        self.assertIs(moves[0], next(iter(moves)))
+
+    def test_same_result_as_linear_scan(self):
+        _, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 4, 5)
+        linear: List[Move] = list(pvector(moves))
+        for state in random_states(3, 4):
+            self.assertEqual([mv for mv in linear if mv.test(state)], legal_moves(state, moves))
+
+
+class TestGameSteps(unittest.TestCase):
+    def setUp(self) -> None:
+        self.mix_cards = Move.mix_cards
+        Move.mix_cards = random.shuffle
+        random.seed(11)
+        self.state, self.moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5)
+        self.players = [RandomPlayer(str(i)) for i in range(3)]
+
+    def tearDown(self) -> None:
+        Move.mix_cards = self.mix_cards
+
+    def test_same_game_as_play_game(self):
+        random.seed(3)
+        states, history = play_game(self.state, self.players, self.moves)
+        random.seed(3)
+        steps = list(game_steps(self.state, self.players, self.moves))
+        self.assertEqual(states[:-1], [step.state for step in steps])
+        self.assertEqual(history, [step.move for step in steps])
+        self.assertEqual(states[1:], [step.next_state for step in steps])
+        random.seed(3)
+        self.assertEqual(states[-1], final_state(self.state, self.players, self.moves))
+
+    def test_stop_early(self):
+        steps = game_steps(self.state, self.players, self.moves)
+        for step in steps:
+            if step.next_state.mc == 5:
+                break
+        self.assertEqual(5, step.next_state.mc)
+        self.assertEqual(7, final_state(self.state, self.players, self.moves, max_moves=7).mc)
+
+
+class OddMoveCount(Condition):
+    def test(self, state: GameState) -> bool:
+        return state.mc % 2 == 1
+
+    def _description(self) -> str:
+        return 'mc % 2 == 1'
+
+
+class TestCompiledConditions(unittest.TestCase):
+    def test_same_result_as_conditions(self):
+        _, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5)
+        for state in random_states(1, 3)[::5]:
+            for mv in moves:
+                self.assertEqual(all(c.test(state) for c in mv.conditions), mv.test(state))
+
+    def test_shapes(self):
+        states = random_states(1, 3)[:20]
+        conditions = [[], [ace_is_zero_cond], [cond1], [cond1, OddMoveCount()], [OddMoveCount(), ace_is_zero_cond]]
+        for conds in conditions:
+            predicate = compile_conditions(conds)
+            for state in states:
+                self.assertEqual(all(c.test(state) for c in conds), predicate(state))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import random
+import unittest
+
+from pyrsistent import pbag, pvector, InvariantException
+
+from pharaoh.card import GERMAN_CARDS, GERMAN_CARDS_DECK, Card, Suit, Value, Deck, SUITS
+from pharaoh.game import create_game, legal_moves, finished
+from pharaoh.audit import audit_game, audit_states
+from pharaoh.game_state import Hand, BitHand, GameState, ValidationMode, validation, state_errors
+from pharaoh.move import Move
+from pharaoh.sim_state import SimState
+from pharaoh.zobrist import full_hash
+from pharaoh.rule import standard_ruleset
+
+
+class TestBitHand(unittest.TestCase):
+    def test_hand_api(self):
+        enc = GERMAN_CARDS_DECK.encoding
+        cards = [Card(Suit.HEART, Value.VII), Card(Suit.LEAF, Value.ACE), Card(Suit.BELL, Value.X)]
+        hand = BitHand(cards, enc)
+        self.assertEqual(3, len(hand))
+        self.assertEqual(sorted(cards), sorted(hand))
+        self.assertIn(Card(Suit.LEAF, Value.ACE), hand)
+        self.assertNotIn(Card(Suit.LEAF, Value.KING), hand)
+        smaller = hand - pbag(cards[:2])
+        self.assertEqual([cards[2]], list(smaller))
+        self.assertEqual(1, len(smaller))
+        bigger = smaller.update([Card(Suit.ACORN, Value.OVER)])
+        self.assertEqual(2, len(bigger))
+        self.assertIn(Card(Suit.ACORN, Value.OVER), bigger)
+        self.assertEqual(3, len(hand))
+        self.assertEqual(32, len(enc.cards))
+        self.assertEqual(1, enc.width)
+
+    def test_multiple_copies(self):
+        deck = Deck(pbag(GERMAN_CARDS + GERMAN_CARDS), SUITS, pvector(Value))
+        enc = deck.encoding
+        self.assertEqual(2, enc.width)
+        card = Card(Suit.HEART, Value.IX)
+        hand = BitHand([card, card, Card(Suit.HEART, Value.X)], enc)
+        self.assertEqual(3, len(hand))
+        self.assertEqual(2, hand.count(card))
+        hand = hand - pbag([card])
+        self.assertEqual(1, hand.count(card))
+        self.assertIn(card, hand)
+        hand = hand - pbag([card, card])
+        self.assertNotIn(card, hand)
+        self.assertEqual(1, len(hand))
+        self.assertEqual(2, hand.update([card, card]).count(card))
+
+    def test_subtract_duplicates(self):
+        double = Deck(pbag(GERMAN_CARDS + GERMAN_CARDS), SUITS, pvector(Value))
+        nine, ten, king = Card(Suit.HEART, Value.IX), Card(Suit.HEART, Value.X), Card(Suit.HEART, Value.KING)
+        cases = [(GERMAN_CARDS_DECK, [nine, ten, king], [ten, ten]),
+                 (GERMAN_CARDS_DECK, [nine, ten, king], [ten, Card(Suit.LEAF, Value.X), Card(Suit.LEAF, Value.X)]),
+                 (double, [nine, nine, ten, king], [nine, nine, nine, ten, ten]),
+                 (double, [nine, ten, ten, king], [ten, ten, ten])]
+        for deck, cards, other in cases:
+            expected = Hand(cards) - pbag(other)
+            for removed in (pbag(other), other):
+                hand = BitHand(cards, deck.encoding) - removed
+                self.assertEqual(sorted(expected), sorted(hand))
+                self.assertEqual(len(expected), len(hand))
+
+    def test_same_game_as_pbag_hands(self):
+        for compact in (False, True):
+            rnd = random.Random(3)
+            random.seed(3)
+            state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 4, 5, compact_hands=compact)
+            self.assertIsInstance(state.lp[0], BitHand if compact else Hand)
+            history = []
+            while not finished(state) and state.mc < 300:
+                move = rnd.choice(legal_moves(state, moves))
+                history.append([sorted(h) for h in state.lp])
+                state = move.apply(state)
+            if compact:
+                self.assertEqual(expected, history)
+            else:
+                expected = history
+
+
+class TestValidation(unittest.TestCase):
+    @staticmethod
+    def state(**kwargs) -> GameState:
+        fields = dict(dp=[Card(Suit.HEART, Value.VII)], st=[Card(Suit.HEART, Value.IX)],
+                      lp=(Hand([Card(Suit.HEART, Value.X)]), Hand([Card(Suit.HEART, Value.ACE)])), ace=0,
+                      suit=Suit.HEART, val=Value.VII, cnt=1, i=0, mc=0, lp_mc=(-1, -1), deck_size=4)
+        fields.update(kwargs)
+        return GameState(**fields)
+
+    def test_modes(self):
+        self.assertIs(ValidationMode.OFF, validation.mode)
+        self.assertEqual(5, self.state(deck_size=5).deck_size)
+        with validation.mode_set_to(ValidationMode.FULL):
+            self.state()
+            self.assertRaises(InvariantException, self.state, deck_size=5)
+        with validation.mode_set_to(ValidationMode.SAMPLED, every=3):
+            checked = validation.checked
+            for _ in range(9):
+                self.state()
+            self.assertEqual(checked + 3, validation.checked)
+        with validation.mode_set_to(ValidationMode.SAMPLED, rate=0):
+            self.state(deck_size=5)
+        self.assertIs(ValidationMode.OFF, validation.mode)
+        self.assertRaises(ValueError, validation.configure, ValidationMode.SAMPLED, 0)
+
+    def test_audit(self):
+        mix_cards = Move.mix_cards
+        Move.mix_cards = lambda cards: None
+        try:
+            rnd = random.Random(9)
+            state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5)
+            states, history = [state], []
+            while not finished(state) and state.mc < 300:
+                history.append(rnd.choice(legal_moves(state, moves)))
+                state = history[-1].apply(state)
+                states.append(state)
+            self.assertEqual([], audit_game(states[0], history, states))
+            with validation.mode_set_to(ValidationMode.OFF):
+                states[3] = states[3].set(deck_size=31)
+            issues = audit_states(states)
+            self.assertEqual([3], [issue.index for issue in issues])
+            self.assertIn('card disappeared', issues[0].messages)
+            self.assertEqual([3], [issue.index for issue in audit_game(states[0], history, states)])
+            illegal = next(mv for mv in moves if not mv.test(states[1]))
+            self.assertEqual([1], [issue.index for issue in audit_game(states[0], [history[0], illegal])])
+        finally:
+            Move.mix_cards = mix_cards
+
+
+class TestZobrist(unittest.TestCase):
+    def setUp(self) -> None:
+        self.mix_cards = Move.mix_cards
+        Move.mix_cards = lambda cards: cards.reverse()
+
+    def tearDown(self) -> None:
+        Move.mix_cards = self.mix_cards
+
+    @staticmethod
+    def position(state: GameState):
+        return (tuple(tuple(sorted(hand)) for hand in state.lp), tuple(sorted(state.dp)), tuple(state.st),
+                state.suit, state.val, state.ace, state.cnt, state.i, tuple(state.lp_mc))
+
+    def test_incremental_hash(self):
+        rnd = random.Random(13)
+        for compact in (False, True):
+            state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5, compact_hands=compact)
+            sim = SimState(state)
+            seen = {}
+            with validation.mode_set_to(ValidationMode.OFF):
+                while not finished(state) and state.mc < 300:
+                    self.assertIsNotNone(state.zh)
+                    self.assertEqual(full_hash(state), state.zobrist)
+                    self.assertEqual(state.zobrist, sim.zobrist)
+                    key = self.position(state)
+                    self.assertEqual(seen.setdefault(state.zobrist, key), key)
+                    move = rnd.choice(legal_moves(state, moves))
+                    state = move.apply(state)
+                    sim.apply(move)
+
+    def test_same_position_same_hash(self):
+        state = TestValidation.state(zh=None)
+        self.assertIsNone(state.zh)
+        self.assertEqual(state.zobrist, state.set(mc=7).zobrist)
+        swapped = state.set(lp=[Hand([Card(Suit.HEART, Value.ACE)]), Hand([Card(Suit.HEART, Value.X)])])
+        self.assertNotEqual(state.zobrist, swapped.zobrist)
+        self.assertNotEqual(state.zobrist, state.set(i=1).zobrist)
+        self.assertEqual(['zobrist hash is stale'], state_errors(state.set(zh=state.zobrist + 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import json
+import random
+import unittest
+
+from pharaoh import instrumentation
+from pharaoh.card import GERMAN_CARDS_DECK
+from pharaoh.game import create_game, play_game, game_steps
+from pharaoh.mcts import MCTS
+from pharaoh.player import RandomPlayer
+from pharaoh.rule import standard_ruleset
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self) -> None:
+        random.seed(8)
+        self.state, self.moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5)
+
+    def test_detached_by_default(self):
+        self.assertIsNone(instrumentation.collector)
+        play_game(self.state, [RandomPlayer(str(i)) for i in range(3)], self.moves)
+        self.assertEqual({'counters': {}, 'observations': {}}, instrumentation.snapshot())
+
+    def test_game_loop(self):
+        with instrumentation.collecting() as collector:
+            states, moves = play_game(self.state, [RandomPlayer(str(i)) for i in range(3)], self.moves)
+        self.assertIsNone(instrumentation.collector)
+        snapshot = collector.snapshot()
+        counters, observations = snapshot['counters'], snapshot['observations']
+        self.assertEqual((1, len(moves)), (counters['game.games'], counters['game.moves']))
+        self.assertEqual(len(moves), observations['game.legal_moves']['count'])
+        self.assertEqual(len(moves), observations['move.apply']['count'])
+        self.assertLessEqual(counters['game.legal_moves.passed'], counters['game.legal_moves.tested'])
+        self.assertEqual(snapshot, json.loads(json.dumps(snapshot)))
+
+    def test_game_stopped_early(self):
+        with instrumentation.collecting() as collector:
+            steps = game_steps(self.state, [RandomPlayer(str(i)) for i in range(3)], self.moves)
+            for _ in range(3):
+                next(steps)
+            steps.close()
+        self.assertEqual((1, 3), (collector.counters['game.games'], collector.counters['game.moves']))
+
+    def test_mcts(self):
+        with instrumentation.collecting() as collector:
+            mcts = MCTS(self.state, self.moves, iterations=20)
+            mcts.EARLY_STOP = False
+            mcts.search()
+        counters, observations = collector.counters, collector.snapshot()['observations']
+        self.assertEqual((1, 1, 20), (counters['mcts.searches'], counters['mcts.stop.iterations'],
+                                      counters['mcts.iterations']))
+        self.assertEqual(20, observations['mcts.playout_length']['count'])
+        self.assertLessEqual(observations['mcts.playout_length']['max'], MCTS.DEPTH)
+        self.assertLessEqual(counters.get('mcts.depth_cutoffs', 0), 20)
+        self.assertIn('move.apply_in_place', observations)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+import pickle
+import random
+import unittest
+
+from pharaoh.card import GERMAN_CARDS_DECK, Card, Suit, Value
+from pharaoh.evaluation import HeuristicEvaluation, outcome_scores
+from pharaoh.game import create_game, legal_moves, finished
+from pharaoh.game_state import validation, ValidationMode
+from pharaoh.mcts import MCTS, RootParallelMCTS, TranspositionTable, Node, StopReason
+from pharaoh.move import Move
+from pharaoh import instrumentation
+from pharaoh.player import MCTSPlayer, RandomPlayer, SmallestTuplePlayer
+from pharaoh.rollout import RandomRollout, PlayerRollout, ScoredRollout, EpsilonGreedyRollout, shed_cards, attack
+from pharaoh.rule import standard_ruleset
+
+
+class TestMCTS(unittest.TestCase):
+    def setUp(self) -> None:
+        random.seed(4)
+        self.mix_cards = Move.mix_cards
+        Move.mix_cards = random.shuffle
+        self.state, self.moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5)
+        MCTS.EARLY_STOP = False
+
+    def tearDown(self) -> None:
+        MCTS.EARLY_STOP = True
+        Move.mix_cards = self.mix_cards
+
+    def test_moves_and_states_are_picklable(self):
+        moves = pickle.loads(pickle.dumps(self.moves))
+        state = pickle.loads(pickle.dumps(self.state))
+        self.assertEqual([sorted(hand) for hand in self.state.lp], [sorted(hand) for hand in state.lp])
+        self.assertEqual(self.state.st, state.st)
+        self.assertEqual([repr(mv) for mv in legal_moves(self.state, self.moves)],
+                         [repr(mv) for mv in legal_moves(state, moves)])
+
+    def test_iterations(self):
+        mcts = MCTS(self.state, self.moves, iterations=7)
+        stats = mcts.run()
+        self.assertEqual(7, mcts.root.visits)
+        self.assertEqual((7, StopReason.ITERATIONS), (stats.iterations, stats.reason))
+        self.assertIs(stats, mcts.stats)
+        self.assertIn(stats.move, legal_moves(self.state, self.moves))
+
+    def test_deadline(self):
+        stats = MCTS(self.state, self.moves, iterations=10 ** 9).run(time_limit=0.2)
+        self.assertIs(StopReason.DEADLINE, stats.reason)
+        self.assertGreater(stats.iterations, 0)
+        self.assertLess(stats.elapsed, 1)
+
+    def test_deadline_before_first_iteration(self):
+        for time_limit in (0.0, 1e-5):
+            stats = MCTS(self.state, self.moves, iterations=10 ** 9).run(time_limit=time_limit)
+            self.assertIs(StopReason.DEADLINE, stats.reason)
+            self.assertEqual(1, stats.iterations)
+            self.assertIn(stats.move, legal_moves(self.state, self.moves))
+
+    def test_early_stop(self):
+        MCTS.EARLY_STOP = True
+        mcts = MCTS(self.state, self.moves, iterations=500)
+        stats = mcts.run()
+        self.assertIs(StopReason.DECIDED, stats.reason)
+        self.assertLess(stats.iterations, 500)
+        first, second = sorted((child.visits for child in mcts.root.children), reverse=True)[:2]
+        self.assertGreater(first - second, 500 - mcts.root.visits)
+
+    def test_forced_move(self):
+        state = self.state
+        rnd = random.Random(2)
+        while len(legal_moves(state, self.moves)) != 1:
+            state = rnd.choice(legal_moves(state, self.moves)).apply(state)
+        stats = MCTS(state, self.moves).run()
+        self.assertEqual((0, StopReason.FORCED), (stats.iterations, stats.reason))
+
+    def test_rollout_policies(self):
+        policies = [RandomRollout(), PlayerRollout(SmallestTuplePlayer('smallest')), ScoredRollout(shed_cards),
+                    EpsilonGreedyRollout(ScoredRollout(attack), 0.2)]
+        cutoffs = []
+        for policy in policies:
+            policy = pickle.loads(pickle.dumps(policy))
+            with instrumentation.collecting() as collector:
+                mcts = MCTS(self.state, self.moves, iterations=60, rng=random.Random(1), policy=policy)
+                self.assertIn(mcts.search(), legal_moves(self.state, self.moves))
+            cutoffs.append(collector.counters.get('mcts.depth_cutoffs', 0))
+        # the heuristics end more playouts with a winner than random moves
+        self.assertLess(min(cutoffs[1:]), cutoffs[0])
+
+    def test_player_rollout_uses_search_rng(self):
+        own = random.Random(5)
+        policy = PlayerRollout(RandomPlayer('random', own))
+        legal = legal_moves(self.state, self.moves)
+        first = [policy.choose(self.state, legal, random.Random(1)) for _ in range(5)]
+        self.assertEqual(first, [policy.choose(self.state, legal, random.Random(1)) for _ in range(5)])
+        self.assertIs(own, policy._player.rng)
+        self.assertEqual(random.Random(5).random(), own.random())
+
+    def test_heuristic_evaluation(self):
+        evaluation = pickle.loads(pickle.dumps(HeuristicEvaluation()))
+        self.assertEqual([-1.0, 1.0, 0.0], outcome_scores([1, 2, 0]))
+        scores = evaluation(self.state)
+        self.assertAlmostEqual(0, sum(scores))
+        self.assertTrue(all(-1 <= score <= 1 for score in scores))
+        with validation.mode_set_to(ValidationMode.OFF):
+            # a bigger hand and a pending draw after a seven lower the score of a player
+            more = self.state.set(lp=self.state.lp.set(0, self.state.lp[0].update(self.state.st[:3])))
+            self.assertLess(evaluation(more)[0], scores[0])
+            hand = [card for card in self.state.lp[0] if card.value != Value.VII] + [Card(Suit.HEART, Value.IX)]
+            drawing = self.state.set(lp=self.state.lp.set(0, self.state.lp[0].__class__(hand)), cnt=1)
+            self.assertLess(evaluation(drawing.set(cnt=6))[0], evaluation(drawing)[0])
+            # the player out of the game holds the win
+            scores = evaluation(self.state.set(lp_mc=self.state.lp_mc.set(1, 4)))
+            self.assertEqual(1, scores[1])
+            self.assertTrue(scores[0] < 0 and scores[2] < 0)
+        self.assertRaises(ValueError, HeuristicEvaluation, temperature=0)
+
+    def test_evaluated_cutoffs(self):
+        with instrumentation.collecting() as collector:
+            mcts = MCTS(self.state, self.moves, iterations=30, rng=random.Random(1), evaluation=HeuristicEvaluation(),
+                        depth=4)
+            self.assertIn(mcts.search(), legal_moves(self.state, self.moves))
+        self.assertLessEqual(collector.snapshot()['observations']['mcts.playout_length']['max'], 4)
+        # cut off playouts give graded scores instead of only a visit
+        self.assertTrue(any(child.wins != int(child.wins) for child in mcts.root.children))
+
+    def test_root_parallel(self):
+        with RootParallelMCTS(self.moves, workers=2, iterations=10, seed=1) as parallel:
+            counts = parallel.visit_counts(self.state)
+            # the first iteration of every tree only visits the root
+            self.assertEqual(2 * (10 - 1), sum(visits for visits, _ in counts.values()))
+            self.assertTrue(all(self.moves[position].test(self.state) for position in counts))
+            move = parallel.search(self.state)
+            self.assertIn(move, legal_moves(self.state, self.moves))
+
+    def test_parallel_player(self):
+        player = MCTSPlayer('mcts', self.moves, workers=2, iterations=5)
+        try:
+            legal = legal_moves(self.state, self.moves)
+            self.assertIn(player.play(self.state, legal), legal)
+        finally:
+            player.close()
+        self.assertRaises(ValueError, MCTSPlayer, 'mcts', self.moves, workers=2, reuse_tree=True)
+        self.assertRaises(ValueError, MCTSPlayer, 'mcts', self.moves, workers=2, table=TranspositionTable())
+
+    def test_advance(self):
+        mcts = MCTS(self.state, self.moves, iterations=40)
+        move = mcts.search()
+        child = next(node for node in mcts.root.children if node.move is move)
+        grandchild = max(child.children, key=lambda node: node.visits) if child.children else child
+        self.assertTrue(mcts.advance(grandchild.state))
+        self.assertIs(grandchild, mcts.root)
+        self.assertIsNone(mcts.root.parent)
+        visits = mcts.root.visits
+        mcts.search()
+        self.assertEqual(max(40, visits), mcts.root.visits)
+        self.assertFalse(mcts.advance(self.state))
+
+    def test_player_reuses_tree(self):
+        player = MCTSPlayer('mcts', self.moves, iterations=30)
+        players = [player, RandomPlayer('r1'), RandomPlayer('r2')]
+        state = self.state
+        while not finished(state) and state.mc < 30:
+            legal = legal_moves(state, self.moves)
+            state = players[state.i].play(state, legal).apply(state)
+        self.assertGreater(player.reused_trees, 0)
+
+    def test_transposition_table(self):
+        table = TranspositionTable()
+        mcts = MCTS(self.state, self.moves, iterations=60, table=table)
+        mcts.search()
+        nodes, stack = [], [mcts.root]
+        while stack:
+            nodes.append(stack.pop())
+            stack.extend(nodes[-1].children)
+        self.assertEqual(len(nodes), table.hits + table.misses)
+        self.assertEqual(len(table), table.misses)
+        by_hash = {}
+        for node in nodes:
+            self.assertIs(by_hash.setdefault(node.state.zobrist, node.stats), node.stats)
+        self.assertIn(self.state, table)
+        self.assertEqual(table.hits / (table.hits + table.misses), table.counters()['hit_rate'])
+
+    def test_transposition_table_eviction(self):
+        table = TranspositionTable(capacity=5)
+        MCTS(self.state, self.moves, iterations=20, table=table).search()
+        self.assertEqual(5, len(table))
+        self.assertEqual(table.misses - 5, table.evictions)
+        self.assertNotIn(self.state, table)
+        self.assertRaises(ValueError, TranspositionTable, 0)
+
+    def test_shared_stats(self):
+        table = TranspositionTable()
+        first = Node(self.state, None, None, stats=table.stats_for(self.state))
+        second = Node(self.state, None, None, stats=table.stats_for(self.state.set(mc=3, zh=None)))
+        first.update_score(None)
+        self.assertEqual(1, second.visits)
+        self.assertEqual((1, 1), (table.hits, table.misses))
+
+
+if __name__ == '__main__':
+    unittest.main()
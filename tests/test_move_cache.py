@@ -0,0 +1,80 @@
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import unittest
+import zlib
+
+from pharaoh.card import GERMAN_CARDS_DECK
+from pharaoh.game import create_game, legal_moves
+from pharaoh.move_cache import MoveTableCache, fingerprint, load_moves, MoveCacheException
+from pharaoh.rule import standard_ruleset, DrawRule
+
+
+class Unloadable:
+    def __reduce__(self):
+        return int, ('not a number',)
+
+
+class TestMoveCache(unittest.TestCase):
+    def test_memory(self):
+        cache = MoveTableCache()
+        _, first = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5, cache=cache)
+        _, second = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5, cache=cache)
+        _, other = create_game(standard_ruleset, GERMAN_CARDS_DECK, 4, 5, cache=cache)
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual((1, 2, 2), (cache.hits, cache.misses, len(cache)))
+
+    def test_disk(self):
+        with tempfile.TemporaryDirectory() as directory:
+            state, generated = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5, cache=MoveTableCache(directory))
+            cache = MoveTableCache(directory)
+            loaded = cache.moves(standard_ruleset, GERMAN_CARDS_DECK, 3)
+            self.assertEqual((1, 0), (cache.loads, cache.misses))
+            self.assertEqual([repr(mv) for mv in generated], [repr(mv) for mv in loaded])
+            self.assertEqual([repr(mv) for mv in legal_moves(state, generated)],
+                             [repr(mv) for mv in legal_moves(state, loaded)])
+
+    def test_damaged_file_is_regenerated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = MoveTableCache(directory)
+            path = cache.path(standard_ruleset, GERMAN_CARDS_DECK, 3)
+            with open(path, 'wb') as f:
+                f.write(b'PHMT\x01garbage')
+            self.assertRaises(MoveCacheException, load_moves, path)
+            cache.moves(standard_ruleset, GERMAN_CARDS_DECK, 3)
+            self.assertEqual(1, cache.misses)
+            load_moves(path)
+
+    def test_any_load_failure_is_a_miss(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = MoveTableCache(directory)
+            path = cache.path(standard_ruleset, GERMAN_CARDS_DECK, 3)
+            # a truncated table and a pickle whose objects fail to build (as after a refactor)
+            for payload in (zlib.compress(pickle.dumps(list(range(100))))[:20],
+                            zlib.compress(pickle.dumps(Unloadable()))):
+                with open(path, 'wb') as f:
+                    f.write(b'PHMT\x01' + payload)
+                cache.clear()
+                with self.assertLogs('pharaoh.move_cache', 'WARNING'):
+                    self.assertTrue(cache.moves(standard_ruleset, GERMAN_CARDS_DECK, 3))
+            self.assertEqual(2, cache.misses)
+
+    def test_fingerprint(self):
+        key = fingerprint(standard_ruleset, GERMAN_CARDS_DECK, 3)
+        self.assertNotEqual(key, fingerprint(standard_ruleset, GERMAN_CARDS_DECK, 4))
+        self.assertNotEqual(key, fingerprint(standard_ruleset[:-1], GERMAN_CARDS_DECK, 3))
+        self.assertEqual(key, fingerprint(standard_ruleset[:-1] + [DrawRule()], GERMAN_CARDS_DECK, 3))
+        code = 'from pharaoh.card import GERMAN_CARDS_DECK\n' \
+               'from pharaoh.move_cache import fingerprint\n' \
+               'from pharaoh.rule import standard_ruleset\n' \
+               'print(fingerprint(standard_ruleset, GERMAN_CARDS_DECK, 3))'
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+        self.assertEqual(key, output.stdout.strip())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import pickle
+import random
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Optional
+
+from pharaoh.card import GERMAN_CARDS_DECK, DOUBLE_GERMAN_CARDS_DECK, FRENCH_CARDS_DECK, Deck, Card, Suit, Value
+from pharaoh.game import create_game, legal_moves, finished, play_game
+from pharaoh.game_state import GameState
+from pharaoh.move import Move
+from pharaoh.move_cache import MoveTableCache
+from pharaoh.parametric import distinct_sequences, HandMoves
+from pharaoh.player import RandomPlayer
+from pharaoh.rule import standard_ruleset, match_suit_rule
+
+SMALL_DOUBLE_DECK: Deck = Deck.build([Suit.HEART, Suit.BELL], [Value.VII, Value.X, Value.OVER, Value.ACE], copies=2)
+
+
+def plays(moves: List[Move]) -> List[Tuple[Tuple[Card, ...], Optional[Suit], str]]:
+    return sorted((tuple(mv.cards), mv.suit, repr(mv.conditions)) for mv in moves)
+
+
+def random_states(deck: Deck, player_count: int, init_cards: int, games: int) -> List[GameState]:
+    rnd = random.Random(3)
+    states: List[GameState] = []
+    for _ in range(games):
+        state, moves = create_game(standard_ruleset, deck, player_count, init_cards, parametric=True)
+        while not finished(state) and state.mc < 200:
+            states.append(state)
+            state = rnd.choice(legal_moves(state, moves)).apply(state)
+    return states
+
+
+class TestParametricMoves(unittest.TestCase):
+    def setUp(self) -> None:
+        random.seed(4)
+        self.mix_cards = Move.mix_cards
+        Move.mix_cards = random.shuffle
+
+    def tearDown(self) -> None:
+        Move.mix_cards = self.mix_cards
+
+    def test_decks(self):
+        self.assertEqual(32, len(GERMAN_CARDS_DECK.cards))
+        self.assertEqual((64, 2, 8), (len(DOUBLE_GERMAN_CARDS_DECK.cards), DOUBLE_GERMAN_CARDS_DECK.copies,
+                                      DOUBLE_GERMAN_CARDS_DECK.value_group_size))
+        self.assertEqual(52, len(FRENCH_CARDS_DECK.cards))
+
+    def test_distinct_sequences(self):
+        cards = [Card(Suit.HEART, Value.X), Card(Suit.BELL, Value.X)]
+        sequences = list(distinct_sequences({cards[0]: 2, cards[1]: 1}, 3))
+        self.assertEqual(len(sequences), len(set(sequences)))
+        # (), 2 of length 1, 3 of length 2 and 3 of length 3
+        self.assertEqual(9, len(sequences))
+
+    def test_same_moves_as_table(self):
+        for deck in (GERMAN_CARDS_DECK, SMALL_DOUBLE_DECK):
+            cache = MoveTableCache()
+            table = cache.moves(standard_ruleset, deck, 3)
+            parametric = cache.moves(standard_ruleset, deck, 3, parametric=True)
+            self.assertLess(len(parametric), len(table))
+            for state in random_states(deck, 3, 4, 3):
+                self.assertEqual(plays(legal_moves(state, table)), plays(legal_moves(state, parametric)))
+
+    def test_double_deck_for_ten_players(self):
+        state, moves = create_game(standard_ruleset, DOUBLE_GERMAN_CARDS_DECK, 10, 5)
+        self.assertTrue(moves.generators)
+        states, history = play_game(state, [RandomPlayer(str(i)) for i in range(10)], moves)
+        self.assertTrue(finished(states[-1]) or states[-1].mc == 1000)
+        self.assertEqual(len(history), states[-1].mc)
+
+    def test_keys_survive_pickling(self):
+        state, moves = create_game(standard_ruleset, DOUBLE_GERMAN_CARDS_DECK, 8, 6)
+        copy = pickle.loads(pickle.dumps(moves))
+        legal = legal_moves(state, moves)
+        for mv in legal:
+            self.assertIs(mv, moves.resolve(moves.key(mv)))
+            self.assertEqual(plays([mv]), plays([copy.resolve(moves.key(mv))]))
+
+    def test_memo_bounded(self):
+        generator = HandMoves(match_suit_rule, SMALL_DOUBLE_DECK, 3, capacity=2)
+        first = generator.moves((Card(Suit.HEART, Value.X),))
+        generator.moves((Card(Suit.BELL, Value.X),))
+        generator.moves((Card(Suit.HEART, Value.X),))
+        generator.moves((Card(Suit.HEART, Value.VII),))
+        self.assertEqual((1, 2), (generator.evictions, len(generator._moves)))
+        self.assertIs(first[0], generator.moves((Card(Suit.HEART, Value.X),))[0])
+        evicted = generator.moves((Card(Suit.BELL, Value.X),))[0]
+        generator.moves((Card(Suit.HEART, Value.ACE),))
+        generator.moves((Card(Suit.HEART, Value.VII),))
+        self.assertTrue(generator.owns(evicted))
+        self.assertRaises(ValueError, HandMoves, match_suit_rule, SMALL_DOUBLE_DECK, 3, capacity=0)
+
+    def test_memo_shared_by_threads(self):
+        generator = HandMoves(match_suit_rule, SMALL_DOUBLE_DECK, 3, capacity=3)
+        sequences = [(card,) for card in sorted(set(SMALL_DOUBLE_DECK.cards))]
+
+        def generate(offset: int) -> None:
+            for k in range(2000):
+                generator.moves(sequences[(k + offset) % len(sequences)])
+
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(generate, range(4)))
+        self.assertEqual(3, len(generator._moves))
+        copy = pickle.loads(pickle.dumps(generator))
+        self.assertEqual(plays(generator.moves(sequences[0])), plays(copy.moves(sequences[0])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import pickle
+import random
+import unittest
+
+from pharaoh.card import GERMAN_CARDS_DECK, DOUBLE_GERMAN_CARDS_DECK
+from pharaoh.game import create_game, legal_moves, finished, play_game
+from pharaoh.move import Move
+from pharaoh.player import BiggestTuplePlayer, RandomPlayer
+from pharaoh.record import GameRecord, Replay, RecordException, record_game, write_varint, read_varint, VERSION
+from pharaoh.rng import GameRandom
+from pharaoh.rule import standard_ruleset
+
+
+class TestGameRecord(unittest.TestCase):
+    def setUp(self) -> None:
+        random.seed(8)
+        self.mix_cards = Move.mix_cards
+        Move.mix_cards = random.shuffle
+
+    def tearDown(self) -> None:
+        Move.mix_cards = self.mix_cards
+
+    def test_varints(self):
+        out = bytearray()
+        numbers = [0, 1, 127, 128, 300, 2 ** 64 - 1]
+        for n in numbers:
+            write_varint(out, n)
+        pos, read = 0, []
+        while pos < len(out):
+            n, pos = read_varint(bytes(out), pos)
+            read.append(n)
+        self.assertEqual(numbers, read)
+
+    def test_move_ids(self):
+        for deck, players in ((GERMAN_CARDS_DECK, 3), (DOUBLE_GERMAN_CARDS_DECK, 8)):
+            state, moves = create_game(standard_ruleset, deck, players, 6)
+            rnd = random.Random(1)
+            for _ in range(50):
+                legal = legal_moves(state, moves)
+                for mv in legal:
+                    self.assertIs(mv, moves.from_id(moves.move_id(mv)))
+                state = rnd.choice(legal).apply(state)
+                if finished(state):
+                    break
+
+    def test_replay_matches_game(self):
+        state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 4, 5)
+        players = [RandomPlayer(str(i)) for i in range(2)] + [BiggestTuplePlayer(str(i)) for i in range(2)]
+        record = GameRecord.from_bytes(record_game(state, players, moves, seed=5).to_bytes())
+        states, history = play_game(state, players, moves, rng=GameRandom(5))
+        replay = Replay(record, moves, snapshot_every=8)
+        self.assertEqual(states, list(replay))
+        self.assertEqual(history, replay.moves())
+        self.assertEqual(len(states) // 8 + 1, replay.snapshots)
+        fresh = Replay(record, moves, snapshot_every=8)
+        for n in random.Random(2).sample(range(len(states)), 10):
+            self.assertEqual(states[n], fresh[n])
+        self.assertLess(len(record.to_bytes()) * 50, len(pickle.dumps(states)))
+
+    def test_parametric_replay(self):
+        state, moves = create_game(standard_ruleset, DOUBLE_GERMAN_CARDS_DECK, 10, 5)
+        record = record_game(state, [RandomPlayer(str(i)) for i in range(10)], moves, seed=3, max_moves=200)
+        replay = Replay(GameRecord.from_bytes(record.to_bytes()), moves)
+        self.assertEqual(len(record.moves), replay[-1].mc)
+
+    def test_damaged_record(self):
+        state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5)
+        data = record_game(state, [RandomPlayer(str(i)) for i in range(3)], moves, seed=1).to_bytes()
+        with self.assertRaises(RecordException):
+            GameRecord.from_bytes(data[:-1] if data[-1] < 0x80 else data + b'\x00')
+        with self.assertRaises(RecordException):
+            GameRecord.from_bytes(b'PHGR' + bytes([VERSION + 1]) + data[5:])
+        record = GameRecord.from_bytes(data)
+        broken = GameRecord(record.initial, record.seed, (len(moves) - 1,) * len(record.moves))
+        with self.assertRaises(RecordException):
+            Replay(broken, moves)[-1]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import random
+import unittest
+from typing import List
+
+from pharaoh.card import GERMAN_CARDS_DECK
+from pharaoh.game import create_game, play_game, game_steps
+from pharaoh.move import Move
+from pharaoh.player import RandomPlayer, MCTSPlayer, Player
+from pharaoh.rng import GameRandom, derive_seed
+from pharaoh.rule import standard_ruleset
+
+
+def global_shuffle(_):
+    raise AssertionError('global reshuffle in a seeded game')
+
+
+class TestGameRandom(unittest.TestCase):
+    def setUp(self) -> None:
+        self.mix_cards = Move.mix_cards
+        Move.mix_cards = global_shuffle
+
+    def tearDown(self) -> None:
+        Move.mix_cards = self.mix_cards
+
+    def test_streams(self):
+        rng = GameRandom(1)
+        self.assertIs(rng.deal, rng.stream('deal'))
+        self.assertNotEqual(rng.deal.random(), rng.reshuffle.random())
+        self.assertNotEqual(rng.seat(0).random(), rng.seat(1).random())
+        self.assertEqual(GameRandom(1).child('game', 3).seed, rng.child('game', 3).seed)
+        self.assertNotEqual(rng.child('game', 3).seed, rng.child('game', 4).seed)
+        self.assertEqual(derive_seed(1, 'deal'), derive_seed(1, 'deal'))
+
+    def play(self, seed: int) -> List:
+        _, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5)
+        players: List[Player] = [RandomPlayer('a'), RandomPlayer('b'), MCTSPlayer('c', moves, iterations=10)]
+        rng = GameRandom(seed)
+        state, _ = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5, rng=rng)
+        return play_game(state, players, moves, max_moves=150, rng=rng)
+
+    def test_replayable_from_seed(self):
+        random.seed(1)
+        states, history = self.play(7)
+        random.seed(2)
+        self.assertEqual((states, history), self.play(7))
+        self.assertNotEqual(states, self.play(8)[0])
+
+    def test_player_rngs_restored(self):
+        _, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 2, 5)
+        own = random.Random(1)
+        players: List[Player] = [RandomPlayer('a', own), RandomPlayer('b')]
+        rng = GameRandom(3)
+        state, _ = create_game(standard_ruleset, GERMAN_CARDS_DECK, 2, 5, rng=rng)
+        play_game(state, players, moves, max_moves=20, rng=rng)
+        self.assertEqual([own, None], [player.rng for player in players])
+        steps = game_steps(state, players, moves, rng=rng)
+        next(steps)
+        self.assertIsNot(own, players[0].rng)
+        steps.close()
+        self.assertEqual([own, None], [player.rng for player in players])
+
+
+if __name__ == '__main__':
+    unittest.main()
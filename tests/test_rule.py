@@ -5,9 +5,19 @@ from typing import Iterable, List, cast
 from pyrsistent import PBag, pbag, pvector
 
 from pharaoh.card import Deck, Card, Suit, Value, GERMAN_CARDS_DECK, SUITS
-from pharaoh.game_state import GameState, Hand
+from pharaoh.game import create_game, legal_moves
+from pharaoh.game_state import GameState, Hand, ValidationMode, set_validation_mode
 from pharaoh.move import Move
-from pharaoh.rule import match_suit_rule, match_value_rule, play_over_rule, DrawRule
+from pharaoh.rule import match_suit_rule, match_value_rule, play_over_rule, DrawRule, standard_ruleset
+
+
+def setUpModule():
+    # every state of these tests runs the invariant checks
+    set_validation_mode(ValidationMode.FULL)
+
+
+def tearDownModule():
+    set_validation_mode(ValidationMode.OFF)
 
 
 class MyTestCase(unittest.TestCase):
@@ -515,6 +525,20 @@ class MyTestCase(unittest.TestCase):
         )
         self.assertTrue(all(c in state2.lp[state1.i] for c in state1.st[0:state1.cnt]))
 
+    def test_finish_with_four_cards(self):
+        # four cards keep the player on the move, a player emptying their hand with them is out and the next one plays
+        _, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5)
+        tens = [Card(suit, Value.X) for suit in (Suit.HEART, Suit.BELL, Suit.ACORN, Suit.LEAF)]
+        top = Card(Suit.HEART, Value.IX)
+        state = GameState(dp=[top], st=[Card(Suit.ACORN, Value.IX), Card(Suit.LEAF, Value.IX)],
+                          lp=(Hand(tens), Hand([Card(Suit.HEART, Value.KING)]), Hand([Card(Suit.BELL, Value.VIII)])),
+                          ace=0, suit=top.suit, val=top.value, cnt=1, i=0, mc=20, lp_mc=(-1, -1, -1), deck_size=9)
+        four = [mv for mv in legal_moves(state, moves) if len(mv.cards) == 4]
+        self.assertTrue(four)
+        for move in four:
+            after = move.apply(state)
+            self.assertEqual((1, 21, -1), (after.i, after.lp_mc[0], after.lp_mc[1]))
+
 
 if __name__ == '__main__':
     unittest.main()
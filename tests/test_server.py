@@ -0,0 +1,148 @@
+import asyncio
+import os
+import random
+import socket
+import tempfile
+import unittest
+from typing import Dict, Any
+
+from pharaoh.card import GERMAN_CARDS_DECK
+from pharaoh.game import create_game
+from pharaoh.player import Player, RandomPlayer, MCTSPlayer
+from pharaoh.rule import standard_ruleset
+from pharaoh.server import GameServer, run_client, ServerException
+
+
+def random_choice(rnd: random.Random):
+    return lambda turn: rnd.randrange(len(turn['legal']))
+
+
+class FailingPlayer(Player):
+    def play(self, state, legal_moves):
+        raise RuntimeError('no move')
+
+
+class TestGameServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.server = GameServer()
+
+    async def asyncTearDown(self) -> None:
+        await self.server.close()
+
+    async def test_many_tables_over_tcp(self):
+        tcp = await self.server.start_tcp()
+        host, port = tcp.sockets[0].getsockname()[:2]
+        for t in range(6):
+            self.server.add_table(f't{t}', 3, bots={0: RandomPlayer('bot')}, seed=t, max_moves=300)
+
+        async def client(table: str, name: str) -> Dict[str, Any]:
+            reader, writer = await asyncio.open_connection(host, port)
+            return await run_client(reader, writer, table, name, random_choice(random.Random(name)))
+
+        ends = await asyncio.gather(*(client(f't{t}', f'c{t}{k}') for t in range(6) for k in range(2)))
+        results = await self.server.results()
+        self.assertEqual(6, len(results))
+        for result in results:
+            self.assertIn(result.reason, ('finished', 'move limit'))
+            if result.reason == 'finished':
+                self.assertEqual(3, len(result.placements))
+        for end, result in zip(ends[::2], results):
+            self.assertEqual(result.moves, end['moves'])
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'needs Unix sockets')
+    async def test_unix_socket_with_offloaded_search(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'pharaoh.sock')
+            await self.server.start_unix(path)
+            _, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 2, 5)
+            table = self.server.add_table('mcts', 2, bots={0: MCTSPlayer('mcts', moves, iterations=5)}, seed=1,
+                                          max_moves=20)
+            self.server.add_table('other', 2, bots={0: RandomPlayer('bot')}, seed=2, max_moves=20)
+            reader, writer = await asyncio.open_unix_connection(path)
+            other_reader, other_writer = await asyncio.open_unix_connection(path)
+            end, other_end = await asyncio.gather(run_client(reader, writer, 'mcts', 'human'),
+                                                  run_client(other_reader, other_writer, 'other', 'human'))
+            self.assertEqual((await table.done).moves, end['moves'])
+            self.assertLessEqual(other_end['moves'], 20)
+
+    async def test_protocol_errors(self):
+        tcp = await self.server.start_tcp()
+        host, port = tcp.sockets[0].getsockname()[:2]
+        self.server.add_table('t', 2, seed=3, max_moves=10)
+        reader, writer = await asyncio.open_connection(host, port)
+        with self.assertRaises(ServerException):
+            await run_client(reader, writer, 'missing', 'a')
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b'JOIN t a\n')
+        await writer.drain()
+        self.assertTrue((await reader.readline()).startswith(b'JOINED'))
+        other = asyncio.create_task(run_client(*await asyncio.open_connection(host, port), 't', 'b'))
+        turns = 0
+        while True:
+            command, _, _ = (await reader.readline()).decode().partition(' ')
+            if command == 'TURN':
+                turns += 1
+                writer.write(b'PLAY 99\n' if turns == 1 else b'PLAY 0\n')
+                await writer.drain()
+            elif command == 'END':
+                break
+            elif command == 'ERROR':
+                writer.write(b'PLAY 0\n')
+                await writer.drain()
+        writer.close()
+        self.assertEqual(10, (await other)['moves'])
+
+    async def test_malformed_input(self):
+        tcp = await self.server.start_tcp()
+        host, port = tcp.sockets[0].getsockname()[:2]
+        self.server.add_table('t', 2, bots={0: RandomPlayer('bot')}, seed=4, max_moves=10)
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b'\xff\n')
+        await writer.drain()
+        self.assertTrue((await reader.readline()).startswith(b'ERROR'))
+        writer.write(b'JOIN t a\n')
+        await writer.drain()
+        bad = [b'PLAY \xff\n', 'PLAY \u00b2\n'.encode(), b'PLAY -1\n']
+        errors = 0
+        while True:
+            command, _, _ = (await reader.readline()).decode().partition(' ')
+            if command == 'TURN':
+                writer.write(bad.pop() if bad else b'PLAY 0\n')
+                await writer.drain()
+            elif command == 'ERROR':
+                errors += 1
+                writer.write(bad.pop() if bad else b'PLAY 0\n')
+                await writer.drain()
+            elif command == 'END':
+                break
+        writer.close()
+        self.assertEqual(3, errors)
+        result, = await self.server.results()
+        self.assertEqual('move limit', result.reason)
+
+    async def test_disconnect_ends_table(self):
+        tcp = await self.server.start_tcp()
+        host, port = tcp.sockets[0].getsockname()[:2]
+        self.server.add_table('t', 2, bots={0: RandomPlayer('bot')}, seed=5, max_moves=10)
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b'JOIN t a\n')
+        await writer.drain()
+        while not (await reader.readline()).startswith(b'TURN'):
+            pass
+        writer.close()
+        result, = await self.server.results()
+        self.assertEqual('a disconnected', result.reason)
+
+    async def test_failed_table_reported(self):
+        tcp = await self.server.start_tcp()
+        host, port = tcp.sockets[0].getsockname()[:2]
+        self.server.add_table('t', 2, bots={0: FailingPlayer('bot')}, seed=6, max_moves=10)
+        reader, writer = await asyncio.open_connection(host, port)
+        with self.assertRaisesRegex(ServerException, 'table t failed'):
+            await run_client(reader, writer, 't', 'a')
+        with self.assertRaisesRegex(RuntimeError, 'no move'):
+            await self.server.results()
+
+
+if __name__ == '__main__':
+    unittest.main()
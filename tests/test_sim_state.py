@@ -0,0 +1,90 @@
+import random
+import unittest
+from typing import Dict, Any, List
+
+from pharaoh.card import GERMAN_CARDS_DECK
+from pharaoh.game import create_game, legal_moves, finished
+from pharaoh.game_state import GameState
+from pharaoh.mcts import MCTS
+from pharaoh.move import Move, MoveException
+from pharaoh.rule import standard_ruleset
+from pharaoh.sim_state import SimState, SimStateException
+
+
+def snapshot(state) -> Dict[str, Any]:
+    result = {name: state[name] for name in SimState.FIELDS}
+    result['lp'] = [sorted(hand) for hand in state.lp]
+    return result
+
+
+class TestSimState(unittest.TestCase):
+    def setUp(self) -> None:
+        self.mix_cards = Move.mix_cards
+        Move.mix_cards = lambda cards: cards.reverse()
+
+    def tearDown(self) -> None:
+        Move.mix_cards = self.mix_cards
+
+    def test_round_trip(self):
+        state, _ = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5)
+        sim = SimState.from_state(state)
+        self.assertEqual(snapshot(state), snapshot(sim))
+        self.assertEqual(str(state), str(sim.to_state()))
+
+    def test_apply_matches_persistent_path(self):
+        rnd = random.Random(11)
+        for compact in (False, True):
+            for _ in range(5):
+                state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 4, 5, compact_hands=compact)
+                sim = SimState(state)
+                while not finished(state) and state.mc < 300:
+                    legal: List[Move] = legal_moves(state, moves)
+                    self.assertEqual(legal, legal_moves(sim, moves))
+                    move = rnd.choice(legal)
+                    state = move.apply(state)
+                    sim.apply(move)
+                    self.assertEqual(snapshot(state), snapshot(sim))
+                self.assertEqual(str(state), str(sim.to_state()))
+
+    def test_undo(self):
+        rnd = random.Random(5)
+        state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5)
+        sim = SimState(state)
+        history: List[GameState] = [state]
+        for _ in range(150):
+            if finished(state):
+                break
+            move = rnd.choice(legal_moves(state, moves))
+            state = move.apply(state)
+            sim.apply(move)
+            history.append(state)
+            if rnd.random() < 0.3:
+                for _ in range(rnd.randint(1, sim.depth)):
+                    sim.undo()
+                    history.pop()
+                    self.assertEqual(snapshot(history[-1]), snapshot(sim))
+                state = history[-1]
+        while sim.depth:
+            sim.undo()
+        self.assertEqual(snapshot(history[0]), snapshot(sim))
+        self.assertRaises(SimStateException, sim.undo)
+
+    def test_illegal_move_leaves_state_unchanged(self):
+        state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5)
+        sim = SimState(state)
+        illegal = next(mv for mv in moves if not mv.test(state))
+        self.assertRaises(MoveException, sim.apply, illegal)
+        self.assertEqual(0, sim.depth)
+        self.assertEqual(snapshot(state), snapshot(sim))
+
+    def test_mcts_playouts(self):
+        random.seed(1)
+        state, moves = create_game(standard_ruleset, GERMAN_CARDS_DECK, 3, 5)
+        for mutable in (False, True):
+            mcts = MCTS(state, moves)
+            mcts.MUTABLE_PLAYOUTS = mutable
+            self.assertTrue(mcts.search().test(state))
+
+
+if __name__ == '__main__':
+    unittest.main()
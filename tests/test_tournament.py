@@ -0,0 +1,46 @@
+import unittest
+
+from pharaoh.player import RandomPlayer, BiggestTuplePlayer, SmallestTuplePlayer
+from pharaoh.tournament import Tournament, TournamentStats, GameResult, SeatRotation
+
+
+def roster():
+    return [RandomPlayer('random'), BiggestTuplePlayer('biggest'), SmallestTuplePlayer('smallest')]
+
+
+class TestTournament(unittest.TestCase):
+    def test_stats(self):
+        stats = TournamentStats(['a', 'b'])
+        stats.add(GameResult(0, (0, 1), (1, 0), 10))
+        stats.add(GameResult(1, (1, 0), (1, 0), 20))
+        stats.add(GameResult(2, (0, 1), None, 1000))
+        self.assertEqual((3, 2, 1), (stats.games, stats.finished, stats.unfinished))
+        self.assertAlmostEqual(1030 / 3, stats.mean_length)
+        self.assertEqual([[0, 2], [2, 0]], stats.placements)
+        self.assertEqual((0.0, 1.0), (stats.win_rate(0), stats.win_rate(1)))
+        low, high = stats.win_interval(1)
+        self.assertTrue(0 < low < 1 and high == 1.0)
+        self.assertEqual(1.0, stats.mean_placement(0))
+
+    def test_seat_rotation(self):
+        tournament = Tournament(roster(), 6, SeatRotation.ROTATE, seed=3)
+        seats = [result.seats for result in tournament.results()]
+        self.assertEqual([(0, 1, 2), (1, 2, 0), (2, 0, 1)] * 2, seats)
+
+    def test_partial_summary(self):
+        tournament = Tournament(roster(), 5, SeatRotation.SHUFFLE, seed=3)
+        for count, result in enumerate(tournament.results(), 1):
+            self.assertEqual(count, tournament.stats.games)
+            self.assertEqual(sorted(result.seats), [0, 1, 2])
+        self.assertEqual(5, sum(map(sum, tournament.stats.placements)) // 3 + tournament.stats.unfinished)
+
+    def test_parallel_games_match_serial(self):
+        serial = Tournament(roster(), 12, SeatRotation.SHUFFLE, seed=5)
+        parallel = Tournament(roster(), 12, SeatRotation.SHUFFLE, seed=5, workers=2, chunk_size=4)
+        expected = sorted(serial.results(), key=lambda r: r.game)
+        self.assertEqual(expected, sorted(parallel.results(), key=lambda r: r.game))
+        self.assertEqual(serial.stats.placements, parallel.stats.placements)
+
+
+if __name__ == '__main__':
+    unittest.main()